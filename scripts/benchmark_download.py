@@ -0,0 +1,116 @@
+"""
+Download Throughput Benchmark
+
+Compares the original 8 KB chunk loop with PRIDEClient's buffered readinto
+download path, against a local HTTP server.
+
+Usage:
+    python scripts/benchmark_download.py --size-mb 512 --repeats 3
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from data_acquisition import PRIDEClient
+
+
+def chunk_loop_download(client: PRIDEClient, url: str, output_path: Path) -> None:
+    """The original download loop: 8 KB iter_content, progress update per chunk."""
+    response = client.session.get(url, stream=True)
+    response.raise_for_status()
+    total_size = int(response.headers.get('content-length', 0))
+    with open(output_path, 'wb') as f:
+        with tqdm(total=total_size, unit='B', unit_scale=True, unit_divisor=1024,
+                  desc="8 KB chunks", leave=False) as pbar:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    pbar.update(len(chunk))
+
+
+def buffered_download(client: PRIDEClient, url: str, output_path: Path) -> None:
+    """The current download path (1 MB reusable buffer, throttled progress)."""
+    client.download_file(url, str(output_path))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("HTTP server did not start")
+
+
+def main():
+    """Main entry point for the download benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark HTTP download throughput")
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the test file in MB")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per method (best is reported)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        serve_dir = tmp / "serve"
+        serve_dir.mkdir()
+        source = serve_dir / "payload.bin"
+        with open(source, "wb") as f:
+            block = bytes(range(256)) * 4096
+            for _ in range(args.size_mb):
+                f.write(block)
+        
+        # Serve from a separate process so the server doesn't compete for the GIL
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1",
+             "--directory", str(serve_dir)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_server(port)
+            url = f"http://127.0.0.1:{port}/payload.bin"
+            client = PRIDEClient(cache_enabled=False)
+            
+            print(f"Downloading {args.size_mb} MB from a local HTTP server "
+                  f"(best of {args.repeats})")
+            results = {}
+            for name, method in [("8 KB chunk loop", chunk_loop_download),
+                                 ("1 MB readinto", buffered_download)]:
+                best = float("inf")
+                for _ in range(args.repeats):
+                    output_path = tmp / "download.bin"
+                    start = time.perf_counter()
+                    method(client, url, output_path)
+                    best = min(best, time.perf_counter() - start)
+                    assert output_path.stat().st_size == source.stat().st_size
+                    output_path.unlink()
+                results[name] = best
+                print(f"  {name:<16} {best:6.2f} s  {args.size_mb / best:8.1f} MB/s")
+            
+            speedup = results["8 KB chunk loop"] / results["1 MB readinto"]
+            print(f"  Speedup: {speedup:.1f}x")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,12 @@ def main():
         nargs="+",
         help="File types to download (e.g., mzTab csv)"
     )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent file downloads"
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -57,7 +63,8 @@ def main():
     
     try:
         # Initialize downloader
-        downloader = DatasetDownloader(output_dir=args.output_dir)
+        downloader = DatasetDownloader(output_dir=args.output_dir,
+                                       max_connections=args.max_connections)
         
         # Download dataset
         output_path = downloader.download_dataset(
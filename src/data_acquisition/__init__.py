@@ -5,7 +5,9 @@ Handles downloading and parsing proteomics data from PRIDE repository.
 """
 
 from .pride_api import PRIDEClient
+from .async_pride_api import AsyncPRIDEClient
 from .dataset_downloader import DatasetDownloader
-from .file_parser import FileParser
+from .file_parser import FileParser, IntensityMatrix, MzTabFile
 
-__all__ = ["PRIDEClient", "DatasetDownloader", "FileParser"]
+__all__ = ["PRIDEClient", "AsyncPRIDEClient", "DatasetDownloader", "FileParser", "MzTabFile",
+           "IntensityMatrix"]
@@ -0,0 +1,302 @@
+"""
+Async PRIDE API Client
+
+asyncio version of the PRIDE client for resolving many datasets concurrently.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .pride_api import PRIDEClient
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPRIDEClient(PRIDEClient):
+    """
+    asyncio client for the PRIDE Archive REST API.
+    
+    Offers the query methods of PRIDEClient as coroutines with an ``a``
+    prefix (aget_dataset_metadata, aget_dataset_files, asearch_datasets,
+    aget_many_datasets_metadata), with at most ``max_concurrency`` requests
+    in flight. The inherited blocking methods are unchanged, so the client
+    can be used wherever a PRIDEClient is expected (e.g. by
+    DatasetDownloader). The response cache and the retry settings are shared
+    with PRIDEClient, so both clients can use the same cache directory; cache
+    reads and writes run in a worker thread, off the event loop.
+    
+    Use as an async context manager so the connection pool is closed:
+    
+        async with AsyncPRIDEClient(max_concurrency=20) as client:
+            results, errors = await client.aget_many_datasets_metadata(accessions)
+    """
+    
+    def __init__(self, *args, max_concurrency: int = 10, **kwargs):
+        """
+        Initialize async PRIDE API client.
+        
+        Args:
+            *args: Positional arguments of PRIDEClient
+            max_concurrency: Maximum number of concurrent requests (default: 10)
+            **kwargs: Keyword arguments of PRIDEClient
+        """
+        if httpx is None:
+            raise ImportError("httpx is required for AsyncPRIDEClient")
+            
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> "AsyncPRIDEClient":
+        self._get_client()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphore = None
+    
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Create the HTTP client and concurrency limit on first use."""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(headers=dict(self.session.headers),
+                                             timeout=self.timeout, limits=limits,
+                                             follow_redirects=True)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+    
+    async def _acached_get(self, cache_key: str, url: str, params: Optional[Dict] = None,
+                           parse: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        GET a JSON endpoint through the cache.
+        
+        Coroutine counterpart of PRIDEClient._cached_get: fresh entries are
+        returned without a request, expired entries are revalidated with a
+        conditional request and a 304 Not Modified restarts their TTL.
+        Expired entries are always revalidated before returning (no
+        stale-while-revalidate). The blocking SQLite cache calls run in
+        ``asyncio.to_thread``.
+        
+        Args:
+            cache_key: Cache key of the request
+            url: URL to request
+            params: Optional query parameters
+            parse: Optional function applied to the JSON body before caching
+            
+        Returns:
+            Parsed response data
+        """
+        stale = await asyncio.to_thread(self._get_cache_entry, cache_key)
+        if stale is not None and stale.is_fresh:
+            return stale.value
+        
+        headers = {}
+        if stale is not None:
+            if stale.etag:
+                headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                headers["If-Modified-Since"] = stale.last_modified
+        
+        response = await self._arequest_with_retry(url, params=params, headers=headers or None)
+        
+        if response.status_code == 304 and stale is not None:
+            logger.info(f"Not modified, cache refreshed: {cache_key}")
+            await asyncio.to_thread(self._refresh_cache_ttl, cache_key, stale)
+            return stale.value
+        
+        data = response.json()
+        if parse is not None:
+            data = parse(data)
+        
+        # Save to cache
+        await asyncio.to_thread(self._save_to_cache, cache_key, data,
+                                etag=response.headers.get("ETag"),
+                                last_modified=response.headers.get("Last-Modified"))
+        return data
+    
+    async def _arequest_with_retry(self, url: str, params: Optional[Dict] = None,
+                                   headers: Optional[Dict] = None) -> "httpx.Response":
+        """
+        Make HTTP request with exponential backoff retry logic.
+        
+        Coroutine counterpart of PRIDEClient._make_request_with_retry, which
+        the inherited blocking methods keep using. Same policy: timeouts,
+        connection errors and 5xx responses are retried, 4xx responses are
+        raised immediately.
+        
+        Args:
+            url: URL to request
+            params: Optional query parameters
+            headers: Optional extra request headers
+            
+        Returns:
+            Response object (including 304 Not Modified)
+            
+        Raises:
+            httpx.HTTPError: If all retries exhausted
+        """
+        client = self._get_client()
+        last_exception = None
+        
+        for attempt in range(self.max_retries):
+            try:
+                async with self._semaphore:
+                    response = await client.get(url, params=params, headers=headers)
+                # httpx treats 3xx as errors too
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+                
+            except httpx.TimeoutException as e:
+                last_exception = e
+                logger.warning(f"Request timeout (attempt {attempt + 1}/{self.max_retries}): {url}")
+                
+            except httpx.TransportError as e:
+                last_exception = e
+                logger.warning(f"Connection error (attempt {attempt + 1}/{self.max_retries}): {url}")
+                
+            except httpx.HTTPStatusError as e:
+                # Don't retry client errors (4xx)
+                if e.response.status_code < 500:
+                    raise
+                # Retry server errors (5xx)
+                last_exception = e
+                logger.warning(f"Server error {e.response.status_code} (attempt {attempt + 1}/{self.max_retries}): {url}")
+                
+            # If not last attempt, wait with exponential backoff
+            if attempt < self.max_retries - 1:
+                wait_time = self.backoff_factor ** attempt
+                logger.info(f"Retrying in {wait_time:.1f} seconds...")
+                await asyncio.sleep(wait_time)
+                
+        # All retries exhausted
+        logger.error(f"All {self.max_retries} retry attempts failed for {url}")
+        raise last_exception
+    
+    async def aget_dataset_metadata(self, dataset_id: str) -> Dict:
+        """
+        Retrieve metadata for a specific PRIDE dataset (see get_dataset_metadata).
+        
+        Args:
+            dataset_id: PRIDE dataset accession (e.g., "PXD005011")
+            
+        Returns:
+            Dictionary containing dataset metadata
+            
+        Raises:
+            ValueError: If dataset not found
+            httpx.HTTPError: If API error
+        """
+        logger.info(f"Fetching metadata for dataset: {dataset_id}")
+        
+        cache_key = self._get_cache_key("metadata", dataset_id=dataset_id)
+        url = f"{self.base_url}/projects/{dataset_id}"
+        
+        try:
+            metadata = await self._acached_get(cache_key, url)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.error(f"Dataset {dataset_id} not found")
+                raise ValueError(f"Dataset {dataset_id} not found in PRIDE")
+            logger.error(f"HTTP error retrieving {dataset_id}: {e}")
+            raise
+            
+        logger.info(f"Successfully retrieved metadata for {dataset_id}")
+        return metadata
+    
+    async def aget_dataset_files(self, dataset_id: str) -> List[Dict]:
+        """
+        Get list of files available for a dataset (see get_dataset_files).
+        
+        Args:
+            dataset_id: PRIDE dataset accession
+            
+        Returns:
+            List of file metadata (name, size, type, download URL)
+            
+        Raises:
+            ValueError: If no files are found for the dataset
+            httpx.HTTPError: If API error
+        """
+        logger.info(f"Fetching file list for dataset: {dataset_id}")
+        
+        cache_key = self._get_cache_key("files", dataset_id=dataset_id)
+        
+        try:
+            file_list = await self._acached_get(cache_key, self._files_url(dataset_id),
+                                                parse=self._parse_file_list)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.error(f"Files not found for dataset {dataset_id}")
+                raise ValueError(f"No files found for dataset {dataset_id}")
+            logger.error(f"HTTP error retrieving files for {dataset_id}: {e}")
+            raise
+            
+        logger.info(f"Found {len(file_list)} files for dataset {dataset_id}")
+        return file_list
+    
+    async def asearch_datasets(self, query: str, page_size: int = 10) -> List[Dict]:
+        """
+        Search for datasets in PRIDE (see search_datasets).
+        
+        Args:
+            query: Search query string
+            page_size: Number of results per page
+            
+        Returns:
+            List of dataset metadata dictionaries
+        """
+        logger.info(f"Searching for datasets with query: '{query}'")
+        
+        # Same per-page cache entries as PRIDEClient.iter_search_datasets
+        cache_key = self._get_cache_key("search", query=query, page_size=page_size, page=0)
+        results = await self._acached_get(cache_key, f"{self.base_url}/search/projects",
+                                          params=self._search_params(query, page_size, page=0),
+                                          parse=self._extract_search_results)
+        
+        logger.info(f"Found {len(results)} datasets matching '{query}'")
+        return results
+    
+    async def aget_many_datasets_metadata(
+        self, dataset_ids: List[str]
+    ) -> Tuple[Dict[str, Dict], Dict[str, Exception]]:
+        """
+        Retrieve metadata for many datasets concurrently.
+        
+        Args:
+            dataset_ids: PRIDE dataset accessions
+            
+        Returns:
+            Tuple of (metadata by accession, exception by accession) so one
+            failing accession does not abort the batch
+        """
+        unique_ids = list(dict.fromkeys(dataset_ids))
+        outcomes = await asyncio.gather(
+            *(self.aget_dataset_metadata(dataset_id) for dataset_id in unique_ids),
+            return_exceptions=True,
+        )
+        
+        results, errors = {}, {}
+        for dataset_id, outcome in zip(unique_ids, outcomes):
+            if isinstance(outcome, Exception):
+                errors[dataset_id] = outcome
+            else:
+                results[dataset_id] = outcome
+                
+        logger.info(f"Retrieved metadata for {len(results)}/{len(unique_ids)} datasets "
+                    f"({len(errors)} failed)")
+        return results, errors
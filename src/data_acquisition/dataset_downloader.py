@@ -4,43 +4,308 @@ Dataset Downloader
 High-level interface for downloading complete datasets from PRIDE.
 """
 
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .pride_api import PRIDEClient, partial_download_size
 
 logger = logging.getLogger(__name__)
 
+# Checksum algorithm by hex digest length
+CHECKSUM_ALGORITHMS = {32: "md5", 40: "sha1", 64: "sha256"}
+
+# Compression suffixes ignored when matching file extensions
+COMPRESSED_SUFFIXES = (".gz", ".zip", ".bz2", ".xz", ".zst")
+
+# Default limit on simultaneous connections (files x segments per file)
+MAX_SOCKETS = 16
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the combined rate of several streams.
+    
+    ``consume`` blocks until the requested number of tokens (bytes) is
+    available. The bucket holds at most one second of tokens, so bursts stay
+    short.
+    """
+    
+    def __init__(self, rate: float):
+        """
+        Create a token bucket.
+        
+        Args:
+            rate: Tokens (bytes) added per second
+        """
+        self.rate = rate
+        self.capacity = rate
+        self._tokens = rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, amount: int) -> None:
+        """Take ``amount`` tokens, sleeping until they are available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Go into debt for chunks larger than the bucket; later callers wait it off
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
 
 class DatasetDownloader:
     """
     Downloads complete proteomics datasets from PRIDE repository.
+    
+    Files are listed with PRIDEClient.get_dataset_files, optionally filtered
+    by category or extension, and downloaded concurrently into
+    ``output_dir/<dataset_id>``. Files already present with the expected size
+    (and checksum, if verification is enabled) are skipped, so a rerun only
+    fetches what is missing.
     """
     
-    def __init__(self, output_dir: str = "data/raw", use_cache: bool = True):
+    def __init__(self, output_dir: str = "data/raw", use_cache: bool = True,
+                 client: Optional[PRIDEClient] = None,
+                 max_connections: int = 4,
+                 max_bytes_per_second: Optional[float] = None,
+                 verify_checksums: bool = False,
+                 segments: int = 1,
+                 max_sockets: int = MAX_SOCKETS):
         """
         Initialize dataset downloader.
         
         Args:
             output_dir: Directory to save downloaded files
-            use_cache: Whether to use cached downloads
+            use_cache: Whether to use cached downloads (skip files that are
+                already complete)
+            client: PRIDE client to use (default: a new PRIDEClient)
+            max_connections: Maximum number of concurrent downloads (default: 4)
+            max_bytes_per_second: Combined bandwidth limit of all downloads
+                (default: unlimited)
+            verify_checksums: Verify the checksum of existing files before
+                skipping them, when PRIDE provides one (default: False)
+            segments: Parallel range requests per large HTTP file, see
+                PRIDEClient.download_file (default: 1)
+            max_sockets: Maximum number of simultaneous connections;
+                segments (then max_connections) are reduced so that
+                segments x max_connections stays within it (default: 16)
+        
+        Raises:
+            ValueError: If max_connections or max_sockets is less than 1
         """
+        if max_connections < 1:
+            raise ValueError(f"max_connections must be at least 1, got {max_connections}")
+        if max_sockets < 1:
+            raise ValueError(f"max_sockets must be at least 1, got {max_sockets}")
+        
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.use_cache = use_cache
+        self.client = client if client is not None else PRIDEClient()
+        self.max_connections = min(max_connections, max_sockets)
+        self.max_bytes_per_second = max_bytes_per_second
+        self.verify_checksums = verify_checksums
+        self.segments = max(1, min(segments, max_sockets // self.max_connections))
+        if (self.max_connections, self.segments) != (max_connections, segments):
+            logger.warning(f"{max_connections} connections x {segments} segments exceeds "
+                           f"{max_sockets} sockets, using {self.max_connections} x {self.segments}")
         logger.info(f"Initialized downloader with output dir: {output_dir}")
     
-    def download_dataset(self, dataset_id: str, file_types: Optional[list] = None) -> Path:
+    def download_dataset(self, dataset_id: str, file_types: Optional[list] = None,
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> Path:
         """
         Download a complete dataset from PRIDE.
         
         Args:
             dataset_id: PRIDE accession (e.g., "PXD005011")
             file_types: List of file types to download (e.g., ["mzTab", "csv"])
-                       If None, downloads all available files
-                       
+                       If None, downloads all available files. Each entry
+                       matches a file category (e.g., "RESULT", "RAW") or a
+                       file extension, ignoring compression suffixes
+            progress_callback: Called with (bytes downloaded, total bytes)
+                across all files as data arrives
+        
         Returns:
             Path to directory containing downloaded files
+        
+        Raises:
+            RuntimeError: If any file failed to download (the others are kept)
         """
-        # TODO: Implement dataset download
         logger.info(f"Downloading dataset: {dataset_id}")
-        raise NotImplementedError("Dataset download not yet implemented")
+        
+        files = self.select_files(self.client.get_dataset_files(dataset_id), file_types)
+        dataset_dir = self.output_dir / dataset_id
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        
+        pending = []
+        seen = set()
+        for file_info in files:
+            if not file_info.get("downloadUrl"):
+                logger.warning(f"No download URL for {file_info.get('fileName')}, skipping")
+                continue
+            name = self._local_name(file_info.get("fileName") or "")
+            if name is None:
+                logger.warning(f"Invalid file name {file_info.get('fileName')!r}, skipping")
+                continue
+            # Listed names that differ only by directory (or case) share a
+            # target; downloading both would interleave them in one .part file
+            if name.lower() in seen:
+                logger.warning(f"Duplicate file name {file_info.get('fileName')!r}, skipping")
+                continue
+            seen.add(name.lower())
+            target = dataset_dir / name
+            if self.use_cache and self._is_complete(target, file_info):
+                logger.info(f"Already downloaded: {target.name}")
+                continue
+            pending.append((file_info, target))
+        
+        logger.info(f"{len(files)} files selected, {len(pending)} to download")
+        if pending:
+            self._download_files(pending, dataset_dir, progress_callback)
+        
+        return dataset_dir
+    
+    @staticmethod
+    def _local_name(file_name: str) -> Optional[str]:
+        """Final component of a listed file name, or None if it is not a usable file name."""
+        # Listings come from the server: drop any directory part, either separator
+        name = Path(file_name.replace("\\", "/")).name
+        if name in ("", ".", ".."):
+            return None
+        return name
+    
+    @staticmethod
+    def select_files(files: List[Dict], file_types: Optional[list] = None) -> List[Dict]:
+        """
+        Filter a file listing by category or extension.
+        
+        Args:
+            files: File metadata from PRIDEClient.get_dataset_files
+            file_types: Categories or extensions to keep (case-insensitive);
+                None keeps all files
+        
+        Returns:
+            Matching files, in listing order
+        """
+        if not file_types:
+            return list(files)
+        
+        wanted = {t.lower().lstrip(".") for t in file_types}
+        selected = []
+        for file_info in files:
+            category = (file_info.get("fileCategory") or "").lower()
+            name = (file_info.get("fileName") or "").lower()
+            for suffix in COMPRESSED_SUFFIXES:
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    break
+            extension = name.rsplit(".", 1)[-1] if "." in name else ""
+            if category in wanted or extension in wanted:
+                selected.append(file_info)
+        return selected
+    
+    def _is_complete(self, path: Path, file_info: Dict) -> bool:
+        """Check whether a previously downloaded file matches its listing."""
+        if not path.is_file():
+            return False
+        
+        expected_size = file_info.get("fileSizeBytes")
+        if expected_size is not None and path.stat().st_size != expected_size:
+            return False
+        if expected_size is None and path.stat().st_size == 0:
+            return False
+        
+        checksum = file_info.get("checksum")
+        if self.verify_checksums and checksum:
+            algorithm = CHECKSUM_ALGORITHMS.get(len(checksum))
+            if algorithm is None:
+                logger.warning(f"Unknown checksum format for {path.name}: {checksum}")
+            elif file_checksum(path, algorithm) != checksum.lower():
+                logger.warning(f"Checksum mismatch for {path.name}, downloading again")
+                return False
+        return True
+    
+    def _download_files(self, files: List[Tuple[Dict, Path]], dataset_dir: Path,
+                        progress_callback: Optional[Callable[[int, int], None]]) -> None:
+        """
+        Download files concurrently with aggregated progress and a shared rate limit.
+        
+        Bytes already held by interrupted downloads, which download_file
+        resumes, count as downloaded from the start.
+        """
+        total_size = sum(file_info.get("fileSizeBytes") or 0 for file_info, _ in files)
+        bucket = TokenBucket(self.max_bytes_per_second) if self.max_bytes_per_second else None
+        lock = threading.Lock()
+        downloaded = 0
+        for file_info, target in files:
+            resumed = partial_download_size(target)
+            if file_info.get("fileSizeBytes") is not None:
+                resumed = min(resumed, file_info["fileSizeBytes"])
+            downloaded += resumed
+        
+        with tqdm(total=total_size, initial=downloaded, unit='B', unit_scale=True,
+                  unit_divisor=1024, desc=dataset_dir.name) as pbar:
+            
+            def on_chunk(size: int) -> None:
+                nonlocal downloaded
+                if bucket is not None:
+                    bucket.consume(size)
+                with lock:
+                    downloaded += size
+                    pbar.update(size)
+                    if progress_callback is not None:
+                        progress_callback(downloaded, total_size)
+            
+            failed = {}
+            with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+                futures = {
+                    executor.submit(self.client.download_file, file_info["downloadUrl"],
+                                    str(target),
+                                    progress_callback=on_chunk,
+                                    expected_size=file_info.get("fileSizeBytes"),
+                                    segments=self.segments): target.name
+                    for file_info, target in files
+                }
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed[futures[future]] = e
+        
+        if failed:
+            for name, error in failed.items():
+                logger.error(f"Failed to download {name}: {error}")
+            raise RuntimeError(f"{len(failed)} of {len(files)} files failed to download: "
+                               f"{', '.join(sorted(failed))}")
+
+
+def file_checksum(path: Path, algorithm: str = "sha1", block_size: int = 1 << 20) -> str:
+    """
+    Compute the hex digest of a file.
+    
+    Args:
+        path: File to hash
+        algorithm: hashlib algorithm name (default: sha1, as used by PRIDE)
+        block_size: Read size in bytes (default: 1 MB)
+    
+    Returns:
+        Lowercase hex digest
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
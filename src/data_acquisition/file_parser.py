@@ -4,13 +4,100 @@ File Parser
 Parses various proteomics file formats (mzTab, CSV, etc.).
 """
 
+import numpy as np
 import pandas as pd
+import bz2
+import codecs
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import lzma
 import logging
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import (BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, TextIO,
+                    Tuple, Union)
+
+from .mztab_schema import MZTAB_NA_VALUES, apply_mztab_schema, apply_table_schema, mztab_dtypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pa_csv = None
+    feather = None
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None
+
+try:
+    from isal import igzip_threaded
+except ImportError:  # pragma: no cover - optional dependency
+    igzip_threaded = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+# Bump when parser output changes so stale cache entries are not reused
+PARSE_CACHE_VERSION = 1
+
+# mzTab data sections: name -> (header line prefix, row line prefix)
+MZTAB_SECTIONS = {
+    "protein": ("PRH", "PRT"),
+    "peptide": ("PEH", "PEP"),
+    "psm": ("PSH", "PSM"),
+}
+
+# Section header prefixes, including the small molecule section we do not parse
+MZTAB_HEADER_PREFIXES = tuple(h for h, _ in MZTAB_SECTIONS.values()) + ("SMH",)
+
+# Leading bytes of the compression formats PRIDE files are shipped in
+COMPRESSION_MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# Suffixes stripped before choosing a parser (e.g. data.mztab.gz -> .mztab)
+COMPRESSION_SUFFIXES = {".gz", ".bz2", ".xz", ".zst"}
+
+# Per-sample intensity columns in wide tables (MaxQuant, DIA-NN, Spectronaut, ...),
+# one pattern per quantity family in order of preference. Bare totals
+# ("Intensity", "iBAQ") and SILAC channels ("Intensity L S1") do not match.
+INTENSITY_COLUMN_FAMILIES = [
+    r"^lfq intensity (?![lmh]( |$))",
+    r"^ibaq (?!peptides$)(?![lmh]( |$))",
+    r"^intensity (?![lmh]( |$))",
+    r"^(abundance|quantity)\b.+",
+    r"\.(raw|d|mzml)$",
+]
+
+# Indexed MTD elements grouped by MzTabFile (e.g. "assay[1]-ms_run_ref")
+MZTAB_INDEXED_ELEMENT = re.compile(r"^(ms_run|assay|study_variable|sample)\[(\d+)\]-(.+)$")
+
+
+class IntensityMatrix(NamedTuple):
+    """Numeric block of a wide intensity table (see FileParser.load_intensity_matrix)."""
+    values: np.ndarray
+    proteins: pd.Index
+    samples: List[str]
+
 
 class FileParser:
     """
@@ -22,38 +109,288 @@ class FileParser:
     - Excel files
     """
     
-    def __init__(self):
-        """Initialize file parser."""
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 cache_enabled: bool = False,
+                 cache_validation: str = "stat",
+                 decompression_threads: int = 1):
+        """
+        Initialize file parser.
+        
+        Args:
+            cache_dir: Directory for cached parse results (default: data/cache/parsed)
+            cache_enabled: Cache parse_file results as Feather files (default: False)
+            cache_validation: How cache entries are keyed: "stat" (path, size
+                              and mtime) or "content" (hash of the file bytes)
+            decompression_threads: Background threads for gzip decompression
+                                   when python-isal is installed (0 disables)
+        """
+        if cache_validation not in ("stat", "content"):
+            raise ValueError(
+                f"Unknown cache validation: {cache_validation} (expected 'stat' or 'content')"
+            )
+        
+        self.cache_enabled = cache_enabled
+        self.cache_validation = cache_validation
+        self.decompression_threads = decompression_threads
+        
+        # Set up cache directory
+        if cache_dir is None:
+            self.cache_dir = Path("data/cache/parsed")
+        else:
+            self.cache_dir = Path(cache_dir)
+        
+        if self.cache_enabled:
+            if feather is None:
+                logger.warning("pyarrow is not installed, parse cache disabled")
+                self.cache_enabled = False
+            else:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                logger.info(f"Parse cache enabled: {self.cache_dir}")
+        
         logger.info("Initialized file parser")
     
     def parse_file(self, file_path: str) -> pd.DataFrame:
         """
         Auto-detect format and parse file.
         
+        With caching enabled, the parsed DataFrame is stored as an
+        uncompressed Feather (Arrow IPC) file and later calls memory-map
+        it instead of parsing the file again.
+        
         Args:
             file_path: Path to proteomics data file
             
         Returns:
             DataFrame containing parsed data
         """
-        path = Path(file_path)
+        return self._parse_with_cache(Path(file_path))[0]
+        
+    def _parse_with_cache(self, path: Path) -> Tuple[pd.DataFrame, Optional[Path]]:
+        """
+        Parse a file through the parse cache (if enabled).
+        
+        Args:
+            path: Path to proteomics data file
         
+        Returns:
+            Tuple of (DataFrame, cache file holding it, or None if caching is
+            disabled or the cache could not be written)
+        """
         if not path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
+            raise FileNotFoundError(f"File not found: {path}")
         
-        # Determine file type and parse accordingly
-        suffix = path.suffix.lower()
+        # Determine file type and parse accordingly; compressed files are
+        # decompressed on the fly by the parsers
+        suffix = self._format_suffix(path)
         
         if suffix == ".mztab":
-            return self.parse_mztab(file_path)
+            parse = self.parse_mztab
         elif suffix in [".csv", ".tsv", ".txt"]:
-            return self.parse_tabular(file_path)
+            parse = self.parse_tabular
         elif suffix in [".xlsx", ".xls"]:
-            return self.parse_excel(file_path)
+            parse = self.parse_excel
         else:
             raise ValueError(f"Unsupported file format: {suffix}")
+        
+        if not self.cache_enabled:
+            return parse(str(path)), None
+        
+        cache_file = self.cache_dir / f"{self._get_cache_key(path)}.feather"
+        df = self._load_from_cache(cache_file)
+        if df is None:
+            df = parse(str(path))
+            if not self._save_to_cache(cache_file, df):
+                return df, None
+        return df, cache_file
     
-    def parse_mztab(self, file_path: str) -> pd.DataFrame:
+    def parse_files(self, file_paths: List[str],
+                    max_workers: Optional[int] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Parse many files in parallel worker processes.
+        
+        Each file is parsed with parse_file in a process pool and results
+        are yielded as soon as each file finishes, so the order may differ
+        from ``file_paths``. Workers hand results back as uncompressed
+        Feather files rather than pickled DataFrames: the parse cache file
+        if caching is enabled, otherwise a temporary file. Only the path
+        crosses the process boundary; the file is memory-mapped here.
+        
+        Args:
+            file_paths: Paths of files to parse
+            max_workers: Number of worker processes (default: CPU count)
+            
+        Yields:
+            Tuples of (file path, parsed DataFrame)
+            
+        Raises:
+            Any exception raised while parsing a file
+        """
+        file_paths = [str(file_path) for file_path in file_paths]
+        max_workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+        
+        if max_workers <= 1:
+            for file_path in file_paths:
+                yield file_path, self.parse_file(file_path)
+            return
+        
+        logger.info(f"Parsing {len(file_paths)} files with {max_workers} workers")
+        options = {
+            "cache_dir": self.cache_dir,
+            "cache_enabled": self.cache_enabled,
+            "cache_validation": self.cache_validation,
+            "decompression_threads": self.decompression_threads,
+        }
+        
+        # Unlinked once mapped (POSIX keeps the mapping); leftovers, e.g. on
+        # Windows, go with the directory
+        with tempfile.TemporaryDirectory(prefix="parse_files_",
+                                         ignore_cleanup_errors=True) as transfer_dir:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_parse_file_worker, options, file_path,
+                                    transfer_dir): file_path
+                    for file_path in file_paths
+                }
+                try:
+                    for future in as_completed(futures):
+                        file_path = futures[future]
+                        kind, payload = future.result()
+                        yield file_path, self._unpack_worker_result(kind, payload)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    
+    def _unpack_worker_result(self, kind: str, payload) -> pd.DataFrame:
+        """Rebuild a DataFrame returned by _parse_file_worker."""
+        if kind == "frame":
+            return payload
+        
+        path = Path(payload)
+        table = feather.read_table(path, memory_map=True)
+        if kind == "transfer":
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        # split_blocks lets numeric columns without nulls stay zero-copy
+        return table.to_pandas(split_blocks=True)
+    
+    def _get_cache_key(self, path: Path) -> str:
+        """Generate a cache key identifying a file's current contents."""
+        if self.cache_validation == "content":
+            digest = hashlib.blake2b(digest_size=16)
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            identity = f"{path.suffix.lower()}_{digest.hexdigest()}"
+        else:
+            stat = path.stat()
+            identity = f"{path.resolve()}_{stat.st_size}_{stat.st_mtime_ns}"
+        
+        cache_str = f"{PARSE_CACHE_VERSION}_{identity}"
+        return hashlib.md5(cache_str.encode()).hexdigest()
+    
+    def _load_from_cache(self, cache_file: Path) -> Optional[pd.DataFrame]:
+        """Memory-map a cached parse result if present."""
+        if not cache_file.exists():
+            logger.debug(f"Parse cache miss: {cache_file.name}")
+            return None
+        
+        try:
+            table = feather.read_table(cache_file, memory_map=True)
+            # split_blocks lets numeric columns without nulls stay zero-copy
+            df = table.to_pandas(split_blocks=True)
+            logger.info(f"Parse cache hit: {cache_file.name} ({len(df)} rows)")
+            return df
+        except Exception as e:
+            logger.warning(f"Failed to load parse cache {cache_file.name}: {e}")
+            return None
+    
+    def _save_to_cache(self, cache_file: Path, df: pd.DataFrame) -> bool:
+        """Save a parse result as an uncompressed Feather file; False if that failed."""
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            # Uncompressed so the cache can be memory-mapped on load
+            feather.write_feather(df, tmp_file, compression='uncompressed')
+            os.replace(tmp_file, cache_file)
+            logger.debug(f"Saved to parse cache: {cache_file.name}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to save parse cache {cache_file.name}: {e}")
+            tmp_file.unlink(missing_ok=True)
+            return False
+    
+    @staticmethod
+    def detect_compression(file_path: str) -> Optional[str]:
+        """
+        Detect the compression format of a file from its magic bytes.
+        
+        Args:
+            file_path: Path to file
+            
+        Returns:
+            "gzip", "bz2", "xz" or "zstd", or None for uncompressed files
+        """
+        with open(file_path, 'rb') as f:
+            head = f.read(6)
+        for codec, magic in COMPRESSION_MAGIC.items():
+            if head.startswith(magic):
+                return codec
+        return None
+    
+    def _open_binary(self, file_path: str) -> BinaryIO:
+        """Open a file for binary reading, decompressing it as a stream if needed."""
+        codec = self.detect_compression(file_path)
+        
+        if codec is None:
+            return open(file_path, 'rb')
+        
+        logger.debug(f"Reading {codec}-compressed file: {file_path}")
+        if codec == "gzip":
+            if igzip_threaded is not None and self.decompression_threads > 0:
+                # Decompresses in background threads while the parser reads
+                return igzip_threaded.open(file_path, 'rb', threads=self.decompression_threads)
+            return gzip.open(file_path, 'rb')
+        elif codec == "bz2":
+            return bz2.open(file_path, 'rb')
+        elif codec == "xz":
+            return lzma.open(file_path, 'rb')
+        
+        if zstandard is None:
+            raise ImportError(f"zstandard is required to read zstd-compressed file: {file_path}")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, 'rb'), read_across_frames=True, closefd=True
+        )
+        return io.BufferedReader(reader, buffer_size=1 << 20)
+    
+    def _open_seekable(self, file_path: str) -> BinaryIO:
+        """
+        Open a file for random-access binary reading.
+        
+        Compressed files are decompressed into a temporary file (kept in
+        memory up to 64 MB), since zip-based formats such as .xlsx need to
+        seek.
+        """
+        if self.detect_compression(file_path) is None:
+            return open(file_path, 'rb')
+        
+        buffer = tempfile.SpooledTemporaryFile(max_size=64 * 1024 ** 2)
+        try:
+            with self._open_binary(file_path) as f:
+                shutil.copyfileobj(f, buffer, 1 << 20)
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer
+    
+    def _open_text(self, file_path: str) -> TextIO:
+        """Open a (possibly compressed) UTF-8 file for text reading."""
+        return io.TextIOWrapper(self._open_binary(file_path), encoding='utf-8')
+    
+    def parse_mztab(self, file_path: str, section: Optional[str] = None,
+                    engine: str = "c", typed: bool = True) -> pd.DataFrame:
         """
         Parse mzTab format file.
         
@@ -65,6 +402,16 @@ class FileParser:
         
         Args:
             file_path: Path to mzTab file
+            section: Section to return ("protein", "peptide" or "psm").
+                     If None, returns the first section with data, preferring
+                     proteins, then peptides, then PSMs.
+            engine: "c" parses the section's byte range with the pandas C
+                    reader; "python" splits lines in a pure-Python loop
+            typed: Convert columns to the mzTab schema dtypes (float32
+                   abundances, nullable integer counts, categorical
+                   accessions, "null" as missing). If False, the C engine
+                   uses pandas type inference and the Python engine
+                   returns strings.
             
         Returns:
             DataFrame with protein quantification data
@@ -75,69 +422,331 @@ class FileParser:
         """
         logger.info(f"Parsing mzTab file: {file_path}")
         
+        if engine == "c":
+            span = self._find_mztab_span(file_path, section)
+            if span is not None and span["contiguous"]:
+                df = self._read_mztab_span(file_path, span, typed)
+            else:
+                chunks = list(self._iter_mztab_python(file_path, section, None, typed))
+                df = chunks[0] if chunks else None
+        elif engine == "python":
+            chunks = list(self._iter_mztab_python(file_path, section, None, typed))
+            df = chunks[0] if chunks else None
+        else:
+            raise ValueError(f"Unknown mzTab engine: {engine} (expected 'c' or 'python')")
+        
+        if df is None:
+            logger.warning("No data found in mzTab file")
+            return pd.DataFrame()
+        
+        logger.info(f"Parsed {len(df)} {df.attrs['mztab_section']} rows from mzTab")
+        return df
+    
+    def iter_mztab_chunks(self, file_path: str, section: Optional[str] = None,
+                          chunksize: int = 50_000, engine: str = "c",
+                          typed: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Stream one mzTab section as DataFrame chunks.
+        
+        Only rows of the requested section are parsed; lines of every other
+        section are skipped on their prefix alone, and reading stops as soon
+        as the section ends. Peak memory is therefore bounded by
+        ``chunksize`` rather than by the file size.
+        
+        Args:
+            file_path: Path to mzTab file
+            section: Section to stream ("protein", "peptide" or "psm").
+                     If None, streams the first section with data rows.
+            chunksize: Maximum number of rows per yielded DataFrame
+            engine: "c" (pandas C reader over the section's byte range) or
+                    "python" (line-splitting loop)
+            typed: Convert each chunk to the mzTab schema dtypes. Note that
+                   categorical columns get per-chunk categories.
+            
+        Yields:
+            DataFrames of at most ``chunksize`` rows. The section name is
+            stored in ``df.attrs['mztab_section']``.
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If section or engine is unknown
+        """
+        if engine == "c":
+            span = self._find_mztab_span(file_path, section)
+            if span is None:
+                return
+            if span["contiguous"]:
+                yield from self._iter_mztab_span(file_path, span, chunksize, typed)
+                return
+            logger.debug(f"{span['section']} section is interleaved, using python engine")
+        elif engine != "python":
+            raise ValueError(f"Unknown mzTab engine: {engine} (expected 'c' or 'python')")
+        
+        yield from self._iter_mztab_python(file_path, section, chunksize, typed)
+    
+    def scan_mztab_sections(self, file_path: str, sections: Optional[List[str]] = None,
+                            first_with_data: bool = False) -> Dict[str, dict]:
+        """
+        Record the byte offsets of each mzTab data section.
+        
+        The scan reads the file in binary mode and only looks at the line
+        prefix, so it is much cheaper than parsing. It stops as soon as all
+        requested sections are complete.
+        
+        Args:
+            file_path: Path to mzTab file
+            sections: Sections to locate (default: all)
+            first_with_data: Stop after the first section that has data rows
+            
+        Returns:
+            Dictionary mapping section name to a span dict with keys:
+            ``section``, ``header`` (column names), ``start``/``end`` (byte
+            range of the data rows), ``rows`` (row count) and ``contiguous``
+            (False if other lines are interleaved with the rows)
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If a section name is unknown
+        """
+        spans, _ = self._scan_mztab(file_path, sections, first_with_data)
+        return spans
+    
+    def read_mztab(self, file_path: str, lazy: bool = True, typed: bool = True) -> "MzTabFile":
+        """
+        Read metadata and all data sections of an mzTab file in one scan.
+        
+        A single binary pass collects the MTD metadata and the byte range of
+        every section. Section DataFrames are then parsed from their own
+        byte ranges, either on first access (``lazy=True``) or immediately.
+        
+        Args:
+            file_path: Path to mzTab file
+            lazy: Parse sections on first access instead of up front
+            typed: Convert columns to the mzTab schema dtypes
+            
+        Returns:
+            MzTabFile with metadata, ms_run/assay/study_variable mappings and
+            protein/peptide/PSM DataFrames
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+        """
+        logger.info(f"Reading mzTab file: {file_path}")
+        
+        spans, metadata = self._scan_mztab(file_path, collect_metadata=True)
+        result = MzTabFile(file_path, metadata, spans,
+                           loader=lambda span: self._load_mztab_section(file_path, span, typed))
+        
+        if not lazy:
+            for name in result.sections:
+                result.section(name)
+        
+        logger.info(
+            f"Found {len(metadata)} metadata fields and sections: "
+            + ", ".join(f"{name} ({spans[name]['rows']} rows)" for name in result.sections)
+        )
+        return result
+    
+    def _scan_mztab(self, file_path: str, sections: Optional[List[str]] = None,
+                    first_with_data: bool = False,
+                    collect_metadata: bool = False) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Scan section byte ranges and, optionally, MTD metadata in one pass."""
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Read file and separate sections
-        metadata = []
-        protein_header = None
-        protein_rows = []
-        peptide_header = None
-        peptide_rows = []
-        psm_header = None
-        psm_rows = []
+        wanted = self._check_sections(sections)
+        header_tags = {f"{h}\t".encode(): name for name, (h, _) in MZTAB_SECTIONS.items()}
+        row_tags = {f"{r}\t".encode(): name for name, (_, r) in MZTAB_SECTIONS.items()}
         
-        with open(file_path, 'r', encoding='utf-8') as f:
+        spans = {}
+        metadata = {}
+        current = None
+        pos = 0
+        
+        with self._open_binary(file_path) as f:
             for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+                line_start = pos
+                pos += len(line)
+                tag = line[:4]
                 
-                # Split by tab
-                fields = line.split('\t')
-                prefix = fields[0]
-                
-                # Metadata lines
-                if prefix == 'MTD':
-                    metadata.append(fields)
+                if tag in row_tags and row_tags[tag] == current:
+                    span = spans[current]
+                    if span["rows"] == 0:
+                        span["start"] = line_start
+                    elif span["end"] != line_start:
+                        span["contiguous"] = False
+                    span["end"] = pos
+                    span["rows"] += 1
+                elif tag in header_tags:
+                    if current is not None and (
+                        all(name in spans for name in wanted)
+                        or (first_with_data and spans[current]["rows"])
+                    ):
+                        break
+                    current = header_tags[tag]
+                    header = line.decode('utf-8').rstrip('\r\n').split('\t')[1:]
+                    spans[current] = {
+                        "section": current, "header": header,
+                        "start": pos, "end": pos, "rows": 0, "contiguous": True,
+                    }
+                elif not line.strip() and current is not None and spans[current]["end"] == line_start:
+                    # Blank lines are skipped by the C reader as well
+                    spans[current]["end"] = pos
+                elif collect_metadata and tag == b"MTD\t":
+                    self._add_metadata_line(metadata, line.decode('utf-8'))
+        
+        for span in spans.values():
+            if span["rows"] == 0:
+                span["end"] = span["start"]
+        
+        spans = {name: span for name, span in spans.items() if name in wanted}
+        return spans, metadata
+    
+    def _load_mztab_section(self, file_path: str, span: dict, typed: bool) -> pd.DataFrame:
+        """Parse a scanned section, falling back to Python for interleaved rows."""
+        if span["rows"] == 0:
+            df = pd.DataFrame(columns=span["header"])
+            df.attrs['mztab_section'] = span["section"]
+            return df
+        if span["contiguous"]:
+            return self._read_mztab_span(file_path, span, typed)
+        return next(self._iter_mztab_python(file_path, span["section"], None, typed))
+    
+    def _find_mztab_span(self, file_path: str, section: Optional[str]) -> Optional[dict]:
+        """Locate the byte span of the requested (or first non-empty) section."""
+        if section is not None:
+            span = self.scan_mztab_sections(file_path, [section]).get(section)
+            return span if span is not None and span["rows"] else None
+        
+        spans = self.scan_mztab_sections(file_path, first_with_data=True)
+        for name in MZTAB_SECTIONS:
+            if name in spans and spans[name]["rows"]:
+                return spans[name]
+        return None
+    
+    def _read_mztab_span(self, file_path: str, span: dict, typed: bool) -> pd.DataFrame:
+        """Parse one section's byte range with the pandas C reader."""
+        options = self._span_csv_options(span)
+        
+        if typed:
+            # Let the C reader build the schema dtypes directly; columns are
+            # addressed by position as the header is attached afterwards
+            dtypes = mztab_dtypes(span["header"])
+            options["dtype"] = {
+                i + 1: dtypes[name] for i, name in enumerate(span["header"]) if name in dtypes
+            }
+            try:
+                with self._open_binary(file_path) as f:
+                    df = pd.read_csv(_ByteRangeReader(f, span["start"], span["end"]), **options)
+                return self._finish_span_frame(df, span)
+            except ValueError as e:
+                logger.warning(f"Schema dtypes do not fit {span['section']} data ({e}), coercing")
+                del options["dtype"]
+        
+        with self._open_binary(file_path) as f:
+            df = pd.read_csv(_ByteRangeReader(f, span["start"], span["end"]), **options)
+        df = self._finish_span_frame(df, span)
+        return apply_mztab_schema(df) if typed else df
+    
+    def _iter_mztab_span(self, file_path: str, span: dict, chunksize: int,
+                         typed: bool) -> Iterator[pd.DataFrame]:
+        """Parse one section's byte range in chunks with the pandas C reader."""
+        with self._open_binary(file_path) as f:
+            with pd.read_csv(_ByteRangeReader(f, span["start"], span["end"]),
+                             chunksize=chunksize, **self._span_csv_options(span)) as reader:
+                for chunk in reader:
+                    chunk = self._finish_span_frame(chunk, span)
+                    yield apply_mztab_schema(chunk) if typed else chunk
+    
+    @staticmethod
+    def _span_csv_options(span: dict) -> dict:
+        """read_csv options for the data rows of an mzTab section."""
+        return {
+            "sep": '\t',
+            "header": None,
+            # Column 0 is the PRT/PEP/PSM line prefix
+            "usecols": range(1, len(span["header"]) + 1),
+            "quoting": csv.QUOTE_NONE,
+            "na_values": MZTAB_NA_VALUES,
+            "encoding": 'utf-8',
+            "engine": 'c',
+        }
+    
+    @staticmethod
+    def _finish_span_frame(df: pd.DataFrame, span: dict) -> pd.DataFrame:
+        """Attach the section header and name to a frame read from a span."""
+        df.columns = span["header"]
+        df.attrs['mztab_section'] = span["section"]
+        return df
+    
+    def _iter_mztab_python(self, file_path: str, section: Optional[str],
+                           chunksize: Optional[int], typed: bool) -> Iterator[pd.DataFrame]:
+        """Stream a section by splitting lines in Python."""
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        candidates = self._check_sections([section] if section is not None else None)
+        header_tags = {
+            f"{MZTAB_SECTIONS[name][0]}\t": name for name in candidates
+        }
+        all_header_tags = tuple(f"{prefix}\t" for prefix in MZTAB_HEADER_PREFIXES)
+        
+        current = None
+        header = None
+        row_tag = None
+        rows = []
+        n_rows = 0
+        
+        with self._open_text(file_path) as f:
+            for line in f:
+                if row_tag is not None and line.startswith(row_tag):
+                    rows.append(line.rstrip('\r\n').split('\t')[1:])
+                    if chunksize is not None and len(rows) >= chunksize:
+                        yield self._rows_to_frame(rows, header, current, typed)
+                        n_rows += len(rows)
+                        rows = []
+                    continue
                 
-                # Protein section
-                elif prefix == 'PRH':
-                    protein_header = fields[1:]  # Skip 'PRH' prefix
-                elif prefix == 'PRT':
-                    protein_rows.append(fields[1:])  # Skip 'PRT' prefix
+                if not line.startswith(all_header_tags):
+                    continue
                 
-                # Peptide section
-                elif prefix == 'PEH':
-                    peptide_header = fields[1:]
-                elif prefix == 'PEP':
-                    peptide_rows.append(fields[1:])
+                # A new section header: sections are contiguous in mzTab, so
+                # once we have data the section we are streaming is complete
+                if n_rows or rows:
+                    break
                 
-                # PSM section
-                elif prefix == 'PSH':
-                    psm_header = fields[1:]
-                elif prefix == 'PSM':
-                    psm_rows.append(fields[1:])
-        
-        # Convert protein data to DataFrame (preferred)
-        if protein_rows and protein_header:
-            df = pd.DataFrame(protein_rows, columns=protein_header)
-            logger.info(f"Parsed {len(df)} proteins from mzTab")
-            return df
-        # Fall back to peptide data if no protein data
-        elif peptide_rows and peptide_header:
-            df = pd.DataFrame(peptide_rows, columns=peptide_header)
-            logger.info(f"Parsed {len(df)} peptides from mzTab (no protein data found)")
-            return df
-        # Fall back to PSM data if no protein or peptide data
-        elif psm_rows and psm_header:
-            df = pd.DataFrame(psm_rows, columns=psm_header)
-            logger.info(f"Parsed {len(df)} PSMs from mzTab (no protein/peptide data found)")
-            return df
-        else:
-            logger.warning("No data found in mzTab file")
-            return pd.DataFrame()
+                tag = line[:4]
+                if tag in header_tags:
+                    current = header_tags[tag]
+                    header = line.rstrip('\r\n').split('\t')[1:]
+                    row_tag = f"{MZTAB_SECTIONS[current][1]}\t"
+                elif section is not None and current is not None:
+                    break
+        
+        if rows:
+            yield self._rows_to_frame(rows, header, current, typed)
+    
+    @staticmethod
+    def _check_sections(sections: Optional[List[str]]) -> List[str]:
+        """Validate section names, defaulting to all sections."""
+        if sections is None:
+            return list(MZTAB_SECTIONS)
+        for name in sections:
+            if name not in MZTAB_SECTIONS:
+                raise ValueError(
+                    f"Unknown mzTab section: {name} (expected one of {list(MZTAB_SECTIONS)})"
+                )
+        return list(sections)
+    
+    @staticmethod
+    def _rows_to_frame(rows: List[List[str]], header: List[str], section: str,
+                       typed: bool) -> pd.DataFrame:
+        """Build a DataFrame from split mzTab rows of one section."""
+        df = pd.DataFrame(rows, columns=header)
+        df.attrs['mztab_section'] = section
+        return apply_mztab_schema(df) if typed else df
     
     def get_mztab_metadata(self, file_path: str) -> dict:
         """
@@ -152,29 +761,36 @@ class FileParser:
         logger.info(f"Extracting metadata from: {file_path}")
         
         metadata = {}
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with self._open_text(file_path) as f:
             for line in f:
-                line = line.strip()
-                if not line or not line.startswith('MTD'):
-                    continue
-                
-                # MTD lines format: MTD	key	value
-                fields = line.split('\t')
-                if len(fields) >= 3:
-                    key = fields[1]
-                    value = fields[2] if len(fields) == 3 else '\t'.join(fields[2:])
-                    metadata[key] = value
+                # Metadata precedes all data sections
+                if line.startswith(MZTAB_HEADER_PREFIXES):
+                    break
+                if line.startswith('MTD'):
+                    self._add_metadata_line(metadata, line)
         
         logger.info(f"Extracted {len(metadata)} metadata fields")
         return metadata
     
-    def parse_tabular(self, file_path: str, delimiter: Optional[str] = None) -> pd.DataFrame:
+    @staticmethod
+    def _add_metadata_line(metadata: Dict[str, str], line: str) -> None:
+        """Add one MTD line to a metadata dictionary."""
+        # MTD lines format: MTD	key	value
+        fields = line.strip().split('\t')
+        if len(fields) >= 3:
+            key = fields[1]
+            value = fields[2] if len(fields) == 3 else '\t'.join(fields[2:])
+            metadata[key] = value
+    
+    def parse_tabular(self, file_path: str, delimiter: Optional[str] = None,
+                      engine: str = "c") -> pd.DataFrame:
         """
         Parse CSV/TSV file.
         
         Args:
             file_path: Path to file
             delimiter: Column delimiter (auto-detected if None)
+            engine: pandas parser engine ("c" or the multi-threaded "pyarrow")
             
         Returns:
             DataFrame with proteomics data
@@ -187,39 +803,608 @@ class FileParser:
         
         # Auto-detect delimiter if not specified
         if delimiter is None:
-            suffix = path.suffix.lower()
-            if suffix == '.csv':
-                delimiter = ','
-            elif suffix in ['.tsv', '.txt']:
-                delimiter = '\t'
-            else:
-                # Try to detect from first line
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    first_line = f.readline()
-                    if '\t' in first_line:
-                        delimiter = '\t'
-                    else:
-                        delimiter = ','
+            delimiter = self._detect_delimiter(file_path)
         
         logger.info(f"Using delimiter: {repr(delimiter)}")
         
         # Read file with pandas
-        df = pd.read_csv(file_path, delimiter=delimiter)
+        with self._open_binary(file_path) as f:
+            df = pd.read_csv(f, delimiter=delimiter, engine=engine)
         logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
         
         return df
     
-    def parse_excel(self, file_path: str, sheet_name: str = 0) -> pd.DataFrame:
+    def load_intensity_matrix(self, file_path: str, id_column: Optional[str] = None,
+                              intensity_columns: Optional[List[str]] = None,
+                              pattern: Optional[str] = None,
+                              delimiter: Optional[str] = None,
+                              engine: str = "pyarrow") -> "IntensityMatrix":
+        """
+        Load a wide protein x sample intensity table as a float32 matrix.
+        
+        Only the identifier and intensity columns are read. With the
+        "pyarrow" engine the file is memory-mapped and parsed by Arrow's
+        multi-threaded CSV reader straight into float32 columns.
+        
+        Args:
+            file_path: Path to CSV/TSV file (may be compressed)
+            id_column: Protein identifier column (default: first column)
+            intensity_columns: Intensity columns to load (default: columns
+                               matching ``pattern``)
+            pattern: Case-insensitive regex selecting intensity columns
+                     (default: the first family in INTENSITY_COLUMN_FAMILIES
+                     with any match, e.g. only the "LFQ intensity" columns
+                     of a MaxQuant proteinGroups.txt)
+            delimiter: Column delimiter (auto-detected if None)
+            engine: "pyarrow" (multi-threaded) or "c" (pandas C reader)
+            
+        Returns:
+            IntensityMatrix with a Fortran-ordered float32 ``values`` array
+            (one contiguous column per sample; missing values are NaN), the
+            ``proteins`` index and the ``samples`` column names
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If no intensity columns are found
+        """
+        logger.info(f"Loading intensity matrix: {file_path}")
+        
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if delimiter is None:
+            delimiter = self._detect_delimiter(file_path)
+        
+        with self._open_text(file_path) as f:
+            columns = next(csv.reader([f.readline()], delimiter=delimiter))
+        
+        if id_column is None:
+            id_column = columns[0]
+        if intensity_columns is None:
+            patterns = [pattern] if pattern is not None else INTENSITY_COLUMN_FAMILIES
+            for family in patterns:
+                regex = re.compile(family, re.IGNORECASE)
+                intensity_columns = [c for c in columns if c != id_column and regex.search(c)]
+                if intensity_columns:
+                    break
+        if not intensity_columns:
+            raise ValueError(f"No intensity columns matching '{pattern or 'any known family'}' "
+                             f"in {file_path}")
+        
+        if engine == "pyarrow":
+            if pa is None:
+                raise ImportError("pyarrow is required for the 'pyarrow' engine")
+            
+            convert_options = pa_csv.ConvertOptions(
+                include_columns=[id_column] + intensity_columns,
+                column_types={column: pa.float32() for column in intensity_columns},
+                null_values=["", "NA", "NaN", "nan", "null"],
+                strings_can_be_null=True,
+            )
+            parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+            
+            if self.detect_compression(file_path) is None:
+                source = pa.memory_map(str(path))
+            else:
+                source = self._open_binary(file_path)
+            with source:
+                table = pa_csv.read_csv(source, parse_options=parse_options,
+                                        convert_options=convert_options)
+            
+            values = np.empty((table.num_rows, len(intensity_columns)), dtype=np.float32, order='F')
+            for j, column in enumerate(intensity_columns):
+                values[:, j] = table.column(column).to_numpy(zero_copy_only=False)
+            proteins = pd.Index(table.column(id_column).to_numpy(zero_copy_only=False),
+                                name=id_column)
+        elif engine == "c":
+            with self._open_binary(file_path) as f:
+                df = pd.read_csv(f, delimiter=delimiter,
+                                 usecols=[id_column] + intensity_columns,
+                                 dtype={column: np.float32 for column in intensity_columns})
+            # A single float32 block converts to a Fortran-ordered view
+            values = np.asfortranarray(df[intensity_columns].to_numpy(dtype=np.float32))
+            proteins = pd.Index(df[id_column], name=id_column)
+        else:
+            raise ValueError(f"Unknown engine: {engine} (expected 'pyarrow' or 'c')")
+        
+        logger.info(f"Loaded {values.shape[0]} proteins x {values.shape[1]} samples "
+                    f"({values.nbytes / 1e6:.1f} MB)")
+        return IntensityMatrix(values, proteins, list(intensity_columns))
+    
+    def probe(self, file_path: str, sample_bytes: int = 1 << 20) -> dict:
+        """
+        Inspect a text file cheaply by reading only a bounded prefix.
+        
+        Sniffs the encoding, delimiter, header and column dtypes from the
+        first ``sample_bytes`` (decompressed) bytes, and estimates the row
+        count from the average line length, so callers can plan memory and
+        workers before committing to a full parse.
+        
+        Args:
+            file_path: Path to CSV/TSV/mzTab file (may be compressed)
+            sample_bytes: Maximum number of bytes to read
+            
+        Returns:
+            Dictionary with keys: format ("tabular" or "mztab"), compression,
+            encoding, delimiter, columns, dtypes, file_size (bytes on disk),
+            sample_rows (data rows in the sample, without headers, comments
+            and blank lines), estimated_rows (None if it cannot be
+            estimated, e.g. for a truncated compressed sample), exact (whole
+            file was sampled) and estimated_memory_bytes (of a parsed
+            DataFrame). For
+            mzTab, columns and dtypes describe the first data section and
+            rows are counted across all sections.
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If the file is not a text format
+        """
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        suffix = self._format_suffix(path)
+        if suffix in [".xlsx", ".xls"]:
+            raise ValueError(f"Cannot probe binary format: {suffix}")
+        
+        compression = self.detect_compression(file_path)
+        with self._open_binary(file_path) as f:
+            data = f.read(sample_bytes + 1)
+        exact = len(data) <= sample_bytes
+        data = data[:sample_bytes]
+        
+        # Decode before cutting, so a multi-byte character or UTF-16 code
+        # unit split at the end of the sample is left out as a whole
+        encoding = self._sniff_encoding(data, final=exact)
+        text = codecs.getincrementaldecoder(encoding)().decode(data, final=exact)
+        if not exact:
+            # Drop the partial last line
+            text = text[:text.rfind("\n") + 1]
+        raw_lines = text.splitlines(keepends=True)
+        lines = text.splitlines()
+        
+        is_mztab = suffix == ".mztab" or (bool(lines) and lines[0].startswith("MTD\t"))
+        if is_mztab:
+            delimiter = '\t'
+            data_start = sum(1 for line in lines if line.startswith("MTD"))
+            row_prefixes = {f"{h}\t": f"{r}\t" for h, r in MZTAB_SECTIONS.values()}
+            header_index = next(
+                (i for i, line in enumerate(lines) if line[:4] in row_prefixes), None
+            )
+            # Data rows of all sections, including small molecules
+            data_prefixes = tuple(row_prefixes.values()) + ("SML\t",)
+            sample_rows = sum(1 for line in lines if line.startswith(data_prefixes))
+            table_lines = []
+            if header_index is not None:
+                # Header and rows of the first section, without the line prefix
+                row_prefix = row_prefixes[lines[header_index][:4]]
+                table_lines = [lines[header_index]] + [
+                    line for line in lines[header_index + 1:] if line.startswith(row_prefix)
+                ]
+                table_lines = [line.split('\t', 1)[1] for line in table_lines]
+        else:
+            delimiter = self._sniff_delimiter(lines[:100])
+            data_start = 1
+            sample_rows = sum(1 for line in lines[1:] if line.strip())
+            table_lines = lines
+        
+        sample = None
+        if table_lines:
+            sample = pd.read_csv(io.StringIO("\n".join(table_lines)), sep=delimiter,
+                                 quoting=csv.QUOTE_NONE if is_mztab else csv.QUOTE_MINIMAL,
+                                 na_values=MZTAB_NA_VALUES if is_mztab else None)
+            if is_mztab:
+                sample = apply_mztab_schema(sample)
+        
+        file_size = path.stat().st_size
+        if exact:
+            estimated_rows = sample_rows
+        elif compression is None and sample_rows:
+            # Bytes per data row, counting interleaved non-data lines (e.g.
+            # mzTab section headers and comments) towards the rows. Lengths
+            # are measured re-encoded, i.e. in bytes of the file, BOM included
+            header_bytes = len("".join(raw_lines[:data_start]).encode(encoding))
+            bytes_per_row = (len(text.encode(encoding)) - header_bytes) / sample_rows
+            estimated_rows = int((file_size - header_bytes) / bytes_per_row)
+        else:
+            estimated_rows = None
+        
+        estimated_memory = None
+        if sample is not None and len(sample) and estimated_rows is not None:
+            per_row = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+            estimated_memory = int(per_row * estimated_rows)
+        
+        return {
+            "path": str(path),
+            "format": "mztab" if is_mztab else "tabular",
+            "compression": compression,
+            "encoding": encoding,
+            "delimiter": delimiter,
+            "columns": list(sample.columns) if sample is not None else [],
+            "dtypes": {c: str(t) for c, t in sample.dtypes.items()} if sample is not None else {},
+            "file_size": file_size,
+            "sample_rows": sample_rows,
+            "estimated_rows": estimated_rows,
+            "exact": exact,
+            "estimated_memory_bytes": estimated_memory,
+        }
+    
+    @staticmethod
+    def _sniff_encoding(data: bytes, final: bool = True) -> str:
+        """
+        Guess the text encoding of a byte sample from its BOM or UTF-8 validity.
+        
+        With ``final=False`` the sample is a prefix of the file, and a
+        character cut off at its end does not rule out UTF-8.
+        """
+        if data.startswith(b"\xef\xbb\xbf"):
+            return "utf-8-sig"
+        if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+            return "utf-16"
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(data, final=final)
+            return "utf-8"
+        except UnicodeDecodeError:
+            return "latin-1"
+    
+    @staticmethod
+    def _sniff_delimiter(lines: List[str]) -> str:
+        """Guess the delimiter from sample lines, preferring tab over comma."""
+        sample = "\n".join(lines)
+        try:
+            return csv.Sniffer().sniff(sample, delimiters="\t,;|").delimiter
+        except csv.Error:
+            first_line = lines[0] if lines else ""
+            return '\t' if '\t' in first_line else ','
+    
+    @staticmethod
+    def _format_suffix(path: Path) -> str:
+        """File suffix identifying the format, ignoring compression suffixes."""
+        suffix = path.suffix.lower()
+        if suffix in COMPRESSION_SUFFIXES:
+            suffix = Path(path.stem).suffix.lower()
+        return suffix
+    
+    def _detect_delimiter(self, file_path: str) -> str:
+        """Pick the delimiter from the file suffix, or else sniff the first lines."""
+        suffix = self._format_suffix(Path(file_path))
+        
+        if suffix == '.csv':
+            return ','
+        elif suffix in ['.tsv', '.txt']:
+            return '\t'
+        
+        # Try to detect from the first lines
+        with self._open_text(file_path) as f:
+            lines = [line for _, line in zip(range(20), f)]
+        return self._sniff_delimiter([line.rstrip('\r\n') for line in lines])
+    
+    def parse_excel(self, file_path: str, sheet_name: Union[str, int] = 0,
+                    header_row: Optional[int] = None, typed: bool = True) -> pd.DataFrame:
         """
         Parse Excel file.
         
+        .xlsx workbooks are streamed row by row with openpyxl in read-only
+        mode (see iter_excel_chunks). Legacy .xls files are read whole with
+        pandas.read_excel. Compressed workbooks (e.g. .xlsx.gz) are
+        decompressed first.
+        
         Args:
             file_path: Path to Excel file
             sheet_name: Sheet name or index
+            header_row: 0-based row index of the column header
+                        (auto-detected if None)
+            typed: Convert columns to typed dtypes (see apply_table_schema)
             
         Returns:
             DataFrame with proteomics data
         """
-        # TODO: Implement Excel parsing
         logger.info(f"Parsing Excel file: {file_path}")
-        raise NotImplementedError("Excel parsing not yet implemented")
+        
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if self._format_suffix(path) == ".xls":
+            with self._open_seekable(file_path) as f:
+                df = pd.read_excel(f, sheet_name=sheet_name,
+                                   header=0 if header_row is None else header_row)
+        else:
+            chunks = list(self.iter_excel_chunks(file_path, sheet_name, header_row=header_row,
+                                                 chunksize=None, typed=False))
+            df = chunks[0]
+        
+        df = apply_table_schema(df) if typed else df
+        logger.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
+        return df
+    
+    def iter_excel_chunks(self, file_path: str, sheet_name: Union[str, int] = 0,
+                          chunksize: Optional[int] = 50_000, header_row: Optional[int] = None,
+                          typed: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Stream an .xlsx sheet as DataFrame chunks.
+        
+        The workbook is opened read-only and rows are pulled as plain value
+        tuples, so openpyxl never builds cell objects for the whole sheet.
+        
+        Args:
+            file_path: Path to .xlsx file (may be compressed)
+            sheet_name: Sheet name or index
+            chunksize: Maximum number of rows per DataFrame (None for one frame)
+            header_row: 0-based row index of the column header. If None, the
+                        first row whose filled cells are all text is used.
+            typed: Convert each chunk to typed dtypes (see apply_table_schema)
+            
+        Yields:
+            DataFrames of at most ``chunksize`` rows
+            
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If the sheet or a header row is not found
+        """
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if openpyxl is None:
+            raise ImportError("openpyxl is required to parse .xlsx files")
+        
+        source = self._open_seekable(file_path)
+        try:
+            workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        except BaseException:
+            source.close()
+            raise
+        try:
+            if isinstance(sheet_name, int):
+                if sheet_name >= len(workbook.worksheets):
+                    raise ValueError(f"Sheet index {sheet_name} out of range in {file_path}")
+                sheet = workbook.worksheets[sheet_name]
+            elif sheet_name in workbook.sheetnames:
+                sheet = workbook[sheet_name]
+            else:
+                raise ValueError(f"Sheet '{sheet_name}' not found in {file_path}")
+            
+            rows = sheet.iter_rows(values_only=True)
+            header, pending = self._find_excel_header(rows, header_row)
+            width = len(header)
+            logger.info(f"Reading sheet '{sheet.title}' with {width} columns")
+            
+            buffer = []
+            for row in itertools.chain(pending, rows):
+                if all(value is None for value in row):
+                    continue
+                row = tuple(row[:width]) + (None,) * (width - len(row))
+                buffer.append(row)
+                if chunksize is not None and len(buffer) >= chunksize:
+                    yield self._excel_rows_to_frame(buffer, header, typed)
+                    buffer = []
+            
+            if buffer or chunksize is None:
+                yield self._excel_rows_to_frame(buffer, header, typed)
+        finally:
+            # Read-only workbooks keep the archive open until closed
+            workbook.close()
+            source.close()
+    
+    @staticmethod
+    def _find_excel_header(rows: Iterator[tuple], header_row: Optional[int],
+                           max_probe_rows: int = 50) -> Tuple[List[str], List[tuple]]:
+        """
+        Find the header among the leading rows of a sheet.
+        
+        Returns the column names and the rows already consumed after the
+        header, which must be processed before continuing with ``rows``.
+        """
+        def filled(row: tuple) -> List:
+            return [value for value in row if value is not None]
+        
+        probe = []
+        for row in rows:
+            probe.append(row)
+            if header_row is not None:
+                if len(probe) > header_row:
+                    break
+            elif any(not isinstance(value, str) for value in filled(row)):
+                break  # First data row
+            if len(probe) >= max_probe_rows:
+                break
+        
+        if header_row is not None:
+            if len(probe) <= header_row:
+                raise ValueError(f"Header row {header_row} is beyond the end of the sheet")
+            index = header_row
+        else:
+            candidates = [
+                i for i, row in enumerate(probe)
+                if filled(row) and all(isinstance(value, str) for value in filled(row))
+            ]
+            if not candidates:
+                raise ValueError("No header row found in Excel sheet")
+            # Titles and notes above the table fill fewer cells than the header
+            index = max(candidates, key=lambda i: (len(filled(probe[i])), -i))
+        
+        # Drop trailing empty header cells, name inner gaps like pandas
+        header = list(probe[index])
+        while header and header[-1] is None:
+            header.pop()
+        names = [
+            str(value) if value is not None else f"Unnamed: {i}"
+            for i, value in enumerate(header)
+        ]
+        return names, probe[index + 1:]
+    
+    @staticmethod
+    def _excel_rows_to_frame(rows: List[tuple], header: List[str], typed: bool) -> pd.DataFrame:
+        """Build a DataFrame from Excel row tuples."""
+        df = pd.DataFrame.from_records(rows, columns=header)
+        return apply_table_schema(df) if typed else df
+
+
+class MzTabFile:
+    """
+    Metadata and data sections of an mzTab file, as read by FileParser.read_mztab.
+    
+    Section DataFrames are parsed on first access and then kept.
+    
+    Attributes:
+        file_path: Path of the source file
+        metadata: MTD key-value pairs
+        spans: Byte spans of the data sections (see FileParser.scan_mztab_sections)
+        ms_runs: ms_run[n] -> attributes (e.g. "location")
+        assays: assay[n] -> attributes (e.g. "ms_run_ref", "quantification_reagent")
+        study_variables: study_variable[n] -> attributes (e.g. "assay_refs")
+        samples: sample[n] -> attributes (e.g. "species[1]")
+    """
+    
+    def __init__(self, file_path: str, metadata: Dict[str, str], spans: Dict[str, dict],
+                 loader: Callable[[dict], pd.DataFrame]):
+        """
+        Initialize mzTab result.
+        
+        Args:
+            file_path: Path of the source file
+            metadata: MTD key-value pairs
+            spans: Byte spans of the data sections
+            loader: Function parsing a span into a DataFrame
+        """
+        self.file_path = str(file_path)
+        self.metadata = metadata
+        self.spans = spans
+        self._loader = loader
+        self._frames: Dict[str, pd.DataFrame] = {}
+        
+        indexed = self._group_indexed_metadata(metadata)
+        self.ms_runs = indexed["ms_run"]
+        self.assays = indexed["assay"]
+        self.study_variables = indexed["study_variable"]
+        self.samples = indexed["sample"]
+    
+    @property
+    def sections(self) -> List[str]:
+        """Names of the data sections present in the file, in file order."""
+        return [name for name in MZTAB_SECTIONS if name in self.spans]
+    
+    def section(self, name: str) -> pd.DataFrame:
+        """
+        Get a data section as a DataFrame, parsing it on first access.
+        
+        Args:
+            name: "protein", "peptide" or "psm"
+            
+        Returns:
+            Section DataFrame (empty if the section is absent)
+        """
+        if name not in MZTAB_SECTIONS:
+            raise ValueError(
+                f"Unknown mzTab section: {name} (expected one of {list(MZTAB_SECTIONS)})"
+            )
+        if name not in self._frames:
+            if name in self.spans:
+                self._frames[name] = self._loader(self.spans[name])
+            else:
+                self._frames[name] = pd.DataFrame()
+        return self._frames[name]
+    
+    @property
+    def proteins(self) -> pd.DataFrame:
+        """Protein section (PRT rows)."""
+        return self.section("protein")
+    
+    @property
+    def peptides(self) -> pd.DataFrame:
+        """Peptide section (PEP rows)."""
+        return self.section("peptide")
+    
+    @property
+    def psms(self) -> pd.DataFrame:
+        """Peptide-spectrum match section (PSM rows)."""
+        return self.section("psm")
+    
+    def assay_run_locations(self) -> Dict[str, Optional[str]]:
+        """
+        Map each assay to the location of its MS run.
+        
+        Returns:
+            Dictionary of assay[n] -> ms_run location (None if unresolved),
+            matching the assay[n] suffix of the abundance_assay columns
+        """
+        locations = {}
+        for assay, attributes in self.assays.items():
+            run = self.ms_runs.get(attributes.get("ms_run_ref", ""), {})
+            locations[assay] = run.get("location")
+        return locations
+    
+    @staticmethod
+    def _group_indexed_metadata(metadata: Dict[str, str]) -> Dict[str, Dict[str, dict]]:
+        """Group indexed MTD keys such as assay[1]-ms_run_ref by element."""
+        grouped = {"ms_run": {}, "assay": {}, "study_variable": {}, "sample": {}}
+        
+        for key, value in metadata.items():
+            match = MZTAB_INDEXED_ELEMENT.match(key)
+            if not match:
+                continue
+            element, index, attribute = match.groups()
+            if attribute.endswith("_refs"):
+                value = [ref.strip() for ref in value.split(",") if ref.strip()]
+            grouped[element].setdefault(f"{element}[{index}]", {})[attribute] = value
+        
+        # Order elements by their numeric index
+        return {
+            element: dict(sorted(items.items(), key=lambda item: int(item[0].split("[")[1][:-1])))
+            for element, items in grouped.items()
+        }
+
+
+class _ByteRangeReader(io.RawIOBase):
+    """Read-only file view limited to the byte range [start, end)."""
+    
+    def __init__(self, f, start: int, end: int):
+        self._f = f
+        self._remaining = end - start
+        if f.seekable():
+            f.seek(start)
+        else:
+            # Decompression streams can only skip forward by reading
+            to_skip = start
+            while to_skip > 0:
+                skipped = len(f.read(min(to_skip, 1 << 20)))
+                if not skipped:
+                    break
+                to_skip -= skipped
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(b)[:self._remaining]
+        n = self._f.readinto(view)
+        self._remaining -= n
+        return n
+
+
+def _parse_file_worker(options: dict, file_path: str, transfer_dir: str) -> Tuple[str, object]:
+    """
+    Parse one file in a worker process for FileParser.parse_files.
+    
+    Returns:
+        ("feather", cache file path), ("transfer", temporary Feather file in
+        transfer_dir, to be removed by the caller) or ("frame", DataFrame)
+        if pyarrow is not installed
+    """
+    parser = FileParser(**options)
+    df, cache_file = parser._parse_with_cache(Path(file_path))
+    
+    if cache_file is not None:
+        return "feather", str(cache_file)
+    if feather is not None:
+        transfer_file = Path(transfer_dir) / f"{uuid.uuid4().hex}.feather"
+        try:
+            feather.write_feather(df, transfer_file, compression='uncompressed')
+            return "transfer", str(transfer_file)
+        except Exception as e:
+            logger.warning(f"Failed to write parse result of {file_path} for transfer: {e}")
+            transfer_file.unlink(missing_ok=True)
+    return "frame", df
@@ -0,0 +1,132 @@
+"""
+mzTab Column Schema
+
+Maps mzTab column families to compact pandas dtypes, and applies the same
+typing to other parsed tables.
+"""
+
+import re
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Column family patterns -> dtype, checked in order. Abundances are stored as
+# float32 (intensities carry far less than 7 significant digits), while search
+# engine scores and m/z values keep float64 for range (e-values) and precision.
+MZTAB_COLUMN_FAMILIES = [
+    (re.compile(r".*abundance_.*"), "float32"),
+    (re.compile(r"(best_)?search_engine_score\[\d+\].*"), "float64"),
+    (re.compile(r"(exp_|calc_)?mass_to_charge"), "float64"),
+    (re.compile(r".*_coverage"), "float32"),
+    (re.compile(r"num_(psms|peptides_distinct|peptides_unique)_ms_run\[\d+\]"), "Int32"),
+    (re.compile(r"charge|taxid|PSM_ID|start|end"), "Int32"),
+    (re.compile(r"unique|reliability"), "Int8"),
+    (re.compile(r"accession|database|database_version|search_engine|species"), "category"),
+]
+
+# Values mzTab uses for missing data (NaN and INF are parsed natively)
+MZTAB_NA_VALUES = ["null"]
+
+
+def mztab_column_dtype(column: str) -> Optional[str]:
+    """
+    Look up the dtype for a single mzTab column.
+
+    Args:
+        column: mzTab column name (e.g., "protein_abundance_assay[1]")
+
+    Returns:
+        pandas dtype string, or None if the column has no fixed type
+        (e.g., opt_ columns, which are left to type inference)
+    """
+    for pattern, dtype in MZTAB_COLUMN_FAMILIES:
+        if pattern.fullmatch(column):
+            return dtype
+    return None
+
+
+def mztab_dtypes(columns: Iterable[str]) -> Dict[str, str]:
+    """
+    Build a dtype mapping for a set of mzTab columns.
+
+    Args:
+        columns: Column names of an mzTab section
+
+    Returns:
+        Dictionary of column name -> dtype for all columns with a known type
+    """
+    dtypes = {}
+    for column in columns:
+        dtype = mztab_column_dtype(column)
+        if dtype is not None:
+            dtypes[column] = dtype
+    return dtypes
+
+
+def apply_mztab_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert parsed mzTab columns to their schema dtypes.
+
+    Values that cannot be converted (including "null") become missing
+    values instead of raising.
+
+    Args:
+        df: DataFrame from an mzTab section (string or inferred columns)
+
+    Returns:
+        DataFrame with typed columns (modified in place and returned)
+    """
+    for column, dtype in mztab_dtypes(df.columns).items():
+        values = df[column]
+        if str(values.dtype) == dtype:
+            continue
+
+        if dtype == "category":
+            df[column] = values.replace(MZTAB_NA_VALUES, None).astype("category")
+        else:
+            numeric = pd.to_numeric(values, errors="coerce")
+            if dtype.startswith("Int"):
+                # Non-integral values would fail the cast; keep them as floats
+                integral = numeric.dropna()
+                if not (np.isfinite(integral) & (integral == integral.round())).all():
+                    logger.warning(f"Column {column} has non-integer values, keeping float")
+                    df[column] = numeric
+                    continue
+            df[column] = numeric.astype(dtype)
+
+    return df
+
+
+def apply_table_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type a parsed table whose cells arrived as Python objects (e.g. Excel).
+
+    Columns with mzTab names get their schema dtype; any other object column
+    whose values are all numeric (allowing "null"/"NaN" as missing) becomes
+    float64 or Int64.
+
+    Args:
+        df: DataFrame built from row values
+
+    Returns:
+        DataFrame with typed columns (modified in place and returned)
+    """
+    df = apply_mztab_schema(df)
+
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].replace(MZTAB_NA_VALUES + ["NaN", ""], None)
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.isna().sum() != values.isna().sum():
+            continue  # Genuine text column
+
+        integral = numeric.dropna()
+        if len(integral) and (np.isfinite(integral) & (integral == integral.round())).all():
+            df[column] = numeric.astype("Int64")
+        else:
+            df[column] = numeric.astype("float64")
+
+    return df
@@ -5,19 +5,33 @@ Handles interaction with PRIDE REST API for querying and downloading proteomics
 """
 
 import requests
-from typing import Dict, List, Optional
+import urllib3
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from pathlib import Path
 from tqdm import tqdm
-from urllib.request import urlopen
-import urllib.error
+from urllib.parse import unquote, urlparse
+import ftplib
+import http.client
 import json
 import hashlib
-from datetime import datetime, timedelta
+from datetime import timedelta
 import time
+import threading
+import os
+
+from .response_cache import CacheEntry, MemoryCache, ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between progress updates of a download
+PROGRESS_INTERVAL = 0.1
+
+# urllib3 2 responses support readinto
+URLLIB3_READINTO = int(urllib3.__version__.split(".")[0]) >= 2
+
 
 class PRIDEClient:
     """
@@ -33,9 +47,14 @@ class PRIDEClient:
                  cache_dir: Optional[Path] = None,
                  cache_enabled: bool = True,
                  cache_max_age_hours: int = 24,
+                 cache_max_size_mb: Optional[int] = 512,
+                 memory_cache_entries: int = 1024,
+                 memory_cache_mb: int = 64,
+                 stale_while_revalidate_hours: float = 0,
                  timeout: int = 30,
                  max_retries: int = 3,
-                 backoff_factor: float = 2.0):
+                 backoff_factor: float = 2.0,
+                 max_workers: int = 8):
         """
         Initialize PRIDE API client.
         
@@ -44,16 +63,29 @@ class PRIDEClient:
             cache_dir: Directory for caching API responses (default: data/cache)
             cache_enabled: Enable/disable caching (default: True)
             cache_max_age_hours: Maximum age of cache in hours (default: 24)
+            cache_max_size_mb: Size limit of the response cache in MB; least
+                recently used entries are evicted beyond it (default: 512,
+                None for unlimited)
+            memory_cache_entries: Entries kept in the in-process LRU in front
+                of the response cache; 0 disables it (default: 1024)
+            memory_cache_mb: Size limit of the in-process LRU in MB (default: 64)
+            stale_while_revalidate_hours: Serve entries expired for less than
+                this long immediately and revalidate them in the background;
+                0 revalidates before returning (default: 0)
             timeout: Request timeout in seconds (default: 30)
             max_retries: Maximum number of retry attempts (default: 3)
             backoff_factor: Exponential backoff multiplier (default: 2.0)
+            max_workers: Threads used by batch requests, and size of the
+                connection pool (default: 8)
         """
         self.base_url = base_url
         self.cache_enabled = cache_enabled
         self.cache_max_age = timedelta(hours=cache_max_age_hours)
+        self.stale_while_revalidate = timedelta(hours=stale_while_revalidate_hours)
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
+        self.max_workers = max_workers
         
         # Set up cache directory
         if cache_dir is None:
@@ -61,11 +93,27 @@ class PRIDEClient:
         else:
             self.cache_dir = Path(cache_dir)
         
+        self.cache: Optional[ResponseCache] = None
+        self.memory_cache: Optional[MemoryCache] = None
         if self.cache_enabled:
-            self.cache_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Cache enabled: {self.cache_dir} (max age: {cache_max_age_hours}h)")
+            max_bytes = cache_max_size_mb * 1024 ** 2 if cache_max_size_mb is not None else None
+            self.cache = ResponseCache(self.cache_dir / "responses.sqlite", max_bytes=max_bytes)
+            if memory_cache_entries > 0:
+                self.memory_cache = MemoryCache(max_entries=memory_cache_entries,
+                                                max_bytes=memory_cache_mb * 1024 ** 2)
+            logger.info(f"Cache enabled: {self.cache.path} (max age: {cache_max_age_hours}h)")
+        
+        # Background revalidation of stale entries, started on first use
+        self._revalidation_executor: Optional[ThreadPoolExecutor] = None
+        self._revalidating = set()
+        self._revalidation_lock = threading.Lock()
         
         self.session = requests.Session()
+        # Keep one pooled connection per batch worker (requests defaults to 10
+        # per host and discards the surplus, forcing new TLS handshakes)
+        adapter = HTTPAdapter(pool_maxsize=max(max_workers, 10))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             "Accept": "application/json",
             "User-Agent": "ProteomicsPipeline/0.1.0"
@@ -81,46 +129,165 @@ class PRIDEClient:
     
     def _get_from_cache(self, cache_key: str) -> Optional[Dict]:
         """Retrieve data from cache if valid."""
-        if not self.cache_enabled:
+        entry = self._get_cache_entry(cache_key)
+        if entry is None or not entry.is_fresh:
             return None
-        
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        
-        if not cache_file.exists():
-            logger.debug(f"Cache miss: {cache_key}")
+        return entry.value
+    
+    def _get_cache_entry(self, cache_key: str) -> Optional[CacheEntry]:
+        """Look up a cache entry, fresh or expired (in-process LRU first)."""
+        if self.cache is None:
             return None
         
-        # Check if cache is stale
-        file_age = datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime)
-        if file_age > self.cache_max_age:
-            logger.debug(f"Cache expired: {cache_key} (age: {file_age})")
-            return None
+        if self.memory_cache is not None:
+            entry = self.memory_cache.get_entry(cache_key)
+            if entry is not None:
+                logger.debug(f"Memory cache hit: {cache_key}")
+                return entry
         
-        # Load from cache
         try:
-            with open(cache_file, 'r') as f:
-                data = json.load(f)
-            logger.info(f"Cache hit: {cache_key} (age: {file_age})")
-            return data
+            entry = self.cache.get_entry(cache_key, allow_stale=True)
         except Exception as e:
             logger.warning(f"Failed to load cache {cache_key}: {e}")
             return None
+        
+        if entry is None:
+            logger.debug(f"Cache miss: {cache_key}")
+        elif entry.is_fresh:
+            if self.memory_cache is not None:
+                self.memory_cache.set(cache_key, entry.value, entry.expires)
+            logger.info(f"Cache hit: {cache_key}")
+        else:
+            logger.debug(f"Cache expired: {cache_key}")
+        return entry
     
-    def _save_to_cache(self, cache_key: str, data: Dict) -> None:
-        """Save data to cache."""
-        if not self.cache_enabled:
+    def _save_to_cache(self, cache_key: str, data: Dict, etag: Optional[str] = None,
+                       last_modified: Optional[str] = None) -> None:
+        """Save data to cache, with the response validators if available."""
+        if self.cache is None:
             return
         
-        cache_file = self.cache_dir / f"{cache_key}.json"
+        ttl = self.cache_max_age.total_seconds()
+        if self.memory_cache is not None:
+            self.memory_cache.set(cache_key, data, time.time() + ttl)
         
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            self.cache.set(cache_key, data, ttl=ttl, etag=etag, last_modified=last_modified)
             logger.debug(f"Saved to cache: {cache_key}")
         except Exception as e:
             logger.warning(f"Failed to save cache {cache_key}: {e}")
     
-    def _make_request_with_retry(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+    def _refresh_cache_ttl(self, cache_key: str, entry: CacheEntry) -> None:
+        """Restart the TTL of an entry confirmed unchanged by the server."""
+        try:
+            expires = self.cache.touch(cache_key, ttl=self.cache_max_age.total_seconds())
+        except Exception as e:
+            logger.warning(f"Failed to refresh cache {cache_key}: {e}")
+            return
+        if expires is not None and self.memory_cache is not None:
+            self.memory_cache.set(cache_key, entry.value, expires)
+    
+    def _cached_get(self, cache_key: str, url: str, params: Optional[Dict] = None,
+                    parse: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        GET a JSON endpoint through the cache.
+        
+        Fresh entries are returned without a request. Expired entries are
+        revalidated with a conditional request (If-None-Match /
+        If-Modified-Since); a 304 Not Modified restarts their TTL instead of
+        downloading the payload again. Within the stale-while-revalidate
+        window, the expired entry is returned at once and revalidated in the
+        background.
+        
+        Args:
+            cache_key: Cache key of the request
+            url: URL to request
+            params: Optional query parameters
+            parse: Optional function applied to the JSON body before caching
+            
+        Returns:
+            Parsed response data
+        """
+        entry = self._get_cache_entry(cache_key)
+        if entry is not None:
+            if entry.is_fresh:
+                return entry.value
+            
+            staleness = time.time() - entry.expires
+            if staleness <= self.stale_while_revalidate.total_seconds():
+                self._revalidate_in_background(cache_key, url, params, parse, entry)
+                return entry.value
+        
+        return self._fetch_and_cache(cache_key, url, params, parse, entry)
+    
+    def _fetch_and_cache(self, cache_key: str, url: str, params: Optional[Dict],
+                         parse: Optional[Callable[[Any], Any]],
+                         stale: Optional[CacheEntry]) -> Any:
+        """Request a URL (conditionally if a stale entry exists) and cache the result."""
+        headers = {}
+        if stale is not None:
+            if stale.etag:
+                headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                headers["If-Modified-Since"] = stale.last_modified
+        
+        response = self._make_request_with_retry(url, params=params, headers=headers or None)
+        
+        if response.status_code == 304 and stale is not None:
+            logger.info(f"Not modified, cache refreshed: {cache_key}")
+            self._refresh_cache_ttl(cache_key, stale)
+            return stale.value
+        
+        data = response.json()
+        if parse is not None:
+            data = parse(data)
+        
+        # Save to cache
+        self._save_to_cache(cache_key, data, etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"))
+        return data
+    
+    def _revalidate_in_background(self, cache_key: str, url: str, params: Optional[Dict],
+                                  parse: Optional[Callable[[Any], Any]],
+                                  stale: CacheEntry) -> None:
+        """Schedule revalidation of a stale entry, once per key at a time."""
+        with self._revalidation_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+            if self._revalidation_executor is None:
+                self._revalidation_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="pride-revalidate"
+                )
+        
+        def revalidate():
+            try:
+                self._fetch_and_cache(cache_key, url, params, parse, stale)
+            except Exception as e:
+                logger.warning(f"Background revalidation failed for {url}: {e}")
+            finally:
+                with self._revalidation_lock:
+                    self._revalidating.discard(cache_key)
+        
+        logger.debug(f"Serving stale entry, revalidating in background: {cache_key}")
+        self._revalidation_executor.submit(revalidate)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Hit/miss counters and usage of the cache layers.
+        
+        Returns:
+            Dictionary with "memory" and "disk" entries, each holding hits,
+            misses, entries and bytes (empty if that layer is disabled).
+            Disk lookups only happen on memory misses.
+        """
+        return {
+            "memory": self.memory_cache.stats() if self.memory_cache is not None else {},
+            "disk": self.cache.stats() if self.cache is not None else {},
+        }
+    
+    def _make_request_with_retry(self, url: str, params: Optional[Dict] = None,
+                                 headers: Optional[Dict] = None) -> requests.Response:
         """
         Make HTTP request with exponential backoff retry logic.
         
@@ -135,6 +302,7 @@ class PRIDEClient:
         Args:
             url: URL to request
             params: Optional query parameters
+            headers: Optional extra request headers
             
         Returns:
             Response object
@@ -146,7 +314,8 @@ class PRIDEClient:
         
         for attempt in range(self.max_retries):
             try:
-                response = self.session.get(url, params=params, timeout=self.timeout)
+                response = self.session.get(url, params=params, headers=headers,
+                                            timeout=self.timeout)
                 response.raise_for_status()
                 return response
                 
@@ -191,23 +360,12 @@ class PRIDEClient:
         """
         logger.info(f"Fetching metadata for dataset: {dataset_id}")
         
-        # Check cache first
         cache_key = self._get_cache_key("metadata", dataset_id=dataset_id)
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data is not None:
-            return cached_data
-        
         url = f"{self.base_url}/projects/{dataset_id}"
         
         try:
-            response = self._make_request_with_retry(url)
-            
-            metadata = response.json()
+            metadata = self._cached_get(cache_key, url)
             logger.info(f"Successfully retrieved metadata for {dataset_id}")
-            
-            # Save to cache
-            self._save_to_cache(cache_key, metadata)
-            
             return metadata
             
         except requests.HTTPError as e:
@@ -221,10 +379,60 @@ class PRIDEClient:
             logger.error(f"Request failed for {dataset_id}: {e}")
             raise
     
+    def get_many_datasets_metadata(
+        self, dataset_ids: List[str], max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, Dict], Dict[str, Exception]]:
+        """
+        Retrieve metadata for many datasets using a thread pool.
+        
+        Cached datasets are answered first; only the remaining accessions
+        are fetched, concurrently over the pooled session.
+        
+        Args:
+            dataset_ids: PRIDE dataset accessions
+            max_workers: Number of threads (default: self.max_workers)
+            
+        Returns:
+            Tuple of (metadata by accession, exception by accession) so one
+            failing accession does not abort the batch
+        """
+        unique_ids = list(dict.fromkeys(dataset_ids))
+        results, errors = {}, {}
+        
+        pending = []
+        for dataset_id in unique_ids:
+            cache_key = self._get_cache_key("metadata", dataset_id=dataset_id)
+            cached_data = self._get_from_cache(cache_key)
+            if cached_data is not None:
+                results[dataset_id] = cached_data
+            else:
+                pending.append(dataset_id)
+        
+        if pending:
+            workers = min(max_workers or self.max_workers, len(pending))
+            logger.info(f"Fetching metadata for {len(pending)} datasets "
+                        f"({len(results)} cached) with {workers} threads")
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {dataset_id: executor.submit(self.get_dataset_metadata, dataset_id)
+                           for dataset_id in pending}
+                for dataset_id, future in futures.items():
+                    try:
+                        results[dataset_id] = future.result()
+                    except Exception as e:
+                        errors[dataset_id] = e
+        
+        logger.info(f"Retrieved metadata for {len(results)}/{len(unique_ids)} datasets "
+                    f"({len(errors)} failed)")
+        return results, errors
+    
     def search_datasets(self, query: str, page_size: int = 10) -> List[Dict]:
         """
         Search for datasets in PRIDE.
         
+        Only the first page of results is returned; use iter_search_datasets
+        to walk all matches.
+        
         Args:
             query: Search query string
             page_size: Number of results per page
@@ -234,25 +442,8 @@ class PRIDEClient:
         """
         logger.info(f"Searching for datasets with query: '{query}'")
         
-        url = f"{self.base_url}/search/projects"
-        params = {
-            "keyword": query,
-            "pageSize": page_size,
-            "page": 0,
-            "sortDirection": "DESC",
-            "sortFields": "submissionDate"
-        }
-        
         try:
-            response = self._make_request_with_retry(url, params=params)
-            
-            data = response.json()
-            # Check if API returns list directly or nested structure
-            if isinstance(data, list):
-                results = data
-            else:
-                # API returns nested structure with results in '_embedded' field
-                results = data.get("_embedded", {}).get("projects", [])
+            results = self._get_search_page(query, page_size, page=0)
             
             logger.info(f"Found {len(results)} datasets matching '{query}'")
             return results
@@ -261,6 +452,60 @@ class PRIDEClient:
             logger.error(f"Search failed for query '{query}': {e}")
             raise
     
+    def iter_search_datasets(self, query: str, page_size: int = 100,
+                             limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Iterate over all datasets matching a search, page by page.
+        
+        Pages are fetched lazily; the next page is requested in a background
+        thread while the current one is being consumed. Each page is cached,
+        so repeated crawls of the same query are served from the cache.
+        
+        Args:
+            query: Search query string
+            page_size: Number of results per request (default: 100)
+            limit: Stop after this many datasets (default: no limit)
+            
+        Yields:
+            Dataset metadata dictionaries, in search order
+        """
+        if limit is not None and limit <= 0:
+            return
+        
+        logger.info(f"Iterating datasets matching '{query}' (page size: {page_size})")
+        
+        yielded = 0
+        page = 0
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(self._get_search_page, query, page_size, page)
+            while future is not None:
+                results = future.result()
+                page += 1
+                
+                # A short page is the last one; don't prefetch past the limit either
+                last_page = (len(results) < page_size or
+                             (limit is not None and yielded + len(results) >= limit))
+                future = None if last_page else executor.submit(
+                    self._get_search_page, query, page_size, page
+                )
+                
+                for project in results:
+                    yield project
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info(f"Iterated {yielded} datasets matching '{query}' over {page} pages")
+    
+    def _get_search_page(self, query: str, page_size: int, page: int) -> List[Dict]:
+        """Fetch one page of search results, using the cache."""
+        cache_key = self._get_cache_key("search", query=query, page_size=page_size, page=page)
+        return self._cached_get(cache_key, f"{self.base_url}/search/projects",
+                                params=self._search_params(query, page_size, page),
+                                parse=self._extract_search_results)
+    
     def get_dataset_files(self, dataset_id: str) -> List[Dict]:
         """
         Get list of files available for a dataset.
@@ -273,43 +518,12 @@ class PRIDEClient:
         """
         logger.info(f"Fetching file list for dataset: {dataset_id}")
         
-        # Check cache first
         cache_key = self._get_cache_key("files", dataset_id=dataset_id)
-        cached_data = self._get_from_cache(cache_key)
-        if cached_data is not None:
-            return cached_data
-        
-        # Use v3 API for files endpoint
-        url = f"{self.base_url.replace('v2', 'v3')}/projects/{dataset_id}/files"
         
         try:
-            response = self._make_request_with_retry(url)
-            
-            files = response.json()
-            
-            # Extract useful information from each file
-            file_list = []
-            for file_data in files:
-                # Extract FTP URL from publicFileLocations
-                ftp_url = None
-                for location in file_data.get("publicFileLocations", []):
-                    if location.get("name") == "FTP Protocol":
-                        ftp_url = location.get("value")
-                        break
-                
-                file_info = {
-                    "fileName": file_data.get("fileName"),
-                    "fileSizeBytes": file_data.get("fileSizeBytes"),
-                    "fileCategory": file_data.get("fileCategory", {}).get("value"),
-                    "downloadUrl": ftp_url
-                }
-                file_list.append(file_info)
-            
+            file_list = self._cached_get(cache_key, self._files_url(dataset_id),
+                                         parse=self._parse_file_list)
             logger.info(f"Found {len(file_list)} files for dataset {dataset_id}")
-            
-            # Save to cache
-            self._save_to_cache(cache_key, file_list)
-            
             return file_list
             
         except requests.HTTPError as e:
@@ -323,21 +537,99 @@ class PRIDEClient:
             logger.error(f"Request failed for dataset files {dataset_id}: {e}")
             raise
     
+    def _files_url(self, dataset_id: str) -> str:
+        """URL of the file listing endpoint for a dataset."""
+        # Use v3 API for files endpoint
+        return f"{self.base_url.replace('v2', 'v3')}/projects/{dataset_id}/files"
+    
+    @staticmethod
+    def _search_params(query: str, page_size: int, page: int) -> Dict:
+        """Query parameters for the project search endpoint."""
+        return {
+            "keyword": query,
+            "pageSize": page_size,
+            "page": page,
+            "sortDirection": "DESC",
+            "sortFields": "submissionDate"
+        }
+    
+    @staticmethod
+    def _extract_search_results(data) -> List[Dict]:
+        """Extract the project list from a search response."""
+        # Check if API returns list directly or nested structure
+        if isinstance(data, list):
+            return data
+        # API returns nested structure with results in '_embedded' field
+        return data.get("_embedded", {}).get("projects", [])
+    
+    @staticmethod
+    def _parse_file_list(files: List[Dict]) -> List[Dict]:
+        """Extract useful information from each file of a file listing response."""
+        file_list = []
+        for file_data in files:
+            # Extract FTP URL from publicFileLocations
+            ftp_url = None
+            for location in file_data.get("publicFileLocations", []):
+                if location.get("name") == "FTP Protocol":
+                    ftp_url = location.get("value")
+                    break
+            
+            file_info = {
+                "fileName": file_data.get("fileName"),
+                "fileSizeBytes": file_data.get("fileSizeBytes"),
+                "fileCategory": file_data.get("fileCategory", {}).get("value"),
+                "checksum": file_data.get("checksum"),
+                "downloadUrl": ftp_url
+            }
+            file_list.append(file_info)
+        return file_list
+    
     def download_file(self, file_url: str, output_path: str, 
-                     chunk_size: int = 8192) -> None:
+                     chunk_size: int = 1024 ** 2,
+                     progress_callback: Optional[Callable[[int], None]] = None,
+                     expected_size: Optional[int] = None,
+                     segments: int = 1,
+                     segment_threshold: int = 256 * 1024 ** 2) -> None:
         """
         Download a file from PRIDE with progress tracking.
         
-        Supports both HTTP/HTTPS and FTP protocols.
+        Supports both HTTP/HTTPS and FTP protocols. Data is written to
+        ``<output_path>.part`` and renamed when complete. Interrupted transfers
+        are retried with the client's exponential backoff and resume from the
+        end of the partial file (HTTP Range / FTP REST); a partial file left by
+        an earlier failed call is resumed the same way. HTTP resumes send the
+        ETag or Last-Modified of the original response (kept in
+        ``<output_path>.part.validator``) as If-Range, so a file that changed
+        on the server is downloaded again from the start.
+        
+        With ``segments`` > 1, HTTP files of at least ``segment_threshold``
+        bytes are fetched as that many byte ranges over parallel connections
+        (see _download_segmented); an interrupted segmented download is
+        resumed per segment. Servers that do not advertise
+        ``Accept-Ranges: bytes``, and platforms without os.pwrite, get a
+        single stream; the files of an interrupted segmented download are
+        removed once a single-stream download completes instead.
         
         Args:
             file_url: URL of file to download (HTTP, HTTPS, or FTP)
             output_path: Local path to save file
-            chunk_size: Size of chunks for streaming download (default: 8KB)
+            chunk_size: Size of the reusable read buffer (default: 1 MB)
+            progress_callback: Called with the number of bytes written since
+                the previous call, at most every PROGRESS_INTERVAL seconds;
+                replaces the per-file progress bar (e.g., for aggregated
+                progress or throttling across several downloads)
+            expected_size: Expected file size in bytes (e.g., fileSizeBytes
+                from get_dataset_files); the download is retried until the
+                file has this size
+            segments: Number of parallel range requests for large HTTP files
+                (default: 1, a single stream)
+            segment_threshold: Minimum file size for a segmented download
+                (default: 256 MB)
             
         Raises:
-            urllib.error.URLError: If download fails
+            ftplib.Error: If FTP download fails
             requests.RequestException: If HTTP download fails
+            IOError: If the file does not reach the expected size
         """
         logger.info(f"Downloading file from: {file_url}")
         logger.info(f"Saving to: {output_path}")
@@ -345,67 +637,456 @@ class PRIDEClient:
         # Create parent directory if it doesn't exist
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
+        part_file = output_file.with_name(output_file.name + ".part")
         
-        try:
-            # Handle FTP and HTTP/HTTPS differently
-            if file_url.startswith('ftp://'):
-                self._download_ftp(file_url, output_path, chunk_size)
-            else:
-                self._download_http(file_url, output_path, chunk_size)
+        # A partial single-stream download is resumed rather than segmented
+        segmented = segments > 1 and not file_url.startswith('ftp://') and not part_file.exists()
+        if segmented and not hasattr(os, "pwrite"):
+            logger.info("Segmented download needs os.pwrite, using a single stream")
+            segmented = False
+        if segmented:
+            ranges = self._segmentable_size(file_url)
+            if ranges is not None and ranges[0] >= segment_threshold:
+                size, validator = ranges
+                if expected_size is not None and size != expected_size:
+                    raise IOError(f"Server reports {size} bytes, expected {expected_size}")
+                self._download_segmented(file_url, output_file, size, segments,
+                                         chunk_size, progress_callback, validator)
+                logger.info(f"Successfully downloaded file to {output_path}")
+                return
+        
+        last_exception = None
+        for attempt in range(self.max_retries):
+            offset = part_file.stat().st_size if part_file.exists() else 0
+            if expected_size is not None and offset > expected_size:
+                logger.warning(f"Partial file larger than expected, restarting: {part_file}")
+                part_file.unlink()
+                _validator_file(part_file).unlink(missing_ok=True)
+                offset = 0
+            if offset:
+                logger.info(f"Resuming download at byte {offset}")
             
-            logger.info(f"Successfully downloaded file to {output_path}")
+            try:
+                if expected_size is None or offset < expected_size:
+                    # Handle FTP and HTTP/HTTPS differently
+                    if file_url.startswith('ftp://'):
+                        self._download_ftp(file_url, part_file, chunk_size, progress_callback,
+                                           offset, label=output_file.name)
+                    else:
+                        self._download_http(file_url, part_file, chunk_size, progress_callback,
+                                            offset, label=output_file.name)
+                
+                size = part_file.stat().st_size
+                if expected_size is not None and size != expected_size:
+                    raise IOError(f"Incomplete download: {size} of {expected_size} bytes")
+                break
+                
+            except requests.HTTPError as e:
+                # Don't retry client errors (4xx)
+                if e.response is not None and e.response.status_code < 500:
+                    logger.error(f"Download failed for {file_url}: {e}")
+                    raise
+                last_exception = e
+                
+            except (requests.RequestException, ftplib.Error, OSError, EOFError) as e:
+                last_exception = e
             
-        except Exception as e:
-            logger.error(f"Download failed for {file_url}: {e}")
-            # Clean up partial download
-            if output_file.exists():
-                output_file.unlink()
-                logger.info("Removed partial download")
-            raise
+            logger.warning(f"Download interrupted (attempt {attempt + 1}/{self.max_retries}): "
+                           f"{last_exception}")
+            # If not last attempt, wait with exponential backoff
+            if attempt < self.max_retries - 1:
+                wait_time = self.backoff_factor ** attempt
+                logger.info(f"Retrying in {wait_time:.1f} seconds...")
+                time.sleep(wait_time)
+        else:
+            logger.error(f"Download failed for {file_url}, partial file kept at {part_file}")
+            raise last_exception
+        
+        part_file.replace(output_file)
+        _validator_file(part_file).unlink(missing_ok=True)
+        # Leftovers of an earlier segmented attempt (retried with segments=1,
+        # or the HEAD request failed) would otherwise stay on disk
+        for suffix in (".segments", ".segments.json"):
+            output_file.with_name(output_file.name + suffix).unlink(missing_ok=True)
+        logger.info(f"Successfully downloaded file to {output_path}")
     
-    def _download_http(self, file_url: str, output_path: str, chunk_size: int) -> None:
-        """Download file via HTTP/HTTPS."""
-        response = self.session.get(file_url, stream=True)
-        response.raise_for_status()
+    def _download_http(self, file_url: str, output_path: Path, chunk_size: int,
+                       progress_callback: Optional[Callable[[int], None]] = None,
+                       offset: int = 0, label: Optional[str] = None) -> None:
+        """
+        Download file via HTTP/HTTPS, appending from ``offset`` if non-zero.
         
-        # Get file size for progress bar
-        total_size = int(response.headers.get('content-length', 0))
+        The validator of a full response is saved next to ``output_path``
+        and sent as If-Range when resuming; a 200 response to a resume
+        (file changed, or ranges unsupported) restarts from the beginning.
+        ``label`` names the progress bar (default: the name of output_path).
+        """
+        validator_file = _validator_file(output_path)
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if validator_file.exists():
+                headers["If-Range"] = validator_file.read_text()
+        response = self.session.get(file_url, stream=True, headers=headers, timeout=self.timeout)
         
-        # Download with progress bar
-        output_file = Path(output_path)
-        with open(output_path, 'wb') as f:
-            with tqdm(
-                total=total_size,
-                unit='B',
-                unit_scale=True,
-                unit_divisor=1024,
-                desc=output_file.name
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        pbar.update(len(chunk))
-    
-    def _download_ftp(self, file_url: str, output_path: str, chunk_size: int) -> None:
-        """Download file via FTP."""
+        with response:
+            if offset and response.status_code == 416:
+                # Range starts at the end: the partial file is already complete
+                return
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                logger.warning("Server sent the whole file (changed, or range request ignored), "
+                               "restarting from the beginning")
+                offset = 0
+            if not offset:
+                validator = _range_validator(response.headers)
+                if validator:
+                    validator_file.write_text(validator)
+                else:
+                    validator_file.unlink(missing_ok=True)
+            
+            # Get file size for progress bar
+            content_length = int(response.headers.get('content-length', 0))
+            
+            # Download with progress bar
+            output_file = Path(output_path)
+            with open(output_path, 'ab' if offset else 'wb') as f:
+                with tqdm(
+                    total=offset + content_length,
+                    initial=offset,
+                    unit='B',
+                    unit_scale=True,
+                    unit_divisor=1024,
+                    desc=label or output_file.name,
+                    disable=progress_callback is not None
+                ) as pbar:
+                    copied = _copy_stream(_response_readinto(response, chunk_size), f.write,
+                                          chunk_size, progress_callback or pbar.update)
+            
+            # Without content-length enforcement, a dropped connection looks like EOF
+            if content_length and copied != content_length:
+                raise IOError(f"Connection closed after {copied} of {content_length} bytes")
+    
+    def _download_ftp(self, file_url: str, output_path: Path, chunk_size: int,
+                      progress_callback: Optional[Callable[[int], None]] = None,
+                      offset: int = 0, label: Optional[str] = None) -> None:
+        """
+        Download file via FTP, restarting at ``offset`` (REST) if non-zero.
+        
+        ``label`` names the progress bar (default: the name of output_path).
+        """
         output_file = Path(output_path)
+        url = urlparse(file_url)
+        remote_path = unquote(url.path)
         
-        with urlopen(file_url) as response:
+        with ftplib.FTP(timeout=self.timeout) as ftp:
+            ftp.connect(url.hostname, url.port or 21)
+            ftp.login(url.username or "anonymous", url.password or "")
+            ftp.voidcmd("TYPE I")
+            
             # Try to get file size (not all FTP servers support this)
-            total_size = int(response.headers.get('Content-Length', 0))
+            try:
+                total_size = ftp.size(remote_path) or 0
+            except ftplib.error_perm:
+                total_size = 0
             
-            with open(output_path, 'wb') as f:
+            with open(output_path, 'ab' if offset else 'wb') as f:
                 with tqdm(
                     total=total_size,
+                    initial=offset,
                     unit='B',
                     unit_scale=True,
                     unit_divisor=1024,
-                    desc=output_file.name,
-                    disable=total_size == 0  # Disable if size unknown
+                    desc=label or output_file.name,
+                    # Disable if size unknown
+                    disable=total_size == 0 or progress_callback is not None
                 ) as pbar:
-                    while True:
-                        chunk = response.read(chunk_size)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        pbar.update(len(chunk))
+                    # Same as ftp.retrbinary, but receiving into one reusable buffer
+                    with ftp.transfercmd(f"RETR {remote_path}", rest=offset or None) as conn:
+                        _copy_stream(conn.recv_into, f.write, chunk_size,
+                                     progress_callback or pbar.update)
+                    ftp.voidresp()
+    
+    def _segmentable_size(self, file_url: str) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Size and validator (see _range_validator) of a file if the server
+        accepts byte ranges for it, else None.
+        """
+        try:
+            response = self.session.head(file_url, allow_redirects=True, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"HEAD request failed, using a single stream: {e}")
+            return None
+        
+        if response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            logger.info("Server does not accept byte ranges, using a single stream")
+            return None
+        length = response.headers.get("Content-Length")
+        return (int(length), _range_validator(response.headers)) if length else None
+    
+    def _download_segmented(self, file_url: str, output_file: Path, size: int, segments: int,
+                            chunk_size: int,
+                            progress_callback: Optional[Callable[[int], None]] = None,
+                            validator: Optional[str] = None) -> None:
+        """
+        Download a file as parallel byte ranges into a preallocated file.
+        
+        Each segment is written in place with os.pwrite by its own thread and
+        retried (from where it stopped) with the client's backoff. The file is
+        assembled in ``<output>.segments`` and renamed once every segment has
+        received exactly its byte count. If a segment fails for good, the
+        file is kept and the progress of every segment is saved to
+        ``<output>.segments.json``; the next call resumes each segment where
+        it stopped, unless the server's validator (ETag / Last-Modified) or
+        size changed.
+        """
+        temp_file = output_file.with_name(output_file.name + ".segments")
+        state_file = output_file.with_name(output_file.name + ".segments.json")
+        state = _load_segment_state(state_file, temp_file, size, validator)
+        if state is not None:
+            ranges, positions = state
+            done = sum(position - start for (start, _), position in zip(ranges, positions))
+            logger.info(f"Resuming segmented download with {done} of {size} bytes")
+        else:
+            segment_size = -(-size // segments)
+            ranges = [(start, min(start + segment_size, size) - 1)
+                      for start in range(0, size, segment_size)]
+            positions = [start for start, _ in ranges]
+            done = 0
+            logger.info(f"Downloading {size} bytes in {len(ranges)} segments")
+        
+        abort = threading.Event()
+        with tqdm(total=size, initial=done, unit='B', unit_scale=True, unit_divisor=1024,
+                  desc=output_file.name, disable=progress_callback is not None) as pbar:
+            on_chunk = progress_callback if progress_callback is not None else pbar.update
+            
+            flags = os.O_RDWR | os.O_CREAT | (0 if state is not None else os.O_TRUNC)
+            fd = os.open(temp_file, flags, 0o644)
+            try:
+                # Preallocate so segments can be written at their offsets
+                os.ftruncate(fd, size)
+                with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                    futures = [executor.submit(self._download_segment, file_url, fd, positions,
+                                               index, end, chunk_size, on_chunk, abort)
+                               for index, (_, end) in enumerate(ranges)
+                               if positions[index] <= end]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        abort.set()
+                        raise
+            except BaseException:
+                os.close(fd)
+                _save_segment_state(state_file, size, validator, ranges, positions)
+                raise
+            os.close(fd)
+        
+        # Every segment must have received exactly its byte range
+        for (start, end), position in zip(ranges, positions):
+            if position != end + 1:
+                _save_segment_state(state_file, size, validator, ranges, positions)
+                raise IOError(f"Segment {start}-{end} stopped at byte {position}")
+        state_file.unlink(missing_ok=True)
+        temp_file.replace(output_file)
+    
+    def _download_segment(self, file_url: str, fd: int, positions: List[int], index: int,
+                          end: int, chunk_size: int, progress_callback: Callable[[int], None],
+                          abort: threading.Event) -> None:
+        """
+        Fetch bytes positions[index]..end (inclusive) of a file and write them at their offset.
+        
+        positions[index] is advanced as data is written, so it records how
+        far the segment got if it fails.
+        """
+        start = positions[index]
+        last_exception = None
+        
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.get(file_url, stream=True, timeout=self.timeout,
+                                            headers={"Range": f"bytes={positions[index]}-{end}",
+                                                     "Accept-Encoding": "identity"})
+                with response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IOError("Server ignored the range request")
+                    
+                    def write_at_position(data: memoryview) -> None:
+                        if positions[index] + len(data) > end + 1:
+                            raise IOError(f"Segment {start}-{end} received more bytes than requested")
+                        _pwrite_all(fd, data, positions[index])
+                        positions[index] += len(data)
+                    
+                    _copy_stream(_response_readinto(response, chunk_size), write_at_position,
+                                 chunk_size, progress_callback, abort)
+                    if abort.is_set():
+                        return
+                
+                if positions[index] != end + 1:
+                    raise IOError(f"Segment {start}-{end} stopped at byte {positions[index]}")
+                return
+                
+            except requests.HTTPError as e:
+                # Don't retry client errors (4xx)
+                if e.response is not None and e.response.status_code < 500:
+                    raise
+                last_exception = e
+                
+            except (requests.RequestException, OSError) as e:
+                last_exception = e
+            
+            logger.warning(f"Segment {start}-{end} interrupted "
+                           f"(attempt {attempt + 1}/{self.max_retries}): {last_exception}")
+            if attempt < self.max_retries - 1 and not abort.is_set():
+                time.sleep(self.backoff_factor ** attempt)
+        
+        raise last_exception
+
+
+def partial_download_size(output_path: Path) -> int:
+    """
+    Bytes already held by an interrupted download_file call for output_path.
+    
+    Counts the ``.part`` file of a single-stream download, or the completed
+    bytes recorded for a segmented one; 0 if there is neither.
+    """
+    output_path = Path(output_path)
+    part_file = output_path.with_name(output_path.name + ".part")
+    if part_file.exists():
+        return part_file.stat().st_size
+    
+    state_file = output_path.with_name(output_path.name + ".segments.json")
+    if not state_file.exists():
+        return 0
+    try:
+        state = json.loads(state_file.read_text())
+        return sum(int(position) - int(start)
+                   for (start, _), position in zip(state["ranges"], state["positions"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0
+
+
+def _validator_file(part_file: Path) -> Path:
+    """File holding the If-Range validator of a partial download."""
+    part_file = Path(part_file)
+    return part_file.with_name(part_file.name + ".validator")
+
+
+def _range_validator(headers) -> Optional[str]:
+    """Validator of a response usable in If-Range: a strong ETag, else Last-Modified."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _load_segment_state(state_file: Path, temp_file: Path, size: int,
+                        validator: Optional[str]) -> Optional[Tuple[List[Tuple[int, int]], List[int]]]:
+    """Ranges and positions saved by an interrupted segmented download of the same file."""
+    if not (state_file.exists() and temp_file.exists()):
+        return None
+    try:
+        state = json.loads(state_file.read_text())
+        ranges = [(int(start), int(end)) for start, end in state["ranges"]]
+        positions = [int(position) for position in state["positions"]]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable segment state {state_file.name}: {e}")
+        return None
+    if state.get("size") != size or state.get("validator") != validator:
+        logger.info("File changed on the server, restarting the segmented download")
+        return None
+    return ranges, positions
+
+
+def _save_segment_state(state_file: Path, size: int, validator: Optional[str],
+                        ranges: List[Tuple[int, int]], positions: List[int]) -> None:
+    """Record how far each segment got, for _load_segment_state."""
+    try:
+        state_file.write_text(json.dumps({"size": size, "validator": validator,
+                                          "ranges": ranges, "positions": positions}))
+    except OSError as e:
+        logger.warning(f"Failed to save segment state {state_file.name}: {e}")
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    """Write all of ``data`` at ``offset`` (os.pwrite may write less)."""
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _response_readinto(response: requests.Response,
+                       chunk_size: int) -> Callable[[memoryview], int]:
+    """
+    Return a readinto function for the body of a streamed response.
+    
+    Without a content encoding and with urllib3 2, this is the response's
+    readinto, which fills the caller's buffer. Otherwise the body is read
+    with iter_content (which also decodes gzip/deflate) in chunks of
+    ``chunk_size``. A connection dropped mid-body (http.client or urllib3
+    IncompleteRead) is raised as requests.ChunkedEncodingError, so the
+    download is retried and resumed like any other interruption.
+    """
+    raw = response.raw
+    if (URLLIB3_READINTO and hasattr(raw, "readinto") and
+            response.headers.get("Content-Encoding", "identity") == "identity"):
+        def readinto(buffer: memoryview) -> int:
+            try:
+                return raw.readinto(buffer)
+            except (http.client.IncompleteRead, urllib3.exceptions.HTTPError) as e:
+                raise requests.exceptions.ChunkedEncodingError(e) from e
+        
+        return readinto
+    
+    chunks = response.iter_content(chunk_size)
+    pending = memoryview(b"")
+    
+    def readinto(buffer: memoryview) -> int:
+        nonlocal pending
+        if not pending:
+            pending = memoryview(next(chunks, b""))
+        n = min(len(buffer), len(pending))
+        buffer[:n] = pending[:n]
+        pending = pending[n:]
+        return n
+    
+    return readinto
+
+
+def _copy_stream(readinto: Callable[[memoryview], int], write: Callable[[memoryview], Any],
+                 buffer_size: int, progress: Callable[[int], Any],
+                 abort: Optional[threading.Event] = None) -> int:
+    """
+    Copy a stream to ``write`` through one reusable buffer.
+    
+    Progress is reported with the bytes copied since the previous report, at
+    most every PROGRESS_INTERVAL seconds and once at the end.
+    
+    Returns:
+        Number of bytes copied
+    """
+    buffer = memoryview(bytearray(buffer_size))
+    copied = pending = 0
+    last_report = time.monotonic()
+    
+    while abort is None or not abort.is_set():
+        n = readinto(buffer)
+        if not n:
+            break
+        write(buffer[:n])
+        copied += n
+        pending += n
+        
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            progress(pending)
+            pending = 0
+            last_report = now
+    
+    if pending:
+        progress(pending)
+    return copied
@@ -0,0 +1,428 @@
+"""
+Response Cache
+
+Single-file SQLite cache for API responses, with a TTL per entry and
+size-capped LRU eviction. Safe to share between threads and processes.
+An optional in-process LRU (MemoryCache) can sit in front of it.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key      TEXT PRIMARY KEY,
+    value    BLOB NOT NULL,
+    size     INTEGER NOT NULL,
+    expires  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    etag     TEXT,
+    last_modified TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed, size);
+"""
+
+# Running entry count and size, kept up to date by triggers in the writing
+# transaction so the limits can be checked without scanning the table
+_USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id      INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes   INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE usage SET entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE usage SET entries = entries - 1, bytes = bytes - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_resize AFTER UPDATE OF size ON responses BEGIN
+    UPDATE usage SET bytes = bytes - OLD.size + NEW.size;
+END;
+"""
+
+# Columns added after the first schema, created on open if missing
+_ADDED_COLUMNS = {"etag": "TEXT", "last_modified": "TEXT"}
+
+
+class CacheEntry(NamedTuple):
+    """A cached value with its expiry and HTTP validators."""
+    value: Any
+    expires: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires >= time.time()
+
+
+class ResponseCache:
+    """
+    Persistent key-value cache for JSON-serializable API responses.
+    
+    Values are stored as zlib-compressed compact JSON in one SQLite database
+    (WAL mode, so readers never block a writer). Each entry carries its own
+    expiry time. When the stored size exceeds ``max_bytes`` (or the number of
+    entries exceeds ``max_entries``), expired entries are dropped first, then
+    the least recently used ones.
+    
+    Each thread (and each process after a fork) opens its own connection, so
+    one cache file can be used by several workers at once.
+    
+    To keep reads cheap, an entry's access time is only rewritten when the
+    stored one is more than ``access_resolution`` seconds old, so the LRU
+    order is accurate to that resolution.
+    """
+    
+    def __init__(self, path: Path, max_bytes: Optional[int] = 512 * 1024 ** 2,
+                 max_entries: Optional[int] = None, timeout: float = 30.0,
+                 access_resolution: float = 60.0):
+        """
+        Open (or create) a response cache.
+        
+        Args:
+            path: SQLite database file
+            max_bytes: Maximum total size of stored values (default: 512 MB,
+                None for unlimited)
+            max_entries: Maximum number of entries (default: unlimited)
+            timeout: Seconds to wait for a lock held by another process
+            access_resolution: Minimum age in seconds of an entry's access
+                time before a read updates it (default: 60)
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.access_resolution = access_resolution
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self._migrate(conn)
+        # One transaction, so the initial usage matches the table
+        conn.executescript(f"BEGIN IMMEDIATE; {_USAGE_SCHEMA} COMMIT;")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Add columns missing from caches created by older versions."""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(responses)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                try:
+                    conn.execute(f"ALTER TABLE responses ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError:
+                    pass  # Added concurrently by another process
+    
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+    
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob))
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The stored value, or None if missing or expired
+        """
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+    
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """
+        Look up a cached value together with its expiry and validators.
+        
+        Args:
+            key: Cache key
+            allow_stale: Also return expired entries, e.g. to revalidate them
+                with a conditional request (default: False)
+        
+        Returns:
+            CacheEntry, or None if missing (or expired and not allow_stale).
+            Only fresh entries count as hits.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires, etag, last_modified, accessed FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        fresh = row is not None and row[1] >= now
+        self._count(hit=fresh)
+        if row is None or not (fresh or allow_stale):
+            if row is not None:
+                logger.debug(f"Cache expired: {key}")
+            return None
+        
+        blob, expires, etag, last_modified, accessed = row
+        if now - accessed > self.access_resolution:
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            return CacheEntry(self._decode(blob), expires, etag, last_modified)
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Dropping corrupt cache entry {key}: {e}")
+            self.delete(key)
+            return None
+    
+    def set(self, key: str, value: Any, ttl: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds
+            etag: ETag header of the response, for conditional requests
+            last_modified: Last-Modified header of the response
+        """
+        blob = self._encode(value)
+        now = time.time()
+        conn = self._connect()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete
+        # would not fire the usage trigger
+        conn.execute(
+            "INSERT INTO responses "
+            "(key, value, size, expires, accessed, etag, last_modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+            "expires = excluded.expires, accessed = excluded.accessed, "
+            "etag = excluded.etag, last_modified = excluded.last_modified",
+            (key, blob, len(blob), now + ttl, now, etag, last_modified),
+        )
+        self._evict(conn, now)
+    
+    def touch(self, key: str, ttl: float) -> Optional[float]:
+        """
+        Extend the lifetime of an entry, e.g. after a 304 Not Modified.
+        
+        Args:
+            key: Cache key
+            ttl: New time to live in seconds, from now
+        
+        Returns:
+            The new expiry time, or None if the entry no longer exists
+        """
+        now = time.time()
+        updated = self._connect().execute(
+            "UPDATE responses SET expires = ?, accessed = ? WHERE key = ?",
+            (now + ttl, now, key),
+        ).rowcount
+        return now + ttl if updated else None
+    
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._connect().execute("DELETE FROM responses")
+    
+    def __len__(self) -> int:
+        return self._usage(self._connect())[0]
+    
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the stored (compressed) values."""
+        return self._usage(self._connect())[1]
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters of this instance and current usage."""
+        count, total = self._usage(self._connect())
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": total}
+    
+    @staticmethod
+    def _usage(conn: sqlite3.Connection) -> Tuple[int, int]:
+        """Number of entries and total size, from the trigger-maintained usage row."""
+        return conn.execute("SELECT entries, bytes FROM usage").fetchone()
+    
+    def _count(self, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired, then least recently used, entries until within limits."""
+        if self.max_bytes is None and self.max_entries is None:
+            return
+        
+        if not self._over_limit(*self._usage(conn)):
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute("DELETE FROM responses WHERE expires < ?", (now,)).rowcount
+            count, total = self._usage(conn)
+            
+            # Walk entries from least to most recently used, deleting until
+            # both limits are met
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed"
+            ):
+                if not self._over_limit(count, total):
+                    break
+                victims.append((key,))
+                count -= 1
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        logger.debug(f"Evicted {expired} expired and {len(victims)} least recently "
+                     f"used cache entries")
+    
+    def _over_limit(self, count: int, total: int) -> bool:
+        return ((self.max_bytes is not None and total > self.max_bytes) or
+                (self.max_entries is not None and count > self.max_entries))
+
+
+class MemoryCache:
+    """
+    Bounded in-process LRU cache with per-entry expiry and hit/miss counters.
+    
+    Limited by entry count and by the approximate size of the values (their
+    compact JSON length). Values are returned as stored, without copying, so
+    callers must not modify them. Thread-safe.
+    """
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 ** 2):
+        """
+        Create an in-memory cache.
+        
+        Args:
+            max_entries: Maximum number of entries (default: 1024)
+            max_bytes: Maximum approximate size of all values (default: 64 MB)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a value, counting a hit or a miss.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The stored value, or None if missing or expired
+        """
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+    
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """
+        Look up a value with its expiry, counting a hit or a miss.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            CacheEntry (without validators), or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return CacheEntry(entry[0], entry[1])
+    
+    def set(self, key: str, value: Any, expires: float) -> None:
+        """
+        Store a value, evicting least recently used entries as needed.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            expires: Expiry as a Unix timestamp
+        """
+        size = len(json.dumps(value, separators=(",", ":")))
+        if size > self.max_bytes:
+            return  # Would evict everything else
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires, size)
+            self.total_bytes += size
+            
+            while (len(self._entries) > self.max_entries or
+                   self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+    
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+            }
+    
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
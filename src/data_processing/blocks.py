@@ -0,0 +1,85 @@
+"""
+Intensity Blocks
+
+Helpers shared by the data processing steps, which work on the numeric
+(intensity) columns of a protein x sample table as one float32 block.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+def intensity_block(data: pd.DataFrame, copy: bool = True) -> Tuple[List, np.ndarray]:
+    """
+    Numeric columns of a DataFrame and their values as a float32 block.
+    
+    Args:
+        data: Protein x sample table
+        copy: If False, the block may share memory with data and must not
+            be modified
+    
+    Returns:
+        Tuple of (numeric column names, C-ordered float32 block with NaN
+        for missing values)
+    """
+    numeric = data.select_dtypes(include="number")
+    if numeric.shape[1] == data.shape[1]:
+        numeric = data  # Avoid copying the frame for the column selection
+    if all(isinstance(dtype, np.dtype) for dtype in numeric.dtypes):
+        values = numeric.to_numpy(dtype=np.float32, copy=copy)
+    else:
+        # Nullable extension dtypes (e.g. Int32, Float64) hold pd.NA
+        values = numeric.to_numpy(dtype=np.float32, na_value=np.nan)
+    return list(numeric.columns), np.ascontiguousarray(values)
+
+
+def rebuild_frame(data: pd.DataFrame, keep: Optional[np.ndarray], columns: List,
+                  values: np.ndarray) -> pd.DataFrame:
+    """
+    Put a processed block back into its table.
+    
+    Args:
+        data: Table the block was taken from
+        keep: Boolean mask of the rows of data kept in the block (None for
+            all rows)
+        columns: Column names of the block, as returned by intensity_block
+        values: The block
+    
+    Returns:
+        DataFrame with the (filtered) rows of data, the block as its numeric
+        columns and the original column order
+    """
+    index = data.index if keep is None else data.index[keep]
+    block = pd.DataFrame(values, index=index, columns=columns)
+    if len(columns) == data.shape[1]:
+        return block
+    
+    others = data.drop(columns=columns)
+    if keep is not None:
+        others = others.loc[keep]
+    return pd.concat([others, block], axis=1)[data.columns]
+
+
+def column_nanquantile(values: np.ndarray, q: float) -> np.ndarray:
+    """
+    Quantile of each column ignoring NaN, for a whole block at once.
+    
+    Same result as np.nanquantile(values, q, axis=0) (linear
+    interpolation), which loops over columns. Sorting the rows of the
+    transposed block (NaN last) is vectorized and faster than sorting along
+    axis 0; values are then indexed by the observed count per column.
+    """
+    ordered = values.T.copy()
+    ordered.sort(axis=1)
+    observed = values.shape[0] - np.isnan(ordered).sum(axis=1)
+    last = np.maximum(observed - 1, 0)
+    position = q * last
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, last)
+    
+    columns = np.arange(values.shape[1])
+    below, above = ordered[columns, low], ordered[columns, high]
+    quantile = below + (position - low) * (above - below)
+    quantile[observed == 0] = np.nan
+    return quantile
@@ -7,44 +7,117 @@ Handles missing values, outliers, and data quality issues.
 import pandas as pd
 import numpy as np
 import logging
-from typing import Optional
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sklearn.decomposition import PCA
+from sklearn.neighbors import KDTree
+
+from .blocks import column_nanquantile, intensity_block, rebuild_frame
 
 logger = logging.getLogger(__name__)
 
+IMPUTATION_METHODS = ("mean", "median", "min", "knn", "downshift", "minprob")
+
+# Methods drawing random values from a left-censored distribution
+STOCHASTIC_METHODS = ("downshift", "minprob")
+
+# Sample groups: one label per intensity column, or column name -> label
+Groups = Union[Sequence[Hashable], Dict[Hashable, Hashable]]
+
+# Rows processed together during imputation; small enough that temporaries
+# stay in cache
+IMPUTE_BLOCK_ROWS = 256
+
+# KNN imputation: neighbour candidates are found in a KD-tree over at most
+# this many principal components of the mean-filled data, then re-ranked by
+# the exact NaN-aware distance
+KNN_INDEX_DIMENSIONS = 10
+# Candidates fetched per neighbour (per sample, the nearest candidates
+# observed in that sample are used)
+KNN_OVERSAMPLING = 4
+# Elements of a (rows x candidates x samples) gather processed at once
+KNN_BLOCK_ELEMENTS = 1 << 22
+
 
 class DataCleaner:
     """
     Cleans proteomics data by handling missing values and outliers.
+    
+    Data is a protein x sample table. Numeric (intensity) columns are
+    processed as one float32 block; other columns (e.g., accessions) are
+    carried along. The missing-value mask is computed once and shared by
+    filtering and imputation.
     """
     
-    def __init__(self, missing_threshold: float = 0.5):
+    def __init__(self, missing_threshold: float = 0.5,
+                 imputation_method: Optional[str] = "mean",
+                 n_neighbors: int = 10, n_jobs: Optional[int] = None,
+                 downshift: float = 1.8, downshift_width: float = 0.3,
+                 minprob_quantile: float = 0.01,
+                 random_state: Optional[Union[int, np.random.Generator]] = None):
         """
         Initialize data cleaner.
         
         Args:
             missing_threshold: Remove proteins with more than this fraction missing
+            imputation_method: Method used by clean() (see impute_missing);
+                None leaves missing values in place
+            n_neighbors: Neighbouring proteins averaged by KNN imputation
+                (default: 10)
+            n_jobs: Threads used by KNN imputation (default: all CPUs)
+            downshift: Shift of the downshift distribution below the sample
+                mean, in standard deviations (default: 1.8, as Perseus)
+            downshift_width: Width of the downshift distribution, in sample
+                standard deviations (default: 0.3, as Perseus)
+            minprob_quantile: Quantile of the observed intensities used as
+                the MinProb mean (default: 0.01)
+            random_state: Seed or Generator for the stochastic methods
         """
+        if imputation_method is not None and imputation_method not in IMPUTATION_METHODS:
+            raise ValueError(f"Unknown imputation method: {imputation_method}")
         self.missing_threshold = missing_threshold
+        self.imputation_method = imputation_method
+        self.n_neighbors = n_neighbors
+        self.n_jobs = n_jobs
+        self.downshift = downshift
+        self.downshift_width = downshift_width
+        self.minprob_quantile = minprob_quantile
+        self.rng = np.random.default_rng(random_state)
         logger.info(f"Initialized cleaner with missing threshold: {missing_threshold}")
     
-    def clean(self, data: pd.DataFrame) -> pd.DataFrame:
+    def clean(self, data: pd.DataFrame, groups: Optional[Groups] = None) -> pd.DataFrame:
         """
         Clean proteomics data.
         
+        Removes proteins with too many missing values, then imputes the
+        remaining ones with the configured method.
+        
         Args:
             data: Raw proteomics DataFrame
-            
+            groups: Sample groups for downshift/minprob (see impute_missing)
+        
         Returns:
-            Cleaned DataFrame
+            Cleaned DataFrame (intensity columns as float32)
         """
         logger.info(f"Cleaning data with shape: {data.shape}")
         
-        # TODO: Implement cleaning pipeline
-        # 1. Remove proteins with too many missing values
-        # 2. Handle outliers
-        # 3. Remove low-quality proteins
+        # No copy needed here: row selection below copies
+        columns, values = intensity_block(data, copy=False)
+        missing = np.isnan(values)
+        
+        keep = self._keep_mask(missing)
+        values, missing = values[keep], missing[keep]
         
-        raise NotImplementedError("Data cleaning not yet implemented")
+        if self.imputation_method is not None:
+            values = self._impute_block(values, missing, self.imputation_method,
+                                        self._group_codes(columns, groups))
+        
+        cleaned = rebuild_frame(data, keep, columns, values)
+        logger.info(f"Cleaned data shape: {cleaned.shape}")
+        return cleaned
     
     def remove_high_missing(self, data: pd.DataFrame) -> pd.DataFrame:
         """
@@ -52,23 +125,396 @@ class DataCleaner:
         
         Args:
             data: Input DataFrame
-            
+        
         Returns:
             Filtered DataFrame
         """
-        # TODO: Implement missing value filtering
-        raise NotImplementedError("Missing value filtering not yet implemented")
+        columns, values = intensity_block(data, copy=False)
+        keep = self._keep_mask(np.isnan(values))
+        return data.loc[keep]
     
-    def impute_missing(self, data: pd.DataFrame, method: str = "mean") -> pd.DataFrame:
+    def impute_missing(self, data: pd.DataFrame, method: str = "mean",
+                       groups: Optional[Groups] = None) -> pd.DataFrame:
         """
         Impute missing values.
         
+        - mean / median: per protein, over its observed samples
+        - min: per sample, its lowest observed intensity (left-censored
+          values assumed below the detection limit)
+        - knn: per protein and sample, the mean of the n_neighbors most
+          similar proteins observed in that sample (Euclidean distance over
+          the samples both proteins have, scaled to all samples). Neighbours
+          come from a spatial index rather than all protein pairs, so the
+          result is approximate; proteins without a usable neighbour get
+          their mean.
+        - downshift: random draws from a normal distribution below each
+          sample's observed intensities (Perseus): mean shifted down by
+          downshift standard deviations, width downshift_width times theirs
+        - minprob: random draws from a normal distribution centred on each
+          sample's minprob_quantile, with the median per-protein standard
+          deviation as its width (imputeLCMD's MinProb)
+        
+        downshift and minprob model values missing not at random (below the
+        detection limit) and expect log-transformed intensities. With
+        groups, their parameters are estimated from all samples of a group
+        together, e.g. the replicates of one condition.
+        
+        Args:
+            data: DataFrame with missing values
+            method: Imputation method ("mean", "median", "knn", "min",
+                "downshift", "minprob")
+            groups: Group label per intensity column (in order), or a
+                mapping of column name to group (default: each sample alone)
+        
+        Returns:
+            DataFrame with imputed values (intensity columns as float32)
+        """
+        if method not in IMPUTATION_METHODS:
+            raise ValueError(f"Unknown imputation method: {method}")
+        
+        columns, values = intensity_block(data)
+        values = self._impute_block(values, np.isnan(values), method,
+                                    self._group_codes(columns, groups))
+        return rebuild_frame(data, None, columns, values)
+    
+    def impute_replicates(self, data: pd.DataFrame, n_replicates: int,
+                          method: str = "downshift",
+                          groups: Optional[Groups] = None) -> Iterator[pd.DataFrame]:
+        """
+        Generate independent imputations of a stochastic method.
+        
+        The distribution parameters are estimated once; each replicate only
+        draws new values, e.g. for stability analysis of downstream results.
+        
         Args:
             data: DataFrame with missing values
-            method: Imputation method ("mean", "median", "knn", "min")
-            
+            n_replicates: Number of imputed tables to generate
+            method: "downshift" or "minprob" (see impute_missing)
+            groups: Sample groups (see impute_missing)
+        
+        Yields:
+            DataFrames with imputed values (intensity columns as float32)
+        """
+        if method not in STOCHASTIC_METHODS:
+            raise ValueError(f"Replicates need a stochastic imputation method "
+                             f"{STOCHASTIC_METHODS}, got: {method}")
+        
+        # Each replicate copies, so the block may share memory with data
+        columns, values = intensity_block(data, copy=False)
+        missing = np.isnan(values)
+        positions = np.flatnonzero(missing)
+        if len(positions):
+            loc, scale = self._censored_parameters(values, missing, method,
+                                                   self._group_codes(columns, groups))
+            # Per missing value, so each replicate is one bulk draw
+            sample = positions % values.shape[1]
+            loc, scale = loc[sample], scale[sample]
+        else:
+            loc = scale = np.empty(0, dtype=np.float32)
+        
+        for _ in range(n_replicates):
+            imputed = values.copy()
+            np.put(imputed, positions, _draw_normal(self.rng, loc, scale))
+            yield rebuild_frame(data, None, columns, imputed)
+    
+    def _keep_mask(self, missing: np.ndarray) -> np.ndarray:
+        """Rows whose missing fraction is within the threshold."""
+        n_samples = missing.shape[1]
+        if n_samples == 0:
+            return np.ones(missing.shape[0], dtype=bool)
+        
+        # Count comparison avoids a float division per row
+        keep = missing.sum(axis=1) <= self.missing_threshold * n_samples
+        logger.info(f"Removing {int((~keep).sum())} of {len(keep)} proteins with "
+                    f"more than {self.missing_threshold:.0%} missing values")
+        return keep
+    
+    def _impute_block(self, values: np.ndarray, missing: np.ndarray, method: str,
+                      groups: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Impute a float32 block in place.
+        
+        Args:
+            values: Protein x sample intensities (modified in place)
+            missing: np.isnan(values)
+            method: Imputation method
+            groups: Group code per sample for downshift/minprob (see
+                _group_codes)
+        
+        Returns:
+            The imputed block
+        """
+        if not missing.any():
+            return values
+        
+        if method == "min":
+            # The fill is at most every observed value of its sample, so fmax
+            # replaces exactly the NaNs (fmax ignores NaN)
+            np.fmax(values, np.fmin.reduce(values, axis=0), out=values)
+        elif method in ("mean", "median"):
+            for start in range(0, len(values), IMPUTE_BLOCK_ROWS):
+                block = values[start:start + IMPUTE_BLOCK_ROWS]
+                block_missing = missing[start:start + IMPUTE_BLOCK_ROWS]
+                if method == "mean":
+                    observed = block.shape[1] - block_missing.sum(axis=1)
+                    _fill_missing(block, block_missing, None)
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        fill = block.sum(axis=1, dtype=np.float64) / observed
+                else:
+                    fill = _row_nanmedian(block, block_missing)
+                    _fill_missing(block, block_missing, None)
+                _fill_missing(block, block_missing, fill.astype(np.float32))
+        elif method == "knn":
+            _knn_impute(values, missing, self.n_neighbors, self.n_jobs)
+        elif method in STOCHASTIC_METHODS:
+            loc, scale = self._censored_parameters(values, missing, method, groups)
+            positions = np.flatnonzero(missing)
+            sample = positions % values.shape[1]
+            np.put(values, positions, _draw_normal(self.rng, loc[sample], scale[sample]))
+        else:
+            raise ValueError(f"Unknown imputation method: {method}")
+        
+        logger.info(f"Imputed {int(missing.sum())} missing values with method: {method}")
+        return values
+    
+    def _censored_parameters(self, values: np.ndarray, missing: np.ndarray, method: str,
+                             groups: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mean and standard deviation of the downshift/minprob distribution per sample.
+        
+        All samples are handled in one pass over the block; per-group sums
+        are combined with np.bincount.
+        
+        Args:
+            values: Protein x sample intensities (NaN where missing)
+            missing: np.isnan(values)
+            method: "downshift" or "minprob"
+            groups: Group code per sample, or None for one group per sample
+        
         Returns:
-            DataFrame with imputed values
+            Tuple of (loc, scale) arrays with one float32 entry per sample;
+            NaN for groups with fewer than two observed values
         """
-        # TODO: Implement imputation methods
-        raise NotImplementedError("Imputation not yet implemented")
+        n_samples = values.shape[1]
+        pooled = groups is not None
+        if not pooled:
+            groups = np.arange(n_samples)
+        n_groups = int(groups.max()) + 1 if n_samples else 0
+        observed = ~missing
+        zeroed = values.copy()
+        _fill_missing(zeroed, missing, None)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if method == "downshift":
+                count = np.bincount(groups, observed.sum(axis=0), n_groups)
+                mean = np.bincount(groups, zeroed.sum(axis=0, dtype=np.float64), n_groups) / count
+                # Centred second pass: sums of squares of log intensities
+                # lose precision in float32
+                zeroed -= mean[groups].astype(np.float32)
+                zeroed *= observed
+                squares = np.einsum("ij,ij->j", zeroed, zeroed, dtype=np.float64)
+                sd = np.sqrt(np.bincount(groups, squares, n_groups) / (count - 1))
+                loc = (mean - self.downshift * sd)[groups]
+                scale = (self.downshift_width * sd)[groups]
+            else:
+                if pooled:
+                    # Flattened, nanquantile drops NaNs and partitions
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN groups
+                        loc = np.array([
+                            np.nanquantile(values[:, groups == group], self.minprob_quantile)
+                            for group in range(n_groups)
+                        ])[groups]
+                else:
+                    loc = column_nanquantile(values, self.minprob_quantile)
+                # Protein variability within each group, or across all
+                # samples without groups
+                scale = _median_protein_sd(
+                    zeroed, observed, groups if pooled else np.zeros(n_samples, dtype=np.intp)
+                )
+        
+        return loc.astype(np.float32), scale.astype(np.float32)
+    
+    @staticmethod
+    def _group_codes(columns: List, groups: Optional[Groups]) -> Optional[np.ndarray]:
+        """Integer group code per intensity column, or None without groups."""
+        if groups is None:
+            return None
+        if isinstance(groups, dict):
+            unknown = [column for column in columns if column not in groups]
+            if unknown:
+                raise ValueError(f"No group given for columns: {unknown}")
+            groups = [groups[column] for column in columns]
+        if len(groups) != len(columns):
+            raise ValueError(f"Expected {len(columns)} group labels, got {len(groups)}")
+        codes, _ = pd.factorize(pd.Series(list(groups)))
+        return codes
+
+
+def _fill_missing(block: np.ndarray, missing: np.ndarray, fill: Optional[np.ndarray]) -> None:
+    """
+    Set the missing entries of a block to a per-row fill value, in place.
+    
+    With fill=None, NaNs are set to zero. Equivalent to
+    ``np.copyto(block, fill[:, None], where=missing)``, but built from
+    arithmetic ufuncs: a masked copy branches on every element and is several
+    times slower when the mask is irregular, as missing values are.
+    """
+    if fill is None:
+        # fmax/fmin ignore NaN: their sum is the value, or 0 where NaN
+        negative = np.fmin(block, 0)
+        np.fmax(block, 0, out=block)
+        block += negative
+        return
+    
+    # Block is zero where missing; add fill there only. Rows without any
+    # observed value have a NaN fill, which must not touch other rows.
+    empty = np.isnan(fill)
+    filler = missing.astype(np.float32)
+    filler *= np.where(empty, 0, fill)[:, None]
+    block += filler
+    block[empty] = np.nan
+
+
+def _row_nanmedian(values: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """
+    Median of each row ignoring NaN, for a whole block at once.
+    
+    np.nanmedian falls back to a per-row loop for 2-D input; sorting with
+    NaN last and indexing by the observed count per row is vectorized.
+    """
+    observed = (~missing).sum(axis=1)
+    ordered = np.sort(values, axis=1)  # NaN sorts last
+    rows = np.arange(len(values))
+    # Middle pair of the observed values (the same element for odd counts)
+    low = ordered[rows, np.maximum((observed - 1) // 2, 0)]
+    high = ordered[rows, np.minimum(observed // 2, values.shape[1] - 1)]
+    median = (low + high) / 2
+    median[observed == 0] = np.nan
+    return median
+
+
+def _knn_impute(values: np.ndarray, missing: np.ndarray, n_neighbors: int,
+                n_jobs: Optional[int] = None) -> None:
+    """
+    KNN-impute the rows of a float32 block in place.
+    
+    Distances are those of sklearn's KNNImputer (nan_euclidean), but instead
+    of comparing every pair of rows, candidates come from a KD-tree over the
+    leading principal components of the mean-filled block. Each candidate
+    list is re-ranked by the exact distance, and every missing value is the
+    mean of the n_neighbors nearest candidates observed in its column.
+    
+    Rows are processed in blocks on a thread pool; KD-tree queries and numpy
+    release the GIL. Neighbour values are read from a NaN-free copy, so
+    imputed values never feed into other rows.
+    """
+    n_rows, n_columns = values.shape
+    n_candidates = min(n_neighbors * KNN_OVERSAMPLING, n_rows - 1)
+    receivers = np.flatnonzero(missing.any(axis=1))
+    if n_candidates < 1 or len(receivers) == 0:
+        return
+    
+    observed = ~missing
+    donors = values.copy()
+    _fill_missing(donors, missing, None)
+    
+    # Index coordinates: rows with their own mean filled in (the protein's
+    # abundance level dominates its position), reduced for the KD-tree
+    row_mean = donors.sum(axis=1, dtype=np.float64) / np.maximum(observed.sum(axis=1), 1)
+    coordinates = donors + missing * row_mean.astype(np.float32)[:, None]
+    if n_columns > KNN_INDEX_DIMENSIONS:
+        coordinates = PCA(n_components=KNN_INDEX_DIMENSIONS, svd_solver="randomized",
+                          random_state=0).fit_transform(coordinates)
+    tree = KDTree(coordinates)
+    
+    def impute_rows(rows: np.ndarray) -> None:
+        # First hit is normally the row itself; drop it, or the farthest
+        _, candidates = tree.query(coordinates[rows], k=n_candidates + 1)
+        is_self = candidates == rows[:, None]
+        is_self[~is_self.any(axis=1), -1] = True
+        candidates = candidates[~is_self].reshape(len(rows), n_candidates)
+        
+        # NaN-aware squared distance from sums over the shared columns:
+        # sum (x - y)^2 = x^2 . o_y + o_x . y^2 - 2 x . y (x, y zero-filled)
+        x, x_observed = donors[rows], observed[rows].astype(np.float32)
+        y, y_observed = donors[candidates], observed[candidates]
+        y_weight = y_observed.astype(np.float32)
+        squared = (np.matmul(y_weight, (x * x)[:, :, None])[..., 0]
+                   + np.matmul(y * y, x_observed[:, :, None])[..., 0]
+                   - 2 * np.matmul(y, x[:, :, None])[..., 0])
+        shared = np.matmul(y_weight, x_observed[:, :, None])[..., 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distance = np.where(shared > 0, np.maximum(squared, 0) / shared, np.inf)
+        
+        # Walk the candidates nearest first; per column, sum the first
+        # n_neighbors observed values
+        order = np.argsort(distance, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        usable = np.isfinite(np.take_along_axis(distance, order, axis=1))
+        total = np.zeros(x.shape, dtype=np.float32)
+        count = np.zeros(x.shape, dtype=np.float32)
+        for rank in range(n_candidates):
+            neighbour = candidates[:, rank]
+            take = observed[neighbour]
+            take &= count < n_neighbors
+            take &= usable[:, rank, None]
+            total += donors[neighbour] * take
+            count += take
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fill = total / count
+        
+        fallback = np.broadcast_to(row_mean[rows, None], fill.shape)
+        fill = np.where(count > 0, fill, fallback).astype(np.float32)
+        values[rows] = np.where(missing[rows], fill, values[rows])
+    
+    block_rows = max(1, KNN_BLOCK_ELEMENTS // (n_candidates * n_columns))
+    blocks = [receivers[start:start + block_rows]
+              for start in range(0, len(receivers), block_rows)]
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        list(executor.map(impute_rows, blocks))
+    
+    # Rows without any observed value have no position to search from
+    values[missing.all(axis=1)] = np.nan
+
+
+def _median_protein_sd(zeroed: np.ndarray, observed: np.ndarray,
+                       groups: np.ndarray) -> np.ndarray:
+    """
+    Median over proteins of each protein's standard deviation within a group.
+    
+    Args:
+        zeroed: Protein x sample block with missing values set to zero
+            (modified)
+        observed: Mask of observed values
+        groups: Group code per sample
+    
+    Returns:
+        The median of the group of each sample (NaN if no protein has two
+        observed values in the group)
+    """
+    n_samples = len(groups)
+    membership = np.zeros((n_samples, groups.max() + 1), dtype=np.float32)
+    membership[np.arange(n_samples), groups] = 1
+    
+    # Per-group sums of the row-centred block, so float32 products stay small
+    zeroed -= (zeroed.sum(axis=1) / np.maximum(observed.sum(axis=1), 1))[:, None]
+    zeroed *= observed
+    count = observed.astype(np.float32) @ membership
+    total = zeroed @ membership
+    squares = (zeroed * zeroed) @ membership
+    with np.errstate(invalid="ignore", divide="ignore"):
+        protein_sd = np.sqrt(np.maximum(squares - total * total / count, 0) / (count - 1))
+    protein_sd[count < 2] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN groups
+        return np.nanmedian(protein_sd, axis=0)[groups]
+
+
+def _draw_normal(rng: np.random.Generator, loc: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Draw one float32 normal value per (loc, scale) pair in bulk."""
+    draws = rng.standard_normal(len(loc), dtype=np.float32)
+    draws *= scale
+    draws += loc
+    return draws
+
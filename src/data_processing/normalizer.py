@@ -7,16 +7,38 @@ Normalizes proteomics data to remove technical variation.
 import pandas as pd
 import numpy as np
 import logging
-from typing import Literal
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional, Union
+
+from .blocks import column_nanquantile, intensity_block, rebuild_frame
 
 logger = logging.getLogger(__name__)
 
 NormalizationMethod = Literal["median", "quantile", "zscore", "log2"]
 
+# Elements of one column chunk (rows x columns) processed at once by quantile
+# normalization; a few temporaries of this size are alive per chunk
+QUANTILE_CHUNK_ELEMENTS = 1 << 23
+
 
 class Normalizer:
     """
     Normalizes proteomics data using various methods.
+    
+    Works on the numeric (intensity) columns of a protein x sample table as
+    a float32 block; other columns are carried along. Missing values stay
+    missing and are ignored by the per-sample statistics.
+    
+    fit learns the normalization state: per-sample medians and their common
+    target (median), per-sample means and standard deviations (zscore), or
+    the reference distribution (quantile). transform applies it to any
+    batch in time linear in its size: each sample's median, mean and
+    standard deviation are computed from the batch itself and shifted to the
+    frozen target, or its values are mapped onto the frozen reference. With
+    use_fitted_stats=True, samples whose names were seen during fit reuse
+    their fitted statistics instead (e.g. to normalize a subset of the
+    fitted proteins). The state can be saved and loaded as .npz.
     """
     
     def __init__(self, method: NormalizationMethod = "median", log_transform: bool = True):
@@ -27,64 +49,490 @@ class Normalizer:
             method: Normalization method to use
             log_transform: Whether to apply log2 transformation
         """
+        if method not in ("median", "quantile", "zscore", "log2"):
+            raise ValueError(f"Unknown normalization method: {method}")
         self.method = method
         self.log_transform = log_transform
+        # Learned by fit
+        self.sample_stats: Optional[pd.DataFrame] = None
+        self.center: Optional[float] = None
+        self.reference: Optional[np.ndarray] = None
+        self.is_fitted = False
         logger.info(f"Initialized normalizer: method={method}, log_transform={log_transform}")
     
     def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
         """
         Normalize proteomics data.
         
+        Applies the log2 transformation (if enabled, or for method "log2"),
+        then the normalization method. Same as fit_transform: the
+        normalizer keeps the state learned from data.
+        
         Args:
             data: Input DataFrame with protein intensities
-            
+        
         Returns:
-            Normalized DataFrame
+            Normalized DataFrame (intensity columns as float32)
         """
         logger.info(f"Normalizing data with method: {self.method}")
+        return self.fit_transform(data)
+    
+    def fit(self, data: pd.DataFrame) -> "Normalizer":
+        """
+        Learn the normalization state from data.
+        
+        Args:
+            data: Input DataFrame with protein intensities
+        
+        Returns:
+            self
+        """
+        columns, values = intensity_block(data)
+        self._fit_block(columns, self._log2(values))
+        return self
+    
+    def transform(self, data: pd.DataFrame, use_fitted_stats: bool = False) -> pd.DataFrame:
+        """
+        Normalize data with the fitted state.
+        
+        Args:
+            data: DataFrame with protein intensities; may contain samples
+                (columns) not seen by fit
+            use_fitted_stats: Apply the fitted per-sample statistics (median,
+                or mean and standard deviation) to samples with the same
+                column name, instead of computing them from data. Only
+                correct if those columns hold the fitted samples (default:
+                False)
+        
+        Returns:
+            Normalized DataFrame (intensity columns as float32)
+        
+        Raises:
+            RuntimeError: If the normalizer is not fitted
+        """
+        self._check_fitted()
+        columns, values = intensity_block(data)
+        values = self._transform_block(columns, self._log2(values), use_fitted_stats)
+        return rebuild_frame(data, None, columns, values)
+    
+    def fit_transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Learn the normalization state from data and normalize it.
+        
+        Args:
+            data: Input DataFrame with protein intensities
+        
+        Returns:
+            Normalized DataFrame (intensity columns as float32)
+        """
+        columns, values = intensity_block(data)
+        values = self._log2(values)
+        self._fit_block(columns, values)
+        values = self._transform_block(columns, values, use_fitted_stats=True)
+        return rebuild_frame(data, None, columns, values)
+    
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the fitted state as .npz (no pickled objects).
+        
+        Sample names are stored as strings.
         
-        # TODO: Implement normalization pipeline
-        # 1. Optional log transformation
-        # 2. Apply normalization method
-        # 3. Return normalized data
+        Args:
+            path: File to write
+        
+        Raises:
+            RuntimeError: If the normalizer is not fitted
+        """
+        self._check_fitted()
+        arrays = {"method": np.array(self.method),
+                  "log_transform": np.array(self.log_transform)}
+        if self.sample_stats is not None:
+            arrays["samples"] = self.sample_stats.index.to_numpy(dtype=str)
+            for name, column in self.sample_stats.items():
+                arrays[f"stat_{name}"] = column.to_numpy()
+        if self.center is not None:
+            arrays["center"] = np.array(self.center)
+        if self.reference is not None:
+            arrays["reference"] = self.reference
         
-        raise NotImplementedError("Normalization not yet implemented")
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        logger.info(f"Saved {self.method} normalizer to {path}")
+    
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Normalizer":
+        """
+        Load a normalizer saved with save.
+        
+        Args:
+            path: .npz file written by save
+        
+        Returns:
+            Fitted Normalizer
+        """
+        with np.load(path, allow_pickle=False) as stored:
+            normalizer = cls(method=str(stored["method"]),
+                             log_transform=bool(stored["log_transform"]))
+            if "samples" in stored:
+                normalizer.sample_stats = pd.DataFrame(
+                    {key[len("stat_"):]: stored[key] for key in stored.files
+                     if key.startswith("stat_")},
+                    index=pd.Index(stored["samples"]),
+                )
+            if "center" in stored:
+                normalizer.center = float(stored["center"])
+            if "reference" in stored:
+                normalizer.reference = stored["reference"]
+        normalizer.is_fitted = True
+        logger.info(f"Loaded {normalizer.method} normalizer from {path}")
+        return normalizer
+    
+    def _check_fitted(self) -> None:
+        if not self.is_fitted:
+            raise RuntimeError("Normalizer is not fitted; call fit or load first")
+    
+    def _log2(self, values: np.ndarray) -> np.ndarray:
+        """Apply the log2 transformation in place if enabled (or for method "log2")."""
+        if self.log_transform or self.method == "log2":
+            _log2(values)
+        return values
+    
+    def _fit_block(self, columns: List, values: np.ndarray) -> None:
+        """Learn the state from a (log-transformed) float32 block."""
+        self.sample_stats = self.center = self.reference = None
+        samples = pd.Index([str(column) for column in columns])
+        
+        if self.method == "median":
+            medians = column_nanquantile(values, 0.5)
+            self.sample_stats = pd.DataFrame({"median": medians}, index=samples)
+            self.center = float(np.nanmedian(medians)) if len(medians) else 0.0
+        elif self.method == "zscore":
+            mean, sd = _column_mean_sd(values)
+            self.sample_stats = pd.DataFrame({"mean": mean, "sd": sd}, index=samples)
+        elif self.method == "quantile":
+            self.reference = _quantile_reference(values)
+        self.is_fitted = True
+    
+    def _transform_block(self, columns: List, values: np.ndarray,
+                         use_fitted_stats: bool = False) -> np.ndarray:
+        """Normalize a (log-transformed) float32 block in place with the fitted state."""
+        if self.method == "median":
+            medians = self._sample_statistics(
+                columns, values, lambda block: {"median": column_nanquantile(block, 0.5)},
+                use_fitted_stats,
+            )
+            values -= (medians["median"] - self.center).astype(np.float32)
+        elif self.method == "zscore":
+            stats = self._sample_statistics(
+                columns, values, lambda block: dict(zip(("mean", "sd"), _column_mean_sd(block))),
+                use_fitted_stats,
+            )
+            values -= stats["mean"].astype(np.float32)
+            values /= stats["sd"].astype(np.float32)
+        elif self.method == "quantile":
+            # Each chunk is read before it is written, so in place is safe
+            _quantile_apply(values, values, self.reference)
+        return values
+    
+    def _sample_statistics(self, columns: List, values: np.ndarray,
+                           compute: Callable[[np.ndarray], Dict[str, np.ndarray]],
+                           use_fitted_stats: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Statistics per column of a block.
+        
+        Args:
+            columns: Sample names of the block
+            values: Block to compute the statistics from
+            compute: Statistics of a block's columns by name
+            use_fitted_stats: Take the fitted statistics of samples with the
+                same name, computing them only for unseen samples
+        
+        Returns:
+            Array per statistic, aligned with columns
+        """
+        if not use_fitted_stats:
+            return compute(values)
+        
+        stats = self.sample_stats.reindex([str(column) for column in columns])
+        new = ~stats.index.isin(self.sample_stats.index)
+        result = {name: stats[name].to_numpy(dtype=np.float64, copy=True) for name in stats}
+        if new.any():
+            logger.info(f"Computing statistics for {int(new.sum())} new samples")
+            for name, computed in compute(values[:, new]).items():
+                result[name][new] = computed
+        return result
     
     def median_normalization(self, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Median normalization (subtract median from each sample).
+        Median normalization (shift each sample so its median equals the
+        median of all sample medians).
+        
+        Expects log-scale intensities, where a constant shift corresponds to
+        a loading difference.
         
         Args:
             data: Input DataFrame
-            
+        
         Returns:
             Median-normalized DataFrame
         """
-        # TODO: Implement median normalization
-        raise NotImplementedError("Median normalization not yet implemented")
+        columns, values = intensity_block(data)
+        return rebuild_frame(data, None, columns, _median_normalize(values))
     
-    def quantile_normalization(self, data: pd.DataFrame) -> pd.DataFrame:
+    def quantile_normalization(self, data: pd.DataFrame,
+                               chunk_columns: Optional[int] = None) -> pd.DataFrame:
         """
         Quantile normalization (make distributions identical).
         
+        Every sample is mapped onto a common reference distribution, the
+        mean of the samples' quantile functions. Samples are processed in
+        column chunks (see quantile_normalize_file for matrices that do not
+        fit in memory). Missing values are handled as in preprocessCore:
+        each sample's observed values are spread over the whole reference
+        (quantiles interpolated onto a common grid), and stay missing. Tied
+        values get the reference at their average rank.
+        
         Args:
             data: Input DataFrame
-            
+            chunk_columns: Samples processed at once (default: as many as
+                fit in QUANTILE_CHUNK_ELEMENTS)
+        
         Returns:
             Quantile-normalized DataFrame
         """
-        # TODO: Implement quantile normalization
-        raise NotImplementedError("Quantile normalization not yet implemented")
+        columns, values = intensity_block(data, copy=False)
+        normalized = _quantile_normalize(values, np.empty(values.shape, dtype=np.float32),
+                                         chunk_columns=chunk_columns)
+        return rebuild_frame(data, None, columns, normalized)
+    
+    def quantile_normalize_file(self, input_path: Union[str, Path],
+                                output_path: Union[str, Path],
+                                chunk_columns: Optional[int] = None,
+                                fit: bool = True) -> np.memmap:
+        """
+        Quantile-normalize a protein x sample matrix stored as .npy, out of core.
+        
+        The input is memory-mapped read-only and the result is written to a
+        new .npy file through np.lib.format.open_memmap, so memory use is
+        bounded by one column chunk (two passes over the input). The log2
+        transformation is applied on the way if enabled. Store the input in
+        Fortran (column-major) order to make column chunks contiguous on disk;
+        the output uses the same order as the input.
+        
+        Args:
+            input_path: .npy file with intensities (NaN for missing values)
+            output_path: .npy file to create (float32)
+            chunk_columns: Samples processed at once (default: as many as
+                fit in QUANTILE_CHUNK_ELEMENTS)
+            fit: Learn the reference distribution from this matrix (kept as
+                the fitted state of a quantile normalizer). False maps the
+                matrix onto the fitted reference in a single pass
+        
+        Returns:
+            The normalized matrix, memory-mapped from output_path
+        
+        Raises:
+            RuntimeError: If fit is False and no reference is fitted
+        """
+        if not fit and self.reference is None:
+            raise RuntimeError("Normalizer has no fitted quantile reference")
+        
+        source = np.load(input_path, mmap_mode="r")
+        if source.ndim != 2:
+            raise ValueError(f"Expected a 2-D matrix in {input_path}, got shape {source.shape}")
+        
+        out = np.lib.format.open_memmap(
+            output_path, mode="w+", dtype=np.float32, shape=source.shape,
+            fortran_order=source.flags.f_contiguous and not source.flags.c_contiguous,
+        )
+        logger.info(f"Quantile-normalizing {input_path} {source.shape} into {output_path}")
+        if fit:
+            reference = _quantile_reference(source, chunk_columns, self.log_transform)
+            if self.method == "quantile":
+                self.sample_stats = self.center = None
+                self.reference = reference
+                self.is_fitted = True
+        else:
+            reference = self.reference
+        _quantile_apply(source, out, reference, chunk_columns, self.log_transform)
+        out.flush()
+        return out
     
     def zscore_normalization(self, data: pd.DataFrame) -> pd.DataFrame:
         """
         Z-score normalization (mean=0, std=1).
         
+        Per sample, over its observed values.
+        
         Args:
             data: Input DataFrame
-            
+        
         Returns:
             Z-score normalized DataFrame
         """
-        # TODO: Implement z-score normalization
-        raise NotImplementedError("Z-score normalization not yet implemented")
+        columns, values = intensity_block(data)
+        return rebuild_frame(data, None, columns, _zscore_normalize(values))
+
+
+def _log2(values: np.ndarray) -> np.ndarray:
+    """log2 in place; zero and negative intensities become missing."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.log2(values, out=values)
+    values[np.isneginf(values)] = np.nan
+    return values
+
+
+def _median_normalize(values: np.ndarray) -> np.ndarray:
+    """Shift the columns of a block in place to the median of their medians."""
+    medians = column_nanquantile(values, 0.5)
+    values -= (medians - np.nanmedian(medians)).astype(np.float32)
+    return values
+
+
+def _column_mean_sd(values: np.ndarray):
+    """
+    Mean and standard deviation (ddof=1) of each column, ignoring NaN.
+    
+    Constant columns and columns with a single value get a standard
+    deviation of 1, so standardizing only centers them.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Columns without two values
+        mean = np.nanmean(values, axis=0, dtype=np.float64)
+        sd = np.nanstd(values, axis=0, dtype=np.float64, ddof=1)
+    sd[~(sd > 0)] = 1.0
+    return mean, sd
+
+
+def _zscore_normalize(values: np.ndarray) -> np.ndarray:
+    """Standardize the columns of a block in place, ignoring NaN."""
+    mean, sd = _column_mean_sd(values)
+    values -= mean.astype(np.float32)
+    values /= sd.astype(np.float32)
+    return values
+
+
+def _column_chunks(n_rows: int, n_columns: int, chunk_columns: Optional[int]):
+    """Slices covering the columns, each at most chunk_columns wide."""
+    if chunk_columns is None:
+        chunk_columns = max(1, QUANTILE_CHUNK_ELEMENTS // max(n_rows, 1))
+    for start in range(0, n_columns, chunk_columns):
+        yield slice(start, min(start + chunk_columns, n_columns))
+
+
+def _load_chunk(source: np.ndarray, columns: slice, log2: bool) -> np.ndarray:
+    """Columns of source as a sample x protein float32 block (one sample per row)."""
+    chunk = np.array(source[:, columns].T, dtype=np.float32, order="C")
+    return _log2(chunk) if log2 else chunk
+
+
+def _sort_rows(chunk: np.ndarray):
+    """
+    Sort each row of a float32 block (NaN last), with the original positions.
+    
+    Same as np.argsort followed by take_along_axis, but several times faster:
+    each value is packed with its position into a uint64 key (the float bits
+    mapped to an order-preserving unsigned integer, position in the low 32
+    bits), and np.sort of integers is vectorized where argsort is not.
+    
+    Returns:
+        Tuple of (sorted values, positions in the unsorted row)
+    """
+    bits = chunk.view(np.uint32)
+    # Negative floats order reversed (flip all bits), others above them
+    key = np.where(bits >> 31 == 1, ~bits, bits | np.uint32(0x80000000))
+    key[np.isnan(chunk)] = 0xFFFFFFFF  # Any NaN payload sorts last
+    packed = key.astype(np.uint64) << np.uint64(32)
+    packed |= np.arange(chunk.shape[1], dtype=np.uint64)
+    packed.sort(axis=1)
+    
+    order = (packed & np.uint64(0xFFFFFFFF)).astype(np.intp)
+    key = (packed >> np.uint64(32)).astype(np.uint32)
+    bits = np.where(key >> 31 == 1, key & np.uint32(0x7FFFFFFF), ~key)
+    return bits.view(np.float32), order
+
+
+def _quantile_reference(source: np.ndarray, chunk_columns: Optional[int] = None,
+                        log2: bool = False) -> np.ndarray:
+    """
+    Mean quantile function of the columns of source, accumulated chunk by chunk.
+    
+    Each column's sorted observed values are interpolated onto a grid of
+    len(source) evenly spaced quantiles, so columns with different numbers
+    of missing values contribute equally.
+    
+    Returns:
+        Reference values at the grid quantiles (float64, ascending)
+    """
+    n_rows, n_columns = source.shape
+    grid = np.linspace(0, 1, n_rows)
+    total = np.zeros(n_rows)
+    contributing = 0
+    
+    for columns in _column_chunks(n_rows, n_columns, chunk_columns):
+        chunk = _load_chunk(source, columns, log2)
+        chunk.sort(axis=1)  # NaN last
+        observed = n_rows - np.isnan(chunk).sum(axis=1)
+        chunk, observed = chunk[observed > 0], observed[observed > 0]
+        if not len(chunk):
+            continue
+        
+        # Fractional index of each grid quantile among the observed values
+        index = grid * (observed - 1)[:, None]
+        low = np.floor(index).astype(np.intp)
+        high = np.minimum(low + 1, (observed - 1)[:, None])
+        below = np.take_along_axis(chunk, low, axis=1)
+        above = np.take_along_axis(chunk, high, axis=1)
+        total += (below + (index - low) * (above - below)).sum(axis=0, dtype=np.float64)
+        contributing += len(chunk)
+    
+    if not contributing:
+        return np.full(n_rows, np.nan)
+    return total / contributing
+
+
+def _quantile_apply(source: np.ndarray, out: np.ndarray, reference: np.ndarray,
+                    chunk_columns: Optional[int] = None, log2: bool = False) -> np.ndarray:
+    """
+    Replace every value of source by the reference at its quantile, chunk by chunk.
+    
+    A value's quantile is its rank among the observed values of its column
+    (ties averaged) over the number of observed values minus one; a column
+    with a single observation maps to the reference median.
+    """
+    n_rows, n_columns = source.shape
+    grid = np.linspace(0, 1, len(reference))
+    
+    for columns in _column_chunks(n_rows, n_columns, chunk_columns):
+        chunk = _load_chunk(source, columns, log2)
+        ordered, order = _sort_rows(chunk)
+        observed = n_rows - np.isnan(ordered).sum(axis=1)
+        
+        # Average rank of each run of equal values: first and last index of
+        # the run, propagated along the sorted rows
+        positions = np.broadcast_to(np.arange(n_rows), ordered.shape)
+        differs = ordered[:, 1:] != ordered[:, :-1]
+        first = np.ones(ordered.shape, dtype=bool)
+        first[:, 1:] = differs
+        last = np.ones(ordered.shape, dtype=bool)
+        last[:, :-1] = differs
+        run_start = np.maximum.accumulate(np.where(first, positions, 0), axis=1)
+        run_end = np.minimum.accumulate(np.where(last, positions, n_rows)[:, ::-1], axis=1)[:, ::-1]
+        rank = (run_start + run_end) / 2
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            quantile = np.where(observed[:, None] > 1, rank / (observed - 1)[:, None], 0.5)
+        normalized = np.interp(quantile.ravel(), grid, reference).reshape(ordered.shape)
+        normalized[np.isnan(ordered)] = np.nan
+        
+        np.put_along_axis(chunk, order, normalized.astype(np.float32), axis=1)
+        out[:, columns] = chunk.T
+    
+    return out
+
+
+def _quantile_normalize(source: np.ndarray, out: np.ndarray,
+                        chunk_columns: Optional[int] = None, log2: bool = False) -> np.ndarray:
+    """Quantile-normalize the columns of source into out (may be source itself)."""
+    reference = _quantile_reference(source, chunk_columns, log2)
+    return _quantile_apply(source, out, reference, chunk_columns, log2)
@@ -0,0 +1,160 @@
+"""
+Test Module for Async PRIDE API Client
+
+Unit tests for the asyncio PRIDE client, using a mocked transport.
+"""
+
+import asyncio
+import pytest
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+httpx = pytest.importorskip("httpx")
+
+from data_acquisition.async_pride_api import AsyncPRIDEClient
+from data_acquisition.pride_api import PRIDEClient
+
+
+def make_client(tmp_path, handler, **kwargs):
+    """Create an async client whose requests go to a mock handler."""
+    client = AsyncPRIDEClient(cache_dir=tmp_path / "cache", backoff_factor=0.01, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._semaphore = asyncio.Semaphore(client.max_concurrency)
+    return client
+
+
+class TestAsyncPRIDEClient:
+    """Tests for the async PRIDE API client."""
+    
+    def test_concurrent_metadata(self, tmp_path):
+        """Test that a batch resolves concurrently with bounded concurrency."""
+        in_flight = 0
+        peak = 0
+        
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            accession = request.url.path.rsplit("/", 1)[-1]
+            if accession == "PXD999999":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"accession": accession})
+        
+        accessions = [f"PXD{i:06d}" for i in range(12)] + ["PXD999999"]
+        
+        async def scenario():
+            async with make_client(tmp_path, handler, max_concurrency=4) as client:
+                return await client.aget_many_datasets_metadata(accessions)
+        
+        results, errors = asyncio.run(scenario())
+        
+        assert len(results) == 12
+        assert results["PXD000003"]["accession"] == "PXD000003"
+        assert isinstance(errors["PXD999999"], ValueError)
+        assert 1 < peak <= 4
+    
+    def test_shares_cache_with_sync_client(self, tmp_path):
+        """Test that async responses are cached for the sync client and vice versa."""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json=[{
+                "fileName": "result.mztab",
+                "fileSizeBytes": 1024,
+                "fileCategory": {"value": "RESULT"},
+                "publicFileLocations": [{"name": "FTP Protocol", "value": "ftp://host/result.mztab"}],
+            }])
+        
+        async def scenario():
+            async with make_client(tmp_path, handler) as client:
+                first = await client.aget_dataset_files("PXD000001")
+                second = await client.aget_dataset_files("PXD000001")
+                return first, second
+        
+        first, second = asyncio.run(scenario())
+        
+        assert first == second
+        assert first[0]["downloadUrl"] == "ftp://host/result.mztab"
+        assert calls == ["/pride/ws/archive/v3/projects/PXD000001/files"]
+        
+        sync_client = PRIDEClient(cache_dir=tmp_path / "cache")
+        assert sync_client.get_dataset_files("PXD000001") == first
+    
+    def test_conditional_revalidation(self, tmp_path):
+        """Test that expired entries are revalidated and a 304 restarts their TTL."""
+        requests = []
+        
+        def handler(request):
+            requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"accession": "PXD000001"}, headers={"ETag": '"v1"'})
+        
+        async def scenario(client):
+            return await client.aget_dataset_metadata("PXD000001")
+        
+        client = make_client(tmp_path, handler, memory_cache_entries=0)
+        key = client._get_cache_key("metadata", dataset_id="PXD000001")
+        asyncio.run(scenario(client))
+        assert client.cache.get_entry(key).etag == '"v1"'
+        client.cache.touch(key, ttl=-1)  # Expire it
+        
+        # New client for the new event loop, sharing the cache
+        client = make_client(tmp_path, handler, memory_cache_entries=0)
+        cache_threads = []
+        get_entry = client.cache.get_entry
+        
+        def recording_get_entry(*args, **kwargs):
+            cache_threads.append(threading.current_thread())
+            return get_entry(*args, **kwargs)
+        
+        with patch.object(client.cache, "get_entry", side_effect=recording_get_entry):
+            metadata = asyncio.run(scenario(client))
+        
+        assert metadata == {"accession": "PXD000001"}
+        assert len(requests) == 2
+        assert "If-None-Match" not in requests[0].headers
+        assert client._get_from_cache(key) == metadata
+        # Cache I/O runs off the event loop
+        assert cache_threads and threading.main_thread() not in cache_threads
+    
+    def test_retry_on_server_error(self, tmp_path):
+        """Test that 5xx responses are retried."""
+        responses = [httpx.Response(503), httpx.Response(200, json=[{"accession": "PXD1"}])]
+        
+        def handler(request):
+            return responses.pop(0)
+        
+        async def scenario():
+            async with make_client(tmp_path, handler, max_retries=2) as client:
+                return await client.asearch_datasets("Erwinia", page_size=5)
+        
+        results = asyncio.run(scenario())
+        assert results == [{"accession": "PXD1"}]
+        assert responses == []
+    
+    def test_inherited_sync_methods(self, tmp_path):
+        """Test that the async client can stand in for PRIDEClient."""
+        client = AsyncPRIDEClient(cache_dir=tmp_path / "cache")
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = [{"accession": "PXD1"}, {"accession": "PXD2"}]
+        
+        with patch.object(client.session, "get", return_value=response) as get:
+            results = list(client.iter_search_datasets("Erwinia", page_size=5))
+            searched = client.search_datasets("Erwinia", page_size=5)
+        
+        assert results == [{"accession": "PXD1"}, {"accession": "PXD2"}]
+        assert searched == results
+        assert get.call_count == 1  # Same cached page
+        
+        response.json.return_value = {"accession": "PXD1"}
+        with patch.object(client.session, "get", return_value=response):
+            assert client.get_dataset_metadata("PXD1") == {"accession": "PXD1"}
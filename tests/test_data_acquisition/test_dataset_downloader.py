@@ -0,0 +1,166 @@
+"""
+Test Module for Dataset Downloader
+
+Unit tests for dataset download, using a mocked PRIDE client.
+"""
+
+import hashlib
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from data_acquisition.dataset_downloader import DatasetDownloader, TokenBucket
+
+
+CONTENT = {
+    "proteins.mztab.gz": b"a" * 3000,
+    "peptides.csv": b"b" * 2000,
+    "run1.raw": b"c" * 5000,
+}
+
+
+def make_client(fail=()):
+    """Create a mock client listing CONTENT and 'downloading' it in chunks."""
+    client = Mock()
+    client.get_dataset_files.return_value = [
+        {"fileName": name, "fileSizeBytes": len(data),
+         "fileCategory": "RAW" if name.endswith(".raw") else "RESULT",
+         "checksum": hashlib.sha1(data).hexdigest(),
+         "downloadUrl": f"ftp://example.org/{name}"}
+        for name, data in CONTENT.items()
+    ]
+    
+    def download_file(file_url, output_path, progress_callback=None, expected_size=None,
+                      segments=1):
+        name = file_url.rsplit("/", 1)[-1]
+        if name in fail:
+            raise IOError("connection reset")
+        data = CONTENT[name]
+        # Resume a partial file, reporting only new bytes like PRIDEClient
+        part_file = Path(output_path + ".part")
+        offset = part_file.stat().st_size if part_file.exists() else 0
+        with open(part_file, "ab") as f:
+            for start in range(offset, len(data), 1000):
+                f.write(data[start:start + 1000])
+                progress_callback(len(data[start:start + 1000]))
+        part_file.replace(output_path)
+    
+    client.download_file.side_effect = download_file
+    return client
+
+
+class TestDatasetDownloader:
+    """Tests for the dataset downloader."""
+    
+    def test_download_and_skip_completed(self, tmp_path):
+        """Test that all files are downloaded once and reruns skip them."""
+        client = make_client()
+        downloader = DatasetDownloader(output_dir=tmp_path, client=client, verify_checksums=True)
+        progress = []
+        
+        dataset_dir = downloader.download_dataset("PXD000001", progress_callback=
+                                                  lambda done, total: progress.append((done, total)))
+        
+        assert dataset_dir == tmp_path / "PXD000001"
+        for name, data in CONTENT.items():
+            assert (dataset_dir / name).read_bytes() == data
+        # Aggregated progress over all files
+        assert progress[-1] == (10000, 10000)
+        assert client.download_file.call_count == 3
+        
+        # Corrupt one file: only it is fetched again
+        (dataset_dir / "peptides.csv").write_bytes(b"x" * 2000)
+        downloader.download_dataset("PXD000001")
+        assert client.download_file.call_count == 4
+        assert (dataset_dir / "peptides.csv").read_bytes() == CONTENT["peptides.csv"]
+    
+    def test_resumed_bytes_count_as_progress(self, tmp_path):
+        """Test that bytes held by a partial file are included in the progress totals."""
+        client = make_client()
+        downloader = DatasetDownloader(output_dir=tmp_path, client=client)
+        (tmp_path / "PXD000001").mkdir()
+        (tmp_path / "PXD000001" / "run1.raw.part").write_bytes(CONTENT["run1.raw"][:4000])
+        progress = []
+        
+        downloader.download_dataset("PXD000001", progress_callback=
+                                    lambda done, total: progress.append((done, total)))
+        
+        assert progress[-1] == (10000, 10000)
+        assert (tmp_path / "PXD000001" / "run1.raw").read_bytes() == CONTENT["run1.raw"]
+    
+    def test_unsafe_file_names(self, tmp_path):
+        """Test that listed file names cannot escape the dataset directory."""
+        client = make_client()
+        listing = client.get_dataset_files.return_value
+        listing[0]["fileName"] = "../../proteins.mztab.gz"
+        listing[1]["fileName"] = ".."
+        downloader = DatasetDownloader(output_dir=tmp_path / "out", client=client)
+        
+        dataset_dir = downloader.download_dataset("PXD000001")
+        
+        assert (dataset_dir / "proteins.mztab.gz").read_bytes() == CONTENT["proteins.mztab.gz"]
+        assert client.download_file.call_count == 2
+        assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["PXD000001"]
+    
+    def test_duplicate_file_names(self, tmp_path):
+        """Test that listed files mapping to the same local name are downloaded once."""
+        client = make_client()
+        listing = client.get_dataset_files.return_value
+        listing[0]["fileName"] = "a/proteins.mztab.gz"
+        listing.append(dict(listing[0], fileName="b/proteins.mztab.gz"))
+        listing.append(dict(listing[0], fileName="PROTEINS.mztab.gz"))
+        downloader = DatasetDownloader(output_dir=tmp_path, client=client)
+        
+        dataset_dir = downloader.download_dataset("PXD000001")
+        
+        assert (dataset_dir / "proteins.mztab.gz").read_bytes() == CONTENT["proteins.mztab.gz"]
+        assert client.download_file.call_count == 3
+    
+    def test_file_type_filter(self, tmp_path):
+        """Test filtering by extension and category."""
+        client = make_client()
+        files = client.get_dataset_files("PXD000001")
+        
+        by_extension = DatasetDownloader.select_files(files, ["mzTab", "csv"])
+        assert [f["fileName"] for f in by_extension] == ["proteins.mztab.gz", "peptides.csv"]
+        
+        by_category = DatasetDownloader.select_files(files, ["raw"])
+        assert [f["fileName"] for f in by_category] == ["run1.raw"]
+    
+    def test_failed_file_does_not_abort_others(self, tmp_path):
+        """Test that one failing file is reported after the others complete."""
+        client = make_client(fail={"run1.raw"})
+        downloader = DatasetDownloader(output_dir=tmp_path, client=client)
+        
+        with pytest.raises(RuntimeError, match="run1.raw"):
+            downloader.download_dataset("PXD000001")
+        assert (tmp_path / "PXD000001" / "peptides.csv").exists()
+    
+    def test_socket_cap(self, tmp_path):
+        """Test that segments x connections is capped at max_sockets."""
+        downloader = DatasetDownloader(output_dir=tmp_path, client=Mock(), max_connections=4,
+                                       segments=8, max_sockets=16)
+        assert (downloader.max_connections, downloader.segments) == (4, 4)
+        
+        downloader = DatasetDownloader(output_dir=tmp_path, client=Mock(), max_connections=32,
+                                       segments=8, max_sockets=16)
+        assert (downloader.max_connections, downloader.segments) == (16, 1)
+        
+        with pytest.raises(ValueError, match="max_connections"):
+            DatasetDownloader(output_dir=tmp_path, client=Mock(), max_connections=0)
+        with pytest.raises(ValueError, match="max_sockets"):
+            DatasetDownloader(output_dir=tmp_path, client=Mock(), max_sockets=0)
+    
+    def test_token_bucket_rate(self):
+        """Test that the token bucket limits throughput."""
+        bucket = TokenBucket(rate=100_000)
+        start = time.monotonic()
+        for _ in range(30):
+            bucket.consume(10_000)  # 300 KB, 100 KB of it covered by the initial burst
+        assert time.monotonic() - start >= 1.5
@@ -7,12 +7,14 @@ Unit tests for proteomics file parsing functionality.
 import pytest
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
+from unittest.mock import patch
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
-from data_acquisition.file_parser import FileParser
+from data_acquisition.file_parser import FileParser, _parse_file_worker
 
 
 class TestFileParser:
@@ -148,3 +150,481 @@ MTD	title	Empty dataset
         # Should return empty DataFrame
         assert df is not None
         assert len(df) == 0
+    
+    def test_parse_mztab_section(self, tmp_path):
+        """Test selecting a specific mzTab section."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+PRH	accession	description
+PRT	P12345	Test protein
+PEH	sequence	accession	charge
+PEP	PEPTIDEK	P12345	2
+PEP	ANOTHERK	P12345	3
+PSH	sequence	PSM_ID
+PSM	PEPTIDEK	1
+"""
+        mztab_file = tmp_path / "sections.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        parser = FileParser()
+        peptides = parser.parse_mztab(str(mztab_file), section="peptide")
+        assert len(peptides) == 2
+        assert list(peptides.columns) == ["sequence", "accession", "charge"]
+        assert peptides.iloc[1]["sequence"] == "ANOTHERK"
+        
+        psms = parser.parse_mztab(str(mztab_file), section="psm")
+        assert len(psms) == 1
+        assert psms.iloc[0]["PSM_ID"] == 1
+        
+        with pytest.raises(ValueError, match="Unknown mzTab section"):
+            parser.parse_mztab(str(mztab_file), section="spectra")
+    
+    def test_iter_mztab_chunks(self, tmp_path):
+        """Test streaming an mzTab section in bounded chunks."""
+        lines = ["MTD\tmzTab-version\t1.0.0", "PRH\taccession\tprotein_coverage"]
+        lines += [f"PRT\tP{i:05d}\t0.5" for i in range(25)]
+        lines += ["PSH\tsequence", "PSM\tPEPTIDEK"]
+        mztab_file = tmp_path / "large.mztab"
+        mztab_file.write_text("\n".join(lines) + "\n")
+        
+        parser = FileParser()
+        chunks = list(parser.iter_mztab_chunks(str(mztab_file), section="protein", chunksize=10))
+        
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert chunks[0].attrs["mztab_section"] == "protein"
+        assert chunks[2].iloc[-1]["accession"] == "P00024"
+    
+    def test_parse_mztab_falls_back_to_peptides(self, tmp_path):
+        """Test that peptides are returned when the protein section is empty."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+PRH	accession	description
+PEH	sequence	accession
+PEP	PEPTIDEK	P12345
+"""
+        mztab_file = tmp_path / "peptides.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        parser = FileParser()
+        df = parser.parse_mztab(str(mztab_file))
+        
+        assert len(df) == 1
+        assert df.attrs["mztab_section"] == "peptide"
+        assert df.iloc[0]["sequence"] == "PEPTIDEK"
+    
+    def test_parse_mztab_engines(self, tmp_path):
+        """Test that the C engine returns typed columns matching the Python engine."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+PRH	accession	protein_abundance_assay[1]	num_psms_ms_run[1]
+PRT	P12345	1234.5	3
+PRT	P67890	null	7
+
+PRT	Q11111	42.0	1
+PEH	sequence	accession
+PEP	PEPTIDEK	P12345
+"""
+        mztab_file = tmp_path / "typed.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        parser = FileParser()
+        fast = parser.parse_mztab(str(mztab_file), engine="c")
+        slow = parser.parse_mztab(str(mztab_file), engine="python", typed=False)
+        
+        assert len(fast) == len(slow) == 3
+        assert list(fast.columns) == list(slow.columns)
+        assert fast["protein_abundance_assay[1]"].dtype == "float32"
+        assert pd.isna(fast.iloc[1]["protein_abundance_assay[1]"])
+        assert fast["num_psms_ms_run[1]"].tolist() == [3, 7, 1]
+        assert slow.iloc[1]["protein_abundance_assay[1]"] == "null"
+        
+        chunks = list(parser.iter_mztab_chunks(str(mztab_file), chunksize=2))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        
+        with pytest.raises(ValueError, match="Unknown mzTab engine"):
+            parser.parse_mztab(str(mztab_file), engine="fortran")
+    
+    def test_scan_mztab_sections(self, tmp_path):
+        """Test byte-offset pre-scan of mzTab sections."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+PRH	accession
+PRT	P12345
+COM	interleaved comment
+PRT	P67890
+PSH	sequence
+PSM	PEPTIDEK
+"""
+        mztab_file = tmp_path / "scan.mztab"
+        mztab_file.write_bytes(mztab_content.encode())
+        
+        parser = FileParser()
+        spans = parser.scan_mztab_sections(str(mztab_file))
+        
+        assert set(spans) == {"protein", "psm"}
+        assert spans["protein"]["rows"] == 2
+        assert spans["protein"]["contiguous"] is False
+        data = mztab_file.read_bytes()
+        assert data[spans["psm"]["start"]:spans["psm"]["end"]] == b"PSM\tPEPTIDEK\n"
+        
+        # Interleaved sections still parse via the Python fallback
+        df = parser.parse_mztab(str(mztab_file))
+        assert df["accession"].tolist() == ["P12345", "P67890"]
+    
+    def test_parse_mztab_schema(self, tmp_path):
+        """Test that mzTab columns are converted to compact schema dtypes."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+PSH	sequence	PSM_ID	accession	unique	search_engine_score[1]	charge	exp_mass_to_charge	opt_global_q	retention_time
+PSM	PEPTIDEK	1	P12345	1	1e-45	2	512.2734	0.01	1200.5|1201.7
+PSM	ANOTHERK	2	P12345	0	0.003	null	623.8123	null	null
+PSM	THIRDK	3	P67890	null	NaN	3	INF	0.02	1305.2
+"""
+        mztab_file = tmp_path / "psms.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        parser = FileParser()
+        for engine in ["c", "python"]:
+            df = parser.parse_mztab(str(mztab_file), section="psm", engine=engine)
+            
+            assert df["accession"].dtype == "category"
+            assert df["PSM_ID"].dtype == "Int32"
+            assert df["unique"].dtype == "Int8"
+            assert df["charge"].dtype == "Int32"
+            assert df["search_engine_score[1]"].dtype == "float64"
+            assert df["search_engine_score[1]"].iloc[0] == pytest.approx(1e-45)
+            assert df["exp_mass_to_charge"].dtype == "float64"
+            assert df["exp_mass_to_charge"].iloc[2] == float("inf")
+            assert pd.isna(df["charge"].iloc[1])
+            assert df["retention_time"].iloc[0] == "1200.5|1201.7"
+    
+    def test_parse_cache(self, tmp_path):
+        """Test that parse_file results are cached and invalidated on change."""
+        pytest.importorskip("pyarrow")
+        
+        mztab_file = tmp_path / "cached.mztab"
+        mztab_file.write_text("PRH\taccession\tprotein_abundance_assay[1]\nPRT\tP12345\t12.5\n")
+        cache_dir = tmp_path / "cache"
+        
+        parser = FileParser(cache_dir=cache_dir, cache_enabled=True)
+        df1 = parser.parse_file(str(mztab_file))
+        assert len(list(cache_dir.glob("*.feather"))) == 1
+        
+        # Second call is served from the cache without parsing
+        with patch.object(parser, "parse_mztab", side_effect=AssertionError("re-parsed")):
+            df2 = parser.parse_file(str(mztab_file))
+        pd.testing.assert_frame_equal(df1, df2)
+        assert df2["protein_abundance_assay[1]"].dtype == "float32"
+        assert df2.attrs["mztab_section"] == "protein"
+        
+        # Modifying the file invalidates the entry
+        mztab_file.write_text("PRH\taccession\nPRT\tP12345\nPRT\tP67890\n")
+        df3 = parser.parse_file(str(mztab_file))
+        assert len(df3) == 2
+        
+        with pytest.raises(ValueError, match="Unknown cache validation"):
+            FileParser(cache_validation="mtime")
+    
+    def test_read_mztab(self, tmp_path):
+        """Test single-pass read of metadata and all sections."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+MTD	ms_run[1]-location	file:///data/run1.raw
+MTD	ms_run[2]-location	file:///data/run2.raw
+MTD	assay[1]-ms_run_ref	ms_run[1]
+MTD	assay[2]-ms_run_ref	ms_run[2]
+MTD	study_variable[1]-assay_refs	assay[1], assay[2]
+PRH	accession	protein_abundance_assay[1]	protein_abundance_assay[2]
+PRT	P12345	10.5	11.5
+PRT	P67890	20.5	null
+PSH	sequence	PSM_ID	accession
+PSM	PEPTIDEK	1	P12345
+PSM	ANOTHERK	2	P67890
+PSM	THIRDK	3	P67890
+"""
+        mztab_file = tmp_path / "full.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        parser = FileParser()
+        result = parser.read_mztab(str(mztab_file))
+        
+        assert result.metadata["mzTab-version"] == "1.0.0"
+        assert result.sections == ["protein", "psm"]
+        assert len(result.proteins) == 2
+        assert len(result.psms) == 3
+        assert result.peptides.empty
+        assert result.assays["assay[2]"]["ms_run_ref"] == "ms_run[2]"
+        assert result.study_variables["study_variable[1]"]["assay_refs"] == ["assay[1]", "assay[2]"]
+        assert result.assay_run_locations() == {
+            "assay[1]": "file:///data/run1.raw",
+            "assay[2]": "file:///data/run2.raw",
+        }
+        
+        # Sections are parsed once and reused
+        assert result.proteins is result.proteins
+    
+    @pytest.mark.parametrize("codec,suffix", [
+        ("gzip", ".gz"), ("bz2", ".bz2"), ("xz", ".xz"), ("zstd", ".zst"),
+    ])
+    def test_parse_compressed(self, tmp_path, codec, suffix):
+        """Test transparent decompression of compressed inputs."""
+        import bz2
+        import gzip
+        import lzma
+        
+        if codec == "zstd":
+            zstandard = pytest.importorskip("zstandard")
+            compress = zstandard.ZstdCompressor().compress
+        else:
+            compress = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}[codec]
+        
+        mztab_content = """MTD	mzTab-version	1.0.0
+PRH	accession	protein_abundance_assay[1]
+PRT	P12345	10.5
+PSH	sequence	PSM_ID
+PSM	PEPTIDEK	1
+PSM	ANOTHERK	2
+"""
+        mztab_file = tmp_path / f"data.mztab{suffix}"
+        mztab_file.write_bytes(compress(mztab_content.encode()))
+        csv_file = tmp_path / f"data.csv{suffix}"
+        csv_file.write_bytes(compress(b"Protein,Intensity\nP12345,1.5\nP67890,2.5\n"))
+        
+        parser = FileParser()
+        assert parser.detect_compression(str(mztab_file)) == codec
+        
+        proteins = parser.parse_file(str(mztab_file))
+        assert proteins.iloc[0]["accession"] == "P12345"
+        
+        psms = parser.parse_mztab(str(mztab_file), section="psm")
+        assert psms["sequence"].tolist() == ["PEPTIDEK", "ANOTHERK"]
+        assert parser.get_mztab_metadata(str(mztab_file))["mzTab-version"] == "1.0.0"
+        
+        df = parser.parse_file(str(csv_file))
+        assert df["Intensity"].tolist() == [1.5, 2.5]
+    
+    def test_detect_compression_by_content(self, tmp_path):
+        """Test that compression is detected from content, not the suffix."""
+        import gzip
+        
+        mztab_file = tmp_path / "mislabelled.mztab"
+        mztab_file.write_bytes(gzip.compress(b"PRH\taccession\nPRT\tP12345\n"))
+        
+        parser = FileParser(decompression_threads=0)
+        assert parser.detect_compression(str(mztab_file)) == "gzip"
+        assert parser.parse_file(str(mztab_file)).iloc[0]["accession"] == "P12345"
+        
+        plain_file = tmp_path / "plain.mztab"
+        plain_file.write_text("PRH\taccession\nPRT\tP12345\n")
+        assert parser.detect_compression(str(plain_file)) is None
+    
+    @pytest.mark.parametrize("cache_enabled", [False, True])
+    def test_parse_files_parallel(self, tmp_path, cache_enabled):
+        """Test parsing several files in worker processes."""
+        if cache_enabled:
+            pytest.importorskip("pyarrow")
+        
+        file_paths = []
+        for i in range(4):
+            mztab_file = tmp_path / f"run{i}.mztab"
+            rows = "".join(f"PRT\tP{i}{j:04d}\t{j}.5\n" for j in range(i + 1))
+            mztab_file.write_text("PRH\taccession\tprotein_abundance_assay[1]\n" + rows)
+            file_paths.append(str(mztab_file))
+        
+        parser = FileParser(cache_dir=tmp_path / "cache", cache_enabled=cache_enabled)
+        results = dict(parser.parse_files(file_paths, max_workers=2))
+        
+        assert set(results) == set(file_paths)
+        for i, file_path in enumerate(file_paths):
+            df = results[file_path]
+            assert len(df) == i + 1
+            assert df["protein_abundance_assay[1]"].dtype == "float32"
+            assert df.iloc[0]["accession"] == f"P{i}0000"
+    
+    def test_parse_file_worker_cache_write_failure(self, tmp_path, monkeypatch):
+        """Test that a failed cache write in a worker falls back to a transfer file."""
+        pytest.importorskip("pyarrow")
+        mztab_file = tmp_path / "run.mztab"
+        mztab_file.write_text("PRH\taccession\tprotein_abundance_assay[1]\nPRT\tP12345\t1.5\n")
+        monkeypatch.setattr(FileParser, "_save_to_cache", lambda self, cache_file, df: False)
+        options = {"cache_dir": tmp_path / "cache", "cache_enabled": True}
+        
+        kind, payload = _parse_file_worker(options, str(mztab_file), str(tmp_path))
+        df = FileParser(**options)._unpack_worker_result(kind, payload)
+        
+        assert kind == "transfer"
+        assert df.iloc[0]["accession"] == "P12345"
+        assert not Path(payload).exists()
+    
+    def test_parse_excel(self, tmp_path):
+        """Test streaming Excel parsing with header detection."""
+        openpyxl = pytest.importorskip("openpyxl")
+        
+        workbook = openpyxl.Workbook()
+        notes = workbook.active
+        notes.title = "Notes"
+        notes.append(["Supplementary data"])
+        sheet = workbook.create_sheet("proteinGroups")
+        sheet.append(["Supplementary Table 1"])
+        sheet.append([])
+        sheet.append(["Protein IDs", "Intensity A", "Intensity B", "Peptides"])
+        for i in range(5):
+            sheet.append([f"P{i:05d}", 100.5 * i, None if i == 2 else 7.25, i + 1])
+        excel_file = tmp_path / "supplementary.xlsx"
+        workbook.save(excel_file)
+        
+        parser = FileParser()
+        df = parser.parse_excel(str(excel_file), sheet_name="proteinGroups")
+        
+        assert list(df.columns) == ["Protein IDs", "Intensity A", "Intensity B", "Peptides"]
+        assert len(df) == 5
+        assert df.iloc[3]["Protein IDs"] == "P00003"
+        assert df["Intensity B"].dtype == "float64"
+        assert pd.isna(df.iloc[2]["Intensity B"])
+        assert df["Peptides"].tolist() == [1, 2, 3, 4, 5]
+        
+        chunks = list(parser.iter_excel_chunks(str(excel_file), sheet_name=1, chunksize=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        
+        explicit = parser.parse_excel(str(excel_file), sheet_name=1, header_row=2)
+        assert list(explicit.columns) == list(df.columns)
+        
+        # parse_file dispatches .xlsx to the Excel parser (first sheet)
+        assert parser.parse_file(str(excel_file)).columns[0] == "Supplementary data"
+        
+        # Compressed workbooks are decompressed before openpyxl opens them
+        import gzip
+        compressed_file = tmp_path / "supplementary.xlsx.gz"
+        compressed_file.write_bytes(gzip.compress(excel_file.read_bytes()))
+        pd.testing.assert_frame_equal(
+            parser.parse_excel(str(compressed_file), sheet_name="proteinGroups"), df
+        )
+        
+        with pytest.raises(ValueError, match="not found"):
+            parser.parse_excel(str(excel_file), sheet_name="missing")
+    
+    @pytest.mark.parametrize("engine", ["pyarrow", "c"])
+    def test_load_intensity_matrix(self, tmp_path, engine):
+        """Test loading a wide intensity table as a float32 matrix."""
+        if engine == "pyarrow":
+            pytest.importorskip("pyarrow")
+        
+        tsv_content = """Protein\tGene\tIntensity S1\tIntensity S2\tLFQ intensity S1
+P12345\tGENE1\t1234.5\t\t11.0
+P67890\tGENE2\t3456.75\t4567.25\tNaN
+Q11111\tGENE3\t5678.5\t6789.0\t13.0
+"""
+        tsv_file = tmp_path / "matrix.tsv"
+        tsv_file.write_text(tsv_content)
+        
+        parser = FileParser()
+        matrix = parser.load_intensity_matrix(str(tsv_file), engine=engine)
+        
+        assert matrix.samples == ["LFQ intensity S1"]
+        assert list(matrix.proteins) == ["P12345", "P67890", "Q11111"]
+        assert matrix.values.dtype == "float32"
+        assert matrix.values.flags.f_contiguous
+        assert pd.isna(matrix.values[1, 0])
+        
+        raw = parser.load_intensity_matrix(str(tsv_file), pattern="^intensity ", engine=engine)
+        assert raw.samples == ["Intensity S1", "Intensity S2"]
+        assert raw.values.shape == (3, 2)
+        assert raw.values[1, 1] == 4567.25
+        assert pd.isna(raw.values[0, 1])
+        
+        selected = parser.load_intensity_matrix(
+            str(tsv_file), id_column="Gene", intensity_columns=["Intensity S2"], engine=engine
+        )
+        assert list(selected.proteins) == ["GENE1", "GENE2", "GENE3"]
+        assert selected.values.shape == (3, 1)
+        
+        with pytest.raises(ValueError, match="No intensity columns"):
+            parser.load_intensity_matrix(str(tsv_file), pattern="^spectral_count", engine=engine)
+    
+    def test_load_intensity_matrix_maxquant(self, tmp_path):
+        """Test that one quantity family is picked from a MaxQuant proteinGroups header."""
+        header = ["Protein IDs", "Majority protein IDs", "Peptides", "Intensity",
+                  "Intensity L", "Intensity H", "Intensity S1", "Intensity S2",
+                  "Intensity L S1", "Intensity H S1", "iBAQ", "iBAQ peptides",
+                  "iBAQ S1", "iBAQ S2", "LFQ intensity S1", "LFQ intensity S2",
+                  "MS/MS count S1", "Only identified by site", "Reverse"]
+        row = ["P12345", "P12345", "4", "300", "100", "200", "120", "180", "40", "80",
+               "30", "10", "12", "18", "115", "175", "3", "", ""]
+        tsv_file = tmp_path / "proteinGroups.txt"
+        tsv_file.write_text("\t".join(header) + "\n" + "\t".join(row) + "\n")
+        parser = FileParser()
+        
+        matrix = parser.load_intensity_matrix(str(tsv_file), engine="c")
+        
+        assert matrix.samples == ["LFQ intensity S1", "LFQ intensity S2"]
+        np.testing.assert_array_equal(matrix.values, [[115, 175]])
+        
+        # Without LFQ columns, iBAQ is next, then the raw intensities
+        no_lfq = tmp_path / "no_lfq.txt"
+        no_lfq.write_text("\t".join(header[:14]) + "\n" + "\t".join(row[:14]) + "\n")
+        no_lfq_matrix = parser.load_intensity_matrix(str(no_lfq), engine="c")
+        assert no_lfq_matrix.samples == ["iBAQ S1", "iBAQ S2"]
+        no_ibaq = tmp_path / "no_ibaq.txt"
+        no_ibaq.write_text("\t".join(header[:10]) + "\n" + "\t".join(row[:10]) + "\n")
+        no_ibaq_matrix = parser.load_intensity_matrix(str(no_ibaq), engine="c")
+        assert no_ibaq_matrix.samples == ["Intensity S1", "Intensity S2"]
+    
+    def test_probe(self, tmp_path):
+        """Test probing a file from a bounded prefix."""
+        rows = "".join(f"P{i:05d};{i * 1.5:08.1f};{i:04d}\n" for i in range(2000))
+        data_file = tmp_path / "export.dat"
+        data_file.write_text("Protein;Intensity;Peptides\n" + rows)
+        
+        parser = FileParser()
+        info = parser.probe(str(data_file), sample_bytes=4096)
+        
+        assert info["format"] == "tabular"
+        assert info["delimiter"] == ";"
+        assert info["encoding"] == "utf-8"
+        assert info["columns"] == ["Protein", "Intensity", "Peptides"]
+        assert info["dtypes"]["Intensity"] == "float64"
+        assert info["dtypes"]["Peptides"] == "int64"
+        assert not info["exact"]
+        assert info["sample_rows"] < 2000
+        assert abs(info["estimated_rows"] - 2000) < 20
+        assert info["estimated_memory_bytes"] > 0
+        
+        full = parser.probe(str(data_file))
+        assert full["exact"]
+        assert full["estimated_rows"] == 2000
+        
+        # The sniffed delimiter is also used by parse_tabular
+        assert len(parser.parse_tabular(str(data_file))) == 2000
+    
+    @pytest.mark.parametrize("encoding,newline", [("utf-16", "\r\n"), ("utf-8", "\n")])
+    def test_probe_multibyte(self, tmp_path, encoding, newline):
+        """Test probing a truncated sample of a multi-byte encoded file."""
+        rows = "".join(f"Prot\u00e9ine_{i:05d}\t{i * 1.5:08.1f}{newline}" for i in range(2000))
+        data_file = tmp_path / "export.tsv"
+        data_file.write_bytes(f"Prot\u00e9ine\tIntensit\u00e9{newline}{rows}".encode(encoding))
+        
+        # Odd sample size: the cut falls inside a UTF-16 code unit / UTF-8 character
+        info = FileParser().probe(str(data_file), sample_bytes=4097)
+        
+        assert info["encoding"] == encoding
+        assert info["columns"] == ["Prot\u00e9ine", "Intensit\u00e9"]
+        assert not info["exact"]
+        assert abs(info["estimated_rows"] - 2000) < 20
+    
+    def test_probe_mztab(self, tmp_path):
+        """Test probing an mzTab file."""
+        mztab_content = """MTD	mzTab-version	1.0.0
+MTD	mzTab-mode	Summary
+PRH	accession	protein_abundance_assay[1]
+PRT	P12345	10.5
+PRT	P67890	null
+"""
+        mztab_file = tmp_path / "probe.mztab"
+        mztab_file.write_text(mztab_content)
+        
+        info = FileParser().probe(str(mztab_file))
+        
+        assert info["format"] == "mztab"
+        assert info["columns"] == ["accession", "protein_abundance_assay[1]"]
+        assert info["dtypes"]["protein_abundance_assay[1]"] == "float32"
+        assert info["sample_rows"] == 2
+        assert info["estimated_rows"] == 2
+        
+        # Comments, blank lines and section headers are not rows
+        with open(mztab_file, "a") as f:
+            f.write("COM\tend of proteins\n\nPSH\tsequence\tPSM_ID\nPSM\tPEPTIDEK\t1\n")
+        assert FileParser().probe(str(mztab_file))["estimated_rows"] == 3
@@ -4,16 +4,107 @@ Test Module for PRIDE API Client
 Unit tests for PRIDE API client functionality.
 """
 
+import http.client
 import pytest
 import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from unittest.mock import Mock, patch
 import requests
+from tqdm import tqdm
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
-from data_acquisition.pride_api import PRIDEClient
+from data_acquisition.pride_api import PRIDEClient, _response_readinto, partial_download_size
+
+
+def json_response(data, status_code=200, headers=None):
+    """Create a mock response with a JSON body."""
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.raise_for_status.return_value = None
+    response.json.return_value = data
+    return response
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` with Range support; can drop the connection."""
+    
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.server.payload)))
+        if self.server.etag:
+            self.send_header("ETag", self.server.etag)
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+    
+    def do_GET(self):
+        payload = self.server.payload
+        start, end = 0, len(payload) - 1
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        with self.server.lock:
+            self.server.ranges.append(range_header)
+            self.server.if_ranges.append(if_range)
+        if range_header in self.server.fail_ranges:
+            time.sleep(0.2)  # Let the other requests finish first
+            self.send_response(503)
+            self.end_headers()
+            return
+        if if_range is not None and if_range != self.server.etag:
+            range_header = None  # Changed since: send the whole file
+        if range_header:
+            first, last = range_header.split("=")[1].split("-")
+            start = int(first)
+            end = int(last) if last else end
+            if start >= len(payload):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        else:
+            self.send_response(200)
+        body = payload[start:end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.etag:
+            self.send_header("ETag", self.server.etag)
+        self.end_headers()
+        
+        # Simulate a dropped connection after some bytes
+        if self.server.drop_after:
+            self.wfile.write(body[:self.server.drop_after])
+            self.server.drop_after = 0
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def range_server():
+    """Local HTTP server with Range support."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.payload = bytes(range(256)) * 400
+    server.ranges = []
+    server.if_ranges = []
+    server.etag = None
+    server.drop_after = 0
+    server.fail_ranges = set()
+    server.accept_ranges = True
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
 
 class TestPRIDEClient:
@@ -101,9 +192,9 @@ class TestPRIDEClient:
         metadata1 = client.get_dataset_metadata("PXD000001")
         assert metadata1 is not None
         
-        # Verify cache file was created
-        cache_files = list(cache_dir.glob("*.json"))
-        assert len(cache_files) == 1
+        # Verify cache entry was created
+        assert (cache_dir / "responses.sqlite").exists()
+        assert len(client.cache) == 1
         
         # Second call - should use cache (no API call)
         metadata2 = client.get_dataset_metadata("PXD000001")
@@ -113,9 +204,8 @@ class TestPRIDEClient:
         files1 = client.get_dataset_files("PXD000001")
         assert len(files1) > 0
         
-        # Should now have 2 cache files
-        cache_files = list(cache_dir.glob("*.json"))
-        assert len(cache_files) == 2
+        # Should now have 2 cache entries
+        assert len(client.cache) == 2
         
         # Second call should use cache
         files2 = client.get_dataset_files("PXD000001")
@@ -228,6 +318,295 @@ class TestPRIDEClient:
             # Should try max_retries times
             assert mock_get.call_count == 2
     
+    def test_get_many_datasets_metadata(self, tmp_path):
+        """Test batch metadata with cache hits and per-accession errors."""
+        client = PRIDEClient(cache_dir=tmp_path / "cache", max_workers=4)
+        client._save_to_cache(client._get_cache_key("metadata", dataset_id="PXD000001"),
+                              {"accession": "PXD000001"})
+        
+        def fake_get(url, params=None, headers=None, timeout=None):
+            accession = url.rsplit("/", 1)[-1]
+            response = json_response({"accession": accession})
+            if accession == "PXD999999":
+                response.status_code = 404
+                response.raise_for_status.side_effect = requests.HTTPError(response=response)
+            return response
+        
+        with patch.object(client.session, 'get', side_effect=fake_get) as mock_get:
+            results, errors = client.get_many_datasets_metadata(
+                ["PXD000001", "PXD000002", "PXD000003", "PXD999999", "PXD000002"]
+            )
+        
+        assert set(results) == {"PXD000001", "PXD000002", "PXD000003"}
+        assert results["PXD000003"] == {"accession": "PXD000003"}
+        assert set(errors) == {"PXD999999"}
+        assert isinstance(errors["PXD999999"], ValueError)
+        # Cached and duplicate accessions are not requested
+        requested = sorted(call.args[0].rsplit("/", 1)[-1] for call in mock_get.call_args_list)
+        assert requested == ["PXD000002", "PXD000003", "PXD999999"]
+    
+    def test_iter_search_datasets(self, tmp_path):
+        """Test that search iteration walks all pages and caches them."""
+        client = PRIDEClient(cache_dir=tmp_path / "cache")
+        projects = [{"accession": f"PXD{i:06d}"} for i in range(25)]
+        
+        def fake_get(url, params=None, headers=None, timeout=None):
+            start = params["page"] * params["pageSize"]
+            return json_response(
+                {"_embedded": {"projects": projects[start:start + params["pageSize"]]}}
+            )
+        
+        with patch.object(client.session, 'get', side_effect=fake_get) as mock_get:
+            # Limit stops early without fetching the last page
+            limited = list(client.iter_search_datasets("test", page_size=10, limit=15))
+            assert limited == projects[:15]
+            assert mock_get.call_count == 2
+            
+            # Full crawl stops at the short page
+            assert list(client.iter_search_datasets("test", page_size=10)) == projects
+            assert mock_get.call_count == 3
+            
+            # Repeated crawl is served from the page cache
+            assert list(client.iter_search_datasets("test", page_size=10)) == projects
+            assert mock_get.call_count == 3
+    
+    def test_memory_cache(self, tmp_path):
+        """Test that repeated lookups are served by the in-process LRU."""
+        client = PRIDEClient(cache_dir=tmp_path / "cache")
+        mock_response = json_response({"accession": "PXD000001"})
+        
+        with patch.object(client.session, 'get', return_value=mock_response) as mock_get:
+            for _ in range(5):
+                assert client.get_dataset_metadata("PXD000001") == {"accession": "PXD000001"}
+            assert mock_get.call_count == 1
+        
+        stats = client.cache_stats()
+        assert stats["memory"]["hits"] == 4
+        assert stats["disk"]["hits"] == 0
+        
+        # A new client (empty memory) reads through the disk cache once
+        client2 = PRIDEClient(cache_dir=tmp_path / "cache")
+        client2.get_dataset_metadata("PXD000001")
+        client2.get_dataset_metadata("PXD000001")
+        assert client2.cache_stats()["disk"]["hits"] == 1
+        assert client2.cache_stats()["memory"]["hits"] == 1
+    
+    def test_conditional_revalidation(self, tmp_path):
+        """Test that expired entries are revalidated with conditional requests."""
+        client = PRIDEClient(cache_dir=tmp_path / "cache", memory_cache_entries=0)
+        url = f"{client.base_url}/projects/PXD000001"
+        key = client._get_cache_key("metadata", dataset_id="PXD000001")
+        client._save_to_cache(key, {"accession": "PXD000001", "title": "old"},
+                              etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        client.cache.touch(key, ttl=-1)  # Expire it
+        
+        not_modified = json_response(None, status_code=304)
+        with patch.object(client.session, 'get', return_value=not_modified) as mock_get:
+            metadata = client.get_dataset_metadata("PXD000001")
+        
+        assert metadata["title"] == "old"
+        headers = mock_get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        assert mock_get.call_args.args[0] == url
+        # 304 restarted the TTL
+        assert client._get_from_cache(key)["title"] == "old"
+        
+        # A changed resource replaces the entry and its validators
+        client.cache.touch(key, ttl=-1)
+        changed = json_response({"accession": "PXD000001", "title": "new"}, headers={"ETag": '"v2"'})
+        with patch.object(client.session, 'get', return_value=changed):
+            assert client.get_dataset_metadata("PXD000001")["title"] == "new"
+        assert client.cache.get_entry(key).etag == '"v2"'
+    
+    def test_stale_while_revalidate(self, tmp_path):
+        """Test that stale entries are served while refreshed in the background."""
+        client = PRIDEClient(cache_dir=tmp_path / "cache", stale_while_revalidate_hours=1)
+        key = client._get_cache_key("metadata", dataset_id="PXD000001")
+        client._save_to_cache(key, {"accession": "PXD000001", "title": "old"})
+        client.cache.touch(key, ttl=-1)
+        client.memory_cache.clear()
+        
+        fresh = json_response({"accession": "PXD000001", "title": "new"})
+        with patch.object(client.session, 'get', return_value=fresh) as mock_get:
+            assert client.get_dataset_metadata("PXD000001")["title"] == "old"
+            client._revalidation_executor.shutdown(wait=True)
+            assert mock_get.call_count == 1
+        
+        assert client.get_dataset_metadata("PXD000001")["title"] == "new"
+    
+    def test_download_resume(self, tmp_path, range_server):
+        """Test that interrupted downloads resume from the partial file."""
+        client = PRIDEClient(cache_enabled=False, backoff_factor=0.01)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        output_path = tmp_path / "file.raw"
+        payload = range_server.payload
+        
+        # Partial file left by an earlier run
+        (tmp_path / "file.raw.part").write_bytes(payload[:30000])
+        client.download_file(url, str(output_path), expected_size=len(payload))
+        assert output_path.read_bytes() == payload
+        assert not (tmp_path / "file.raw.part").exists()
+        assert range_server.ranges == ["bytes=30000-"]
+        
+        # Connection dropped mid-transfer: retried from where it stopped
+        output_path.unlink()
+        range_server.ranges.clear()
+        range_server.drop_after = 50000
+        client.download_file(url, str(output_path), expected_size=len(payload))
+        assert output_path.read_bytes() == payload
+        assert range_server.ranges[0] is None
+        # Resumed near the drop (urllib3 may discard its last buffered block)
+        resumed_at = int(range_server.ranges[1].split("=")[1].rstrip("-"))
+        assert 40000 < resumed_at <= 50000
+    
+    def test_resume_with_if_range(self, tmp_path, range_server):
+        """Test that resumes send the original validator and restart if the file changed."""
+        client = PRIDEClient(cache_enabled=False, backoff_factor=0.01)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        output_path = tmp_path / "file.raw"
+        payload = range_server.payload
+        range_server.etag = '"v2"'
+        
+        # Dropped connection: the retry resumes with the ETag of the first response
+        range_server.drop_after = 50000
+        client.download_file(url, str(output_path), expected_size=len(payload))
+        assert output_path.read_bytes() == payload
+        assert range_server.if_ranges == [None, '"v2"']
+        assert range_server.ranges[1] is not None
+        assert not (tmp_path / "file.raw.part.validator").exists()
+        
+        # Partial file of an older version: the server sends the whole file
+        output_path.unlink()
+        range_server.ranges.clear()
+        (tmp_path / "file.raw.part").write_bytes(b"\xff" * 30000)
+        (tmp_path / "file.raw.part.validator").write_text('"v1"')
+        client.download_file(url, str(output_path), expected_size=len(payload))
+        assert output_path.read_bytes() == payload
+        assert range_server.ranges == ["bytes=30000-"]
+    
+    def test_download_keeps_part_on_failure(self, tmp_path, range_server):
+        """Test that a download that never completes keeps its partial file."""
+        client = PRIDEClient(cache_enabled=False, max_retries=2, backoff_factor=0.01)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        
+        with pytest.raises(IOError, match="Incomplete download"):
+            client.download_file(url, str(tmp_path / "file.raw"),
+                                 expected_size=len(range_server.payload) + 10)
+        assert (tmp_path / "file.raw.part").stat().st_size == len(range_server.payload)
+        assert not (tmp_path / "file.raw").exists()
+    
+    def test_download_progress_label(self, tmp_path, range_server):
+        """Test that the progress bar shows the final file name, not the partial file."""
+        client = PRIDEClient(cache_enabled=False)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        
+        with patch("data_acquisition.pride_api.tqdm", wraps=tqdm) as progress_bar:
+            client.download_file(url, str(tmp_path / "file.raw"))
+        
+        assert progress_bar.call_args.kwargs["desc"] == "file.raw"
+    
+    def test_download_progress_throttled(self, tmp_path, range_server):
+        """Test that progress is reported in aggregated, throttled updates."""
+        client = PRIDEClient(cache_enabled=False)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        updates = []
+        
+        client.download_file(url, str(tmp_path / "file.raw"), chunk_size=4096,
+                             progress_callback=updates.append)
+        assert sum(updates) == len(range_server.payload)
+        # 25 buffer fills, but far fewer progress updates
+        assert len(updates) < 5
+    
+    def test_segmented_download(self, tmp_path, range_server):
+        """Test that large files are fetched as parallel byte ranges."""
+        client = PRIDEClient(cache_enabled=False)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        output_path = tmp_path / "file.raw"
+        payload = range_server.payload
+        
+        client.download_file(url, str(output_path), expected_size=len(payload),
+                             segments=4, segment_threshold=0)
+        assert output_path.read_bytes() == payload
+        assert sorted(range_server.ranges) == sorted(
+            ["bytes=0-25599", "bytes=25600-51199", "bytes=51200-76799", "bytes=76800-102399"]
+        )
+        assert not (tmp_path / "file.raw.segments").exists()
+        
+        # Without Accept-Ranges, a single stream is used
+        output_path.unlink()
+        range_server.ranges.clear()
+        range_server.accept_ranges = False
+        client.download_file(url, str(output_path), segments=4, segment_threshold=0)
+        assert output_path.read_bytes() == payload
+        assert range_server.ranges == [None]
+    
+    def test_segmented_download_resumes_segments(self, tmp_path, range_server):
+        """Test that a failed segmented download keeps completed segments for the next call."""
+        client = PRIDEClient(cache_enabled=False, max_retries=1)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        output_path = tmp_path / "file.raw"
+        payload = range_server.payload
+        range_server.fail_ranges = {"bytes=51200-76799"}
+        
+        with pytest.raises(requests.HTTPError):
+            client.download_file(url, str(output_path), segments=4, segment_threshold=0)
+        assert (tmp_path / "file.raw.segments").exists()
+        assert (tmp_path / "file.raw.segments.json").exists()
+        
+        range_server.fail_ranges = set()
+        range_server.ranges.clear()
+        client.download_file(url, str(output_path), segments=4, segment_threshold=0)
+        
+        assert output_path.read_bytes() == payload
+        assert range_server.ranges == ["bytes=51200-76799"]
+        assert not (tmp_path / "file.raw.segments.json").exists()
+    
+    def test_single_stream_removes_segment_files(self, tmp_path, range_server):
+        """Test that a single-stream download cleans up an interrupted segmented one."""
+        client = PRIDEClient(cache_enabled=False, max_retries=1)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        output_path = tmp_path / "file.raw"
+        range_server.fail_ranges = {"bytes=51200-76799"}
+        with pytest.raises(requests.HTTPError):
+            client.download_file(url, str(output_path), segments=4, segment_threshold=0)
+        assert partial_download_size(output_path) > 0
+        
+        range_server.fail_ranges = set()
+        client.download_file(url, str(output_path), segments=1)
+        
+        assert output_path.read_bytes() == range_server.payload
+        assert not (tmp_path / "file.raw.segments").exists()
+        assert not (tmp_path / "file.raw.segments.json").exists()
+        assert partial_download_size(output_path) == 0
+    
+    def test_segmented_download_without_pwrite(self, tmp_path, range_server, monkeypatch):
+        """Test that platforms without os.pwrite fall back to a single stream."""
+        monkeypatch.delattr("os.pwrite", raising=False)
+        client = PRIDEClient(cache_enabled=False)
+        url = f"http://127.0.0.1:{range_server.server_port}/file.raw"
+        
+        client.download_file(url, str(tmp_path / "file.raw"), segments=4, segment_threshold=0)
+        
+        assert (tmp_path / "file.raw").read_bytes() == range_server.payload
+        assert range_server.ranges == [None]
+    
+    def test_response_readinto(self):
+        """Test both readinto paths and the mapping of a truncated body."""
+        encoded = Mock(headers={"Content-Encoding": "gzip"})
+        encoded.iter_content.return_value = iter([b"abcdef", b"gh"])
+        readinto = _response_readinto(encoded, 4)
+        buffer = memoryview(bytearray(4))
+        received = b""
+        while (n := readinto(buffer)):
+            received += bytes(buffer[:n])
+        assert received == b"abcdefgh"
+        
+        truncated = Mock(headers={})
+        truncated.raw.readinto.side_effect = http.client.IncompleteRead(b"ab", 10)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            _response_readinto(truncated, 4)(buffer)
+    
     def test_custom_retry_settings(self):
         """Test that custom retry settings are respected."""
         client = PRIDEClient(timeout=5, max_retries=5, backoff_factor=3.0)
@@ -0,0 +1,141 @@
+"""
+Test Module for Response Cache
+
+Unit tests for the SQLite API response cache.
+"""
+
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from data_acquisition.response_cache import MemoryCache, ResponseCache
+
+
+def write_entries(path, worker, count):
+    """Write entries from a separate process."""
+    cache = ResponseCache(path)
+    for i in range(count):
+        cache.set(f"{worker}-{i}", {"worker": worker, "i": i}, ttl=60)
+    return count
+
+
+class TestResponseCache:
+    """Tests for the response cache."""
+    
+    def test_roundtrip(self, tmp_path):
+        """Test that values are stored and returned unchanged."""
+        cache = ResponseCache(tmp_path / "cache.sqlite")
+        value = {"accession": "PXD000001", "files": [{"fileName": "a.raw", "fileSizeBytes": 10}]}
+        
+        cache.set("key", value, ttl=60)
+        assert cache.get("key") == value
+        assert cache.get("missing") is None
+        assert len(cache) == 1
+        
+        # Entries persist across instances
+        assert ResponseCache(tmp_path / "cache.sqlite").get("key") == value
+    
+    def test_ttl_per_entry(self, tmp_path):
+        """Test that each entry expires according to its own TTL."""
+        cache = ResponseCache(tmp_path / "cache.sqlite")
+        cache.set("short", 1, ttl=0.05)
+        cache.set("long", 2, ttl=60)
+        
+        time.sleep(0.1)
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+    
+    def test_lru_eviction(self, tmp_path):
+        """Test that least recently used entries are evicted beyond the limits."""
+        cache = ResponseCache(tmp_path / "cache.sqlite", max_entries=3, access_resolution=0)
+        for key in ["a", "b", "c"]:
+            cache.set(key, key, ttl=60)
+            time.sleep(0.01)
+        
+        cache.get("a")  # "b" is now the least recently used
+        cache.set("d", "d", ttl=60)
+        
+        assert len(cache) == 3
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        
+        # Byte limit
+        sized = ResponseCache(tmp_path / "sized.sqlite", max_bytes=2000)
+        for i in range(50):
+            sized.set(str(i), "x" * 200 + str(i), ttl=60)
+        assert sized.total_bytes <= 2000
+        assert sized.get("49") is not None
+    
+    def test_multiprocess_writes(self, tmp_path):
+        """Test that several processes can write to the same cache."""
+        path = tmp_path / "cache.sqlite"
+        ResponseCache(path)
+        
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            counts = list(executor.map(write_entries, [path] * 3, range(3), [50] * 3))
+        
+        cache = ResponseCache(path)
+        assert len(cache) == sum(counts)
+        assert cache.get("2-49") == {"worker": 2, "i": 49}
+
+
+    def test_usage_counters(self, tmp_path):
+        """Test that the running entry count and size follow inserts, updates and deletes."""
+        cache = ResponseCache(tmp_path / "cache.sqlite")
+        cache.set("a", "x" * 100, ttl=60)
+        cache.set("b", "y", ttl=60)
+        cache.set("a", "z", ttl=60)  # Replaces "a"
+        cache.delete("b")
+        
+        conn = cache._connect()
+        expected = conn.execute("SELECT COUNT(*), SUM(size) FROM responses").fetchone()
+        assert (len(cache), cache.total_bytes) == expected
+        assert len(cache) == 1
+        
+        cache.clear()
+        assert (len(cache), cache.total_bytes) == (0, 0)
+    
+    def test_reads_throttle_access_updates(self, tmp_path):
+        """Test that a read only rewrites the access time once it is old enough."""
+        cache = ResponseCache(tmp_path / "cache.sqlite")
+        cache.set("key", 1, ttl=60)
+        query = "SELECT accessed FROM responses WHERE key = 'key'"
+        written = cache._connect().execute(query).fetchone()[0]
+        
+        cache.get("key")
+        assert cache._connect().execute(query).fetchone()[0] == written
+        
+        cache.access_resolution = 0
+        cache.get("key")
+        assert cache._connect().execute(query).fetchone()[0] > written
+
+
+class TestMemoryCache:
+    """Tests for the in-process LRU cache."""
+    
+    def test_lru_limits_and_counters(self):
+        """Test entry/byte limits, expiry and hit/miss counters."""
+        cache = MemoryCache(max_entries=2, max_bytes=1000)
+        expires = time.time() + 60
+        cache.set("a", {"v": 1}, expires)
+        cache.set("b", {"v": 2}, expires)
+        assert cache.get("a") == {"v": 1}  # "b" is now the least recently used
+        cache.set("c", {"v": 3}, expires)
+        
+        assert cache.get("b") is None
+        assert cache.get("c") == {"v": 3}
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+        
+        # Byte limit evicts the oldest entries
+        cache.set("big", "x" * 995, expires)
+        assert len(cache) == 1
+        assert cache.total_bytes <= 1000
+        
+        # Expired entries are misses
+        cache.set("old", 1, time.time() - 1)
+        assert cache.get("old") is None
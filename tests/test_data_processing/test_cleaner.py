@@ -0,0 +1,168 @@
+"""
+Test Module for Data Cleaner
+
+Unit tests for missing-value filtering and imputation.
+"""
+
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from sklearn.impute import KNNImputer
+
+from data_processing import cleaner
+from data_processing.cleaner import DataCleaner
+
+
+@pytest.fixture
+def intensities():
+    """Protein x sample table with an accession column and 30% missing values."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(20, 1, (200, 12))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[0, :10] = np.nan  # 83% missing
+    data = pd.DataFrame(values, index=[f"P{i}" for i in range(200)],
+                        columns=[f"S{i}" for i in range(12)])
+    data.insert(0, "accession", [f"ACC{i}" for i in range(200)])
+    return data
+
+
+class TestDataCleaner:
+    """Tests for the data cleaner."""
+    
+    def test_remove_high_missing(self, intensities):
+        """Test that proteins above the missing threshold are removed."""
+        cleaner = DataCleaner(missing_threshold=0.5)
+        filtered = cleaner.remove_high_missing(intensities)
+        
+        fraction = intensities.iloc[:, 1:].isna().mean(axis=1)
+        assert list(filtered.index) == list(fraction[fraction <= 0.5].index)
+        assert "P0" not in filtered.index
+        assert list(filtered.columns) == list(intensities.columns)
+    
+    @pytest.mark.parametrize("method", ["mean", "median", "min"])
+    def test_impute_matches_reference(self, intensities, method):
+        """Test imputation against a straightforward pandas implementation."""
+        numeric = intensities.iloc[:, 1:].astype(np.float32)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if method == "min":
+                expected = numeric.fillna(numeric.min(axis=0))
+            else:
+                fill = numeric.mean(axis=1) if method == "mean" else numeric.median(axis=1)
+                expected = numeric.T.fillna(fill).T
+        
+        imputed = DataCleaner().impute_missing(intensities, method=method)
+        
+        assert list(imputed.columns) == list(intensities.columns)
+        assert (imputed["accession"] == intensities["accession"]).all()
+        np.testing.assert_allclose(imputed.iloc[:, 1:].to_numpy(), expected.to_numpy(), rtol=1e-5)
+        # Input is left unchanged
+        assert intensities.iloc[:, 1:].isna().any().any()
+    
+    def test_knn_matches_exact(self, intensities, monkeypatch):
+        """Test that KNN matches sklearn's exhaustive KNNImputer when all proteins are candidates."""
+        monkeypatch.setattr(cleaner, "KNN_OVERSAMPLING", 100)
+        numeric = intensities.iloc[1:, 1:].astype(np.float32)
+        expected = KNNImputer(n_neighbors=5).fit_transform(numeric.to_numpy())
+        
+        imputed = DataCleaner(n_neighbors=5, n_jobs=2).impute_missing(intensities.iloc[1:], "knn")
+        
+        np.testing.assert_allclose(imputed.iloc[:, 1:].to_numpy(), expected, rtol=1e-5)
+    
+    def test_knn_uses_similar_proteins(self):
+        """Test that KNN beats per-protein means on correlated proteins."""
+        rng = np.random.default_rng(1)
+        level = rng.normal(20, 2, (3000, 1))
+        sample_effect = rng.normal(0, 1, (1, 40))
+        truth = (level + sample_effect + rng.normal(0, 0.3, (3000, 40))).astype(np.float32)
+        missing = rng.random(truth.shape) < 0.3
+        data = pd.DataFrame(np.where(missing, np.nan, truth))
+        
+        errors = {}
+        for method in ["mean", "knn"]:
+            imputed = DataCleaner().impute_missing(data, method).to_numpy()
+            errors[method] = np.sqrt(np.mean((imputed[missing] - truth[missing]) ** 2))
+        
+        assert errors["knn"] < errors["mean"] / 2
+    
+    def test_downshift(self):
+        """Test that downshift draws from N(mean - 1.8 sd, (0.3 sd)^2) per sample."""
+        rng = np.random.default_rng(2)
+        values = rng.normal([20, 25], [1, 2], (20000, 2))
+        values[rng.random(values.shape) < 0.5] = np.nan
+        data = pd.DataFrame(values, columns=["A", "B"])
+        
+        imputed = DataCleaner(random_state=0).impute_missing(data, "downshift")
+        
+        for column in data.columns:
+            observed = data[column].dropna()
+            drawn = imputed[column][data[column].isna()]
+            assert drawn.mean() == pytest.approx(observed.mean() - 1.8 * observed.std(), abs=0.02)
+            assert drawn.std() == pytest.approx(0.3 * observed.std(), rel=0.03)
+        np.testing.assert_allclose(imputed.to_numpy()[~np.isnan(values)],
+                                   values[~np.isnan(values)], rtol=1e-6)
+    
+    def test_minprob(self, intensities):
+        """Test MinProb's per-sample quantile and median protein standard deviation."""
+        numeric = np.log2(intensities.iloc[:, 1:].astype(np.float32))
+        cleaner = DataCleaner(random_state=0)
+        values = numeric.to_numpy()
+        
+        loc, scale = cleaner._censored_parameters(values, np.isnan(values), "minprob", None)
+        
+        np.testing.assert_allclose(loc, numeric.quantile(0.01), rtol=1e-5)
+        np.testing.assert_allclose(scale, numeric.std(axis=1).median(), rtol=1e-4)
+        assert not cleaner.impute_missing(numeric, "minprob").isna().any().any()
+    
+    def test_groups_pool_parameters(self, intensities):
+        """Test that grouped samples share their distribution parameters."""
+        numeric = np.log2(intensities.iloc[:, 1:].astype(np.float32))
+        groups = ["ctrl"] * 6 + ["treated"] * 6
+        cleaner = DataCleaner()
+        values = numeric.to_numpy()
+        
+        loc, scale = cleaner._censored_parameters(values, np.isnan(values), "downshift",
+                                                  cleaner._group_codes(list(numeric.columns), groups))
+        
+        control = numeric.iloc[:, :6].stack()
+        assert loc[0] == pytest.approx(control.mean() - 1.8 * control.std(), rel=1e-5)
+        assert len(set(loc[:6])) == 1 and len(set(scale[6:])) == 1
+        with pytest.raises(ValueError, match="group labels"):
+            cleaner.impute_missing(numeric, "downshift", groups=groups[:-1])
+    
+    def test_impute_replicates(self, intensities):
+        """Test that replicates are reproducible, independent draws."""
+        missing = intensities.iloc[:, 1:].isna().to_numpy()
+        
+        first = list(DataCleaner(random_state=7).impute_replicates(intensities, 3, "minprob"))
+        again = list(DataCleaner(random_state=7).impute_replicates(intensities, 3, "minprob"))
+        
+        assert len(first) == 3
+        for replicate, repeated in zip(first, again):
+            pd.testing.assert_frame_equal(replicate, repeated)
+            assert not replicate.iloc[:, 1:].isna().any().any()
+        assert not np.allclose(first[0].iloc[:, 1:].to_numpy()[missing],
+                               first[1].iloc[:, 1:].to_numpy()[missing])
+        with pytest.raises(ValueError, match="stochastic"):
+            next(DataCleaner().impute_replicates(intensities, 3, "mean"))
+    
+    def test_clean(self, intensities):
+        """Test that clean filters and imputes in one pass."""
+        cleaned = DataCleaner(missing_threshold=0.5, imputation_method="median").clean(intensities)
+        
+        assert "P0" not in cleaned.index
+        assert not cleaned.iloc[:, 1:].isna().any().any()
+        assert (cleaned.dtypes.iloc[1:] == np.float32).all()
+    
+    def test_unknown_method(self, intensities):
+        """Test that unknown methods are rejected."""
+        with pytest.raises(ValueError, match="Unknown imputation method"):
+            DataCleaner().impute_missing(intensities, method="zero")
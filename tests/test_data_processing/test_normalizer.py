@@ -0,0 +1,197 @@
+"""
+Test Module for Normalizer
+
+Unit tests for log2, median, z-score and quantile normalization.
+"""
+
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from data_processing.normalizer import Normalizer
+
+
+@pytest.fixture
+def intensities():
+    """Protein x sample intensities with sample loading differences and 20% missing."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(20, 1, (500, 8)) * rng.uniform(0.5, 2, 8)
+    values[rng.random(values.shape) < 0.2] = np.nan
+    data = pd.DataFrame(values, columns=[f"S{i}" for i in range(8)])
+    data.insert(0, "accession", [f"P{i}" for i in range(500)])
+    return data
+
+
+def textbook_quantile_normalization(values: np.ndarray) -> np.ndarray:
+    """Sort every column, average across columns, assign back by rank (no NaN, no ties)."""
+    reference = np.sort(values, axis=0).mean(axis=1)
+    return reference[values.argsort(axis=0).argsort(axis=0)]
+
+
+class TestNormalizer:
+    """Tests for the normalizer."""
+    
+    def test_log2(self, intensities):
+        """Test that log2 keeps other columns and turns zero intensities into NaN."""
+        intensities.loc[0, "S0"] = 0
+        normalized = Normalizer(method="log2").normalize(intensities)
+        
+        assert list(normalized.columns) == list(intensities.columns)
+        assert np.isnan(normalized.loc[0, "S0"])
+        np.testing.assert_allclose(normalized["S1"], np.log2(intensities["S1"]), rtol=1e-6)
+    
+    def test_median_normalization(self, intensities):
+        """Test that all samples end up with the median of the sample medians."""
+        normalized = Normalizer(method="median").normalize(intensities)
+        
+        medians = normalized.iloc[:, 1:].median()
+        np.testing.assert_allclose(medians, np.log2(intensities.iloc[:, 1:]).median().median(),
+                                   rtol=1e-5)
+        assert (normalized.iloc[:, 1:].isna() == intensities.iloc[:, 1:].isna()).all().all()
+    
+    def test_zscore_normalization(self, intensities):
+        """Test that samples are standardized over their observed values."""
+        normalized = Normalizer(method="zscore").normalize(intensities)
+        
+        np.testing.assert_allclose(normalized.iloc[:, 1:].mean(), 0, atol=1e-5)
+        np.testing.assert_allclose(normalized.iloc[:, 1:].std(), 1, rtol=1e-5)
+    
+    def test_quantile_matches_textbook(self):
+        """Test chunked quantile normalization against the in-memory algorithm."""
+        rng = np.random.default_rng(1)
+        values = rng.normal(size=(300, 7)).astype(np.float32)
+        data = pd.DataFrame(values)
+        
+        normalized = Normalizer(method="quantile").quantile_normalization(data, chunk_columns=3)
+        
+        np.testing.assert_allclose(normalized.to_numpy(), textbook_quantile_normalization(values),
+                                   rtol=1e-5, atol=1e-6)
+    
+    def test_quantile_ties(self):
+        """Test that tied values get the reference at their average rank."""
+        data = pd.DataFrame([[5, 4, 3], [2, 1, 4], [3, 4, 6], [4, 2, 8]], dtype=float)
+        
+        normalized = Normalizer(method="quantile").quantile_normalization(data)
+        
+        # Reference is (2, 3, 4.67, 5.67); the tied 4s of column 1 share ranks 2 and 3
+        np.testing.assert_allclose(normalized[1], [31 / 6, 2, 31 / 6, 3], rtol=1e-5)
+        np.testing.assert_allclose(normalized[0], [17 / 3, 2, 3, 14 / 3], rtol=1e-5)
+    
+    def test_quantile_missing_values(self, intensities):
+        """Test that missing values stay missing and observed values get identical distributions."""
+        normalized = Normalizer(method="quantile").normalize(intensities)
+        numeric = normalized.iloc[:, 1:]
+        
+        assert (numeric.isna() == intensities.iloc[:, 1:].isna()).all().all()
+        quartiles = numeric.quantile([0.25, 0.5, 0.75])
+        np.testing.assert_allclose(quartiles.to_numpy(),
+                                   np.repeat(quartiles.iloc[:, [0]].to_numpy(), 8, axis=1),
+                                   rtol=1e-4)
+    
+    def test_quantile_normalize_file(self, intensities, tmp_path):
+        """Test that the memory-mapped mode matches the in-memory result."""
+        values = np.asfortranarray(intensities.iloc[:, 1:].to_numpy(dtype=np.float32))
+        np.save(tmp_path / "intensities.npy", values)
+        normalizer = Normalizer(method="quantile")
+        
+        out = normalizer.quantile_normalize_file(tmp_path / "intensities.npy",
+                                                 tmp_path / "normalized.npy", chunk_columns=3)
+        
+        expected = normalizer.normalize(intensities).iloc[:, 1:].to_numpy()
+        np.testing.assert_allclose(np.load(tmp_path / "normalized.npy"), expected, rtol=1e-6)
+        assert out.flags.f_contiguous
+    
+    @pytest.mark.parametrize("method", ["median", "zscore", "quantile"])
+    def test_transform_matches_fit_transform(self, intensities, method):
+        """Test that transforming the fitted data reproduces fit_transform."""
+        normalizer = Normalizer(method=method)
+        expected = normalizer.fit_transform(intensities)
+        
+        pd.testing.assert_frame_equal(normalizer.transform(intensities), expected)
+    
+    def test_median_new_samples(self, intensities):
+        """Test that new samples are shifted to the fitted target median."""
+        normalizer = Normalizer(method="median").fit(intensities.iloc[:, :5])
+        new_batch = intensities[["accession", "S5", "S6", "S7"]].copy()
+        new_batch[["S5", "S6"]] *= [3.0, 0.5]
+        
+        normalized = normalizer.transform(new_batch)
+        
+        np.testing.assert_allclose(normalized[["S5", "S6", "S7"]].median(), normalizer.center,
+                                   rtol=1e-5)
+        assert list(normalizer.sample_stats.index) == ["S0", "S1", "S2", "S3"]
+    
+    def test_reused_sample_names(self, intensities):
+        """Test that a new batch with fitted column names gets its own statistics by default."""
+        normalizer = Normalizer(method="median").fit(intensities)
+        new_batch = intensities.copy()
+        new_batch[["S0", "S1"]] *= [8.0, 0.25]
+        
+        normalized = normalizer.transform(new_batch)
+        reused = normalizer.transform(new_batch, use_fitted_stats=True)
+        
+        np.testing.assert_allclose(normalized.iloc[:, 1:].median(), normalizer.center, rtol=1e-5)
+        # The fitted medians no longer match S0 and S1
+        np.testing.assert_allclose(reused[["S0", "S1"]].median() - normalizer.center, [3, -2],
+                                   rtol=1e-5)
+    
+    def test_zscore_constant_sample(self, intensities):
+        """Test that a constant sample is centered instead of becoming NaN."""
+        intensities["S0"] = 1000.0
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            normalized = Normalizer(method="zscore").normalize(intensities)
+        
+        assert (normalized["S0"] == 0).all()
+    
+    def test_quantile_new_samples(self, intensities):
+        """Test that new samples are mapped onto the frozen reference distribution."""
+        normalizer = Normalizer(method="quantile")
+        fitted = normalizer.fit_transform(intensities.iloc[:, :5])
+        new_batch = intensities[["S5", "S6", "S7"]].iloc[:300] * 4
+        
+        normalized = normalizer.transform(new_batch)
+        
+        np.testing.assert_allclose(normalized.median(), fitted["S0"].median(), rtol=1e-3)
+    
+    @pytest.mark.parametrize("method", ["median", "zscore", "quantile", "log2"])
+    def test_save_load(self, intensities, tmp_path, method):
+        """Test that a saved normalizer transforms new data identically."""
+        normalizer = Normalizer(method=method, log_transform=True).fit(intensities.iloc[:, :5])
+        normalizer.save(tmp_path / "normalizer.npz")
+        
+        loaded = Normalizer.load(tmp_path / "normalizer.npz")
+        
+        assert loaded.method == method and loaded.log_transform
+        pd.testing.assert_frame_equal(loaded.transform(intensities),
+                                      normalizer.transform(intensities))
+    
+    def test_quantile_file_with_fitted_reference(self, intensities, tmp_path):
+        """Test that the memory-mapped mode can use a fitted reference."""
+        normalizer = Normalizer(method="quantile").fit(intensities.iloc[:, :5])
+        np.save(tmp_path / "new.npy", intensities[["S5", "S6", "S7"]].to_numpy(dtype=np.float32))
+        
+        normalizer.quantile_normalize_file(tmp_path / "new.npy", tmp_path / "out.npy", fit=False)
+        
+        expected = normalizer.transform(intensities[["S5", "S6", "S7"]])
+        np.testing.assert_allclose(np.load(tmp_path / "out.npy"), expected.to_numpy(), rtol=1e-6)
+    
+    def test_not_fitted(self, intensities):
+        """Test that transform and save require a fitted normalizer."""
+        with pytest.raises(RuntimeError, match="not fitted"):
+            Normalizer().transform(intensities)
+        with pytest.raises(RuntimeError, match="not fitted"):
+            Normalizer().save("normalizer.npz")
+    
+    def test_unknown_method(self):
+        """Test that unknown methods are rejected."""
+        with pytest.raises(ValueError, match="Unknown normalization method"):
+            Normalizer(method="loess")